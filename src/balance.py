@@ -8,6 +8,7 @@ import helpers
 import offer
 import parse
 import preprocess
+import solver
 from pandas.plotting import register_matplotlib_converters
 register_matplotlib_converters()
 import matplotlib.pyplot as plt
@@ -210,7 +211,7 @@ def calculate_dlmp(dual, dlmp):
 def forward(start, e, usage, path_to_unit):
     problems, demands = [], []
     last_prob_id = None
-    with gp.Env() as env, gp.Model(env=env, name=f'Forward {default.get_case_datetime(start)}') as model:
+    with solver.open_model(f'Forward {default.get_case_datetime(start)}') as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         # Initiate cost and penalty of objective function
         total_costs = 0
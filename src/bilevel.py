@@ -1,4 +1,5 @@
 import gurobipy
+import solver
 
 
 def KKT(model, quadratic=False):
@@ -225,7 +226,7 @@ def feasible(m, prob_id, units):
 
 
 def test_kkt():
-    with gurobipy.Env() as env, gurobipy.Model(env=env, name='TestKKT') as m:
+    with solver.open_model('TestKKT') as m:
         # G0 = m.addVar(lb=0, ub=200, name='G0')
         # G1 = m.addVar(lb=0, ub=200, name='G1')
         # B0 = m.addVar(lb=0, ub=200, name='B0')
@@ -305,7 +306,7 @@ def test_kkt():
 
 
 def test():
-    with gurobipy.Env() as env, gurobipy.Model(env=env, name='Test') as model:
+    with solver.open_model('Test') as model:
         a = model.addVar(ub=5, name='a')
         model.update()
         print('yes', a.ub)
@@ -3,10 +3,20 @@ import default
 import gurobipy as gp
 from helpers import condition1, condition2
 import logging
+import mms
 import offer
 import preprocess
 
 intervention = '0'
+# Columns of constraint solution tables in DISPATCHIS, P5MIN and PREDISPATCHIS files
+CONSTRAINT_SOLUTION_SCHEMA = {
+    'CONSTRAINTID': mms.STR,
+    'RHS': mms.FLOAT,
+    'MARGINALVALUE': mms.FLOAT,
+    'VIOLATIONDEGREE': mms.FLOAT,
+    'LHS': mms.FLOAT
+}
+constraint_solutions = {}  # {path to run file: {interval datetime: {constraint ID: (RHS, marginal value, violation degree, LHS)}}}
 
 
 class Constraint:
@@ -93,19 +103,17 @@ def init_constraints(t):
 
     """
     constraints = {}
-    constr_dir = preprocess.download_dvd_data('GENCONDATA', t)
+    index = preprocess.index_dvd_data('GENCONDATA', t, (6,), 4)
     # logging.info('Read generic constraint data.')
-    with constr_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and t >= default.extract_datetime(row[4]):
-                gen_con_id = row[6]
-                constr = constraints.get(gen_con_id)
-                if not constr:
-                    constraints[gen_con_id] = Constraint(row)
-                elif constr.last_changed < default.extract_datetime(row[15]):
-                    constr.update(row)
-        return constraints
+    for key in index:
+        for row in preprocess.get_effective_rows(index, key, t):
+            gen_con_id = row[6]
+            constr = constraints.get(gen_con_id)
+            if not constr:
+                constraints[gen_con_id] = Constraint(row)
+            elif constr.last_changed < default.extract_datetime(row[15]):
+                constr.update(row)
+    return constraints
 
 
 def add_spd_connection_point_constraint(t, constraints, units, connection_points, fcas_flag):
@@ -230,6 +238,62 @@ def add_spd_region_constraint(t, constraints, regions):
                     constr.regions.add(f'{row[4]} {row[10]} {row[8]}')
 
 
+def get_constraint_solution(p, t, table, interval_column):
+    """Get constraint solutions of the interval from the run-level store. The store groups the constraint solution
+    table of the whole run by interval once, so that each interval of the run is a dictionary lookup. Only the latest
+    run is kept because intervals of a run are formulated one after another.
+
+    Args:
+        p (pathlib.Path): path to the run file, i.e. DISPATCHIS, P5MIN or PREDISPATCHIS file
+        t (datetime.datetime): interval datetime
+        table (str): constraint solution table name
+        interval_column (str): interval datetime column name
+
+    Returns:
+        dict: {constraint ID: (RHS, marginal value, violation degree, LHS)}
+    """
+    if p not in constraint_solutions:
+        constraint_solutions.clear()
+        schema = dict(CONSTRAINT_SOLUTION_SCHEMA, **{interval_column: mms.STR})
+        batch = mms.read_table(p, table, schema, {'INTERVENTION': intervention})
+        intervals = {}
+        for interval, constr_id, rhs, marginal_value, violation_degree, lhs in zip(
+                batch[interval_column], batch['CONSTRAINTID'], batch['RHS'].tolist(), batch['MARGINALVALUE'].tolist(),
+                batch['VIOLATIONDEGREE'].tolist(), batch['LHS'].tolist()):
+            intervals.setdefault(interval, {})[constr_id] = (rhs, marginal_value, violation_degree, lhs)
+        constraint_solutions[p] = intervals
+    return constraint_solutions[p].get(default.get_interval_datetime(t), {})
+
+
+def add_constraint_solution(solution, constraints, debug_flag, rhs_flag=False):
+    """Attach constraint solutions of the interval to the generic constraints. Constraints in the solution are binding.
+
+    Args:
+        solution (dict): {constraint ID: (RHS, marginal value, violation degree, LHS)}
+        constraints (dict): The dictionary of generic constraints
+        debug_flag (bool): Used for debugging or not
+        rhs_flag (bool): only overwrite RHS calculated before (and report differences) or not
+
+    Returns:
+        None
+    """
+    for constr_id, (rhs, marginal_value, violation_degree, lhs) in solution.items():
+        constr = constraints.get(constr_id)
+        if constr:
+            if not rhs_flag:
+                constr.rhs = rhs
+            elif constr.rhs is not None:
+                if abs(constr.rhs - rhs) > 1:
+                    print(f'Constraint {constr_id} rhs {constr.rhs} but csv record {rhs}')
+                constr.rhs = rhs
+            constr.marginal_value = marginal_value
+            constr.violation_degree = violation_degree
+            constr.lhs = lhs
+            constr.bind_flag = True
+        elif debug_flag:
+            logging.error(f'Constraint {constr_id} was not included')
+
+
 def add_dispatch_constraint(t, constraints, debug_flag):
     """ Add Generic Constraint RHS value for 'dispatch' process.
 
@@ -243,23 +307,8 @@ def add_dispatch_constraint(t, constraints, debug_flag):
     # constr_dir = preprocess.download_dvd_data('DISPATCHCONSTRAINT', t)
     constr_dir = preprocess.download_dispatch_summary(t)
     # logging.info('Read dispatch constraint data.')
-    with constr_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'CONSTRAINT' and row[8] == intervention:
-                constr = constraints.get(row[6])
-                if constr:
-                    if constr.rhs is not None:
-                        csv_rhs = float(row[9])
-                        if abs(constr.rhs - csv_rhs) > 1:
-                            print(f'Constraint {row[6]} rhs {constr.rhs} but csv record {csv_rhs}')
-                        constr.rhs = float(row[9])
-                    constr.marginal_value = float(row[10])
-                    constr.violation_degree = float(row[11])
-                    constr.lhs = float(row[16])
-                    constr.bind_flag = True
-                elif debug_flag:
-                    logging.error(f'Constraint {row[6]} was not included')
+    solution = get_constraint_solution(constr_dir, t, 'CONSTRAINT', 'SETTLEMENTDATE')
+    add_constraint_solution(solution, constraints, debug_flag, rhs_flag=True)
 
 
 def add_dvd_dispatch_constraint(t, constraints, debug_flag):
@@ -306,19 +355,8 @@ def add_predispatch_constraint(t, start, constraints, debug_flag):
     """
     constr_dir = preprocess.download_predispatch(start)
     # logging.info('Read pre-dispatch constraint data.')
-    with constr_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'CONSTRAINT_SOLUTION' and default.extract_datetime(row[13]) == t and row[8] == '0':  # 8: Intervention flag; 13: Interval datetime
-                constr = constraints.get(row[6])  # 6: Constraint ID
-                if constr:
-                    constr.rhs = float(row[9])
-                    constr.marginal_value = float(row[10])
-                    constr.voilation_degree = float(row[11])
-                    constr.lhs = float(row[17])
-                    constr.bind_flag = True
-                elif debug_flag:
-                    logging.error(f'Constraint {row[6]} was not included')
+    solution = get_constraint_solution(constr_dir, t, 'CONSTRAINT_SOLUTION', 'DATETIME')
+    add_constraint_solution(solution, constraints, debug_flag)
 
 
 def add_p5min_constraint(t, start, constraints, debug_flag):
@@ -334,19 +372,8 @@ def add_p5min_constraint(t, start, constraints, debug_flag):
     """
     constr_dir = preprocess.download_5min_predispatch(start)
     # logging.info('Read 5min pre-dispatch constraint data.')
-    with constr_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'CONSTRAINTSOLUTION' and default.extract_datetime(row[6]) == t and row[5] == '0':  # 5: Intervention flag; 6: Interval datetime
-                constr = constraints.get(row[7])  # 7: Constraint ID
-                if constr:
-                    constr.rhs = float(row[8])
-                    constr.marginal_value = float(row[9])
-                    constr.voilation_degree = float(row[10])
-                    constr.lhs = float(row[15])
-                    constr.bind_flag = True
-                elif debug_flag:
-                    logging.error(f'Constraint {row[7]} was not included')
+    solution = get_constraint_solution(constr_dir, t, 'CONSTRAINTSOLUTION', 'INTERVAL_DATETIME')
+    add_constraint_solution(solution, constraints, debug_flag)
 
 
 def get_constraints(process, t, units, connection_points, interconnectors, regions, start, fcas_flag):
@@ -425,6 +452,27 @@ def add_daily_energy_constr(model, unit, prob_id, debug_flag, penalty, cvp):
     # return penalty
 
 
+def add_energy_offer(model, unit, prob_id):
+    """ Energy offer band variables, band availability constraints and total cleared variable of the unit (scalar
+    builder, see matrix.add_energy_offers).
+
+    Args:
+        model (gp.Model): The optimisation model
+        unit (offer.Unit): The unit
+        prob_id (str): Problem ID
+
+    Returns:
+        None
+    """
+    # Dispatch target at each price band
+    for no, avail in enumerate(unit.energy.band_avail):
+        bid_offer = model.addVar(name=f'Energy_Avail{no}_{unit.duid}_{prob_id}')
+        unit.offers.append(bid_offer)
+        model.addLConstr(bid_offer <= avail, name=f'ENERGY_AVAIL{no}_{unit.duid}_{prob_id}')
+    # Total dispatch total_cleared
+    unit.total_cleared = model.addVar(name=f'Total_Cleared_{unit.duid}_{prob_id}')
+
+
 def add_total_band_constr(model, unit, prob_id, debug_flag, penalty, cvp):
     """ Total Band MW Offer constraint.
 
@@ -444,7 +492,7 @@ def add_total_band_constr(model, unit, prob_id, debug_flag, penalty, cvp):
     penalty += deficit_offer_mw * cvp['OfferPrice']
     model.addLConstr(unit.total_cleared + deficit_offer_mw, sense=gp.GRB.EQUAL, rhs=sum(unit.offers),
                      name=f'TOTAL_BAND_MW_OFFER_{unit.duid}_{prob_id}')
-    # return penalty
+    return penalty
 
 
 def add_uigf_constr(model, unit, prob_id, debug_flag, penalty, cvp):
@@ -604,7 +652,7 @@ def add_cost(unit, regions, cost, debug_flag, renewable_flag):
         The cost linear expression.
     """
     # Cost of an unit
-    unit.cost = sum([o * ((max(p, 0) if renewable_flag and unit.renewable_flag else p) / unit.transmission_loss_factor) for o, p in zip(unit.offers, unit.energy.price_band)])
+    unit.cost = gp.LinExpr([(max(p, 0) if renewable_flag and unit.renewable_flag else p) / unit.transmission_loss_factor for p in unit.energy.price_band[:len(unit.offers)]], unit.offers)
     if unit.dispatch_type == 'GENERATOR':
         # Add cost to objective
         cost += unit.cost
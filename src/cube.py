@@ -0,0 +1,247 @@
+import csv
+import datetime
+import default
+import mms
+import numpy as np
+import preprocess
+
+REGIONS = ['NSW1', 'QLD1', 'SA1', 'TAS1', 'VIC1']
+PRICE_TYPES = ['ENERGY', 'RAISEREG', 'RAISE6SEC', 'RAISE60SEC', 'RAISE5MIN', 'LOWERREG', 'LOWER6SEC', 'LOWER60SEC', 'LOWER5MIN']
+SOURCES = ['AEMO', 'CUSTOM']  # AEMO's records and our run
+CUBE_DIR = default.DATA_DIR / 'cube'
+# Columns of DISPATCHPRICE (and PRICE table of DISPATCHIS) for each price type
+AEMO_COLUMNS = {
+    'ENERGY': 'RRP',
+    'RAISEREG': 'RAISEREGRRP',
+    'RAISE6SEC': 'RAISE6SECRRP',
+    'RAISE60SEC': 'RAISE60SECRRP',
+    'RAISE5MIN': 'RAISE5MINRRP',
+    'LOWERREG': 'LOWERREGRRP',
+    'LOWER6SEC': 'LOWER6SECRRP',
+    'LOWER60SEC': 'LOWER60SECRRP',
+    'LOWER5MIN': 'LOWER5MINRRP'
+}
+# Column indices of our DISPATCHIS results (see result.write_dispatchis) for each price type
+CUSTOM_INDICES = {
+    'ENERGY': 9,
+    'RAISEREG': 24,
+    'RAISE6SEC': 15,
+    'RAISE60SEC': 18,
+    'RAISE5MIN': 21,
+    'LOWERREG': 36,
+    'LOWER6SEC': 27,
+    'LOWER60SEC': 30,
+    'LOWER5MIN': 33
+}
+
+
+def get_cube_path(start, end, name, intervention='0'):
+    """Get path to the price cube.
+
+    Args:
+        start (datetime.datetime): first interval datetime
+        end (datetime.datetime): last interval datetime
+        name (str): name of the cube, e.g. name of our result directory
+        intervention (str): intervention flag of AEMO's records
+
+    Returns:
+        pathlib.Path: path to the cube
+    """
+    return CUBE_DIR / f'PRICE_{name}_{intervention}_{default.get_case_datetime(start)}_{default.get_case_datetime(end)}.npy'
+
+
+def get_interval_index(t, start):
+    """Get index of the interval in the cube.
+
+    Args:
+        t (datetime.datetime or numpy.ndarray): interval datetime(s)
+        start (datetime.datetime): first interval datetime
+
+    Returns:
+        int or numpy.ndarray: index(es)
+    """
+    if isinstance(t, np.ndarray):
+        return ((t - mms.to_datetime64(start)) // np.timedelta64(5, 'm')).astype(np.int64)
+    return int((t - start) / default.FIVE_MIN)
+
+
+def get_months(start, end):
+    """Get months of DVD files covering the intervals. Each DVD file holds a month of settlement dates, so an end at
+    00:00 on the first day of a month needs the whole file of that month.
+
+    Args:
+        start (datetime.datetime): first interval datetime
+        end (datetime.datetime): last interval datetime
+
+    Returns:
+        list: first datetimes of months
+    """
+    months = []
+    month = datetime.datetime(start.year, start.month, 1)
+    while month <= end:
+        months.append(month)
+        month = datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+    return months
+
+
+def add_aemo_prices(cube, start, end, intervention='0'):
+    """Fill AEMO's price records from monthly DVD DISPATCHPRICE files.
+
+    Args:
+        cube (numpy.ndarray): price cube
+        start (datetime.datetime): first interval datetime
+        end (datetime.datetime): last interval datetime
+        intervention (str): intervention flag
+
+    Returns:
+        None
+    """
+    schema = {'SETTLEMENTDATE': mms.DATETIME, 'REGIONID': mms.STR}
+    schema.update({column: mms.FLOAT for column in AEMO_COLUMNS.values()})
+    for month in get_months(start, end):
+        batch = mms.read_cached_table(preprocess.download_dvd_data('DISPATCHPRICE', month), month, 'PRICE', schema,
+                                      {'INTERVENTION': intervention, 'REGIONID': REGIONS})
+        indices = get_interval_index(batch['SETTLEMENTDATE'], start)
+        valid = (indices >= 0) & (indices < cube.shape[0])
+        for r, region_id in enumerate(REGIONS):
+            mask = valid & (batch['REGIONID'] == region_id)
+            for p, price_type in enumerate(PRICE_TYPES):
+                cube[indices[mask], r, p, 0] = batch[AEMO_COLUMNS[price_type]][mask]
+
+
+def add_custom_prices(cube, start, path_to_out, k=0):
+    """Fill prices of our run from DISPATCHIS results. Missing results are left as NaN.
+
+    Args:
+        cube (numpy.ndarray): price cube
+        start (datetime.datetime): first interval datetime
+        path_to_out (pathlib.Path): path to output directory
+        k (int): iteration number
+
+    Returns:
+        None
+    """
+    result_dir = path_to_out / ('dispatch' if k == 0 else f'dispatch_{k}')
+    for i in range(cube.shape[0]):
+        p = result_dir / f'DISPATCHIS_{default.get_case_datetime(start + i * default.FIVE_MIN)}.csv'
+        if not p.is_file():
+            continue
+        with p.open() as f:
+            reader = csv.reader(f)
+            for row in reader:
+                if row[0] == 'D' and row[2] == 'PRICE' and row[6] in REGIONS:
+                    r = REGIONS.index(row[6])
+                    cube[i, r, :, 1] = [float(row[j]) if j < len(row) and row[j] else np.nan for j in CUSTOM_INDICES.values()]
+
+
+def build_cube(start, end, name='AEMO', path_to_out=None, k=0, intervention='0'):
+    """Materialise the memory-mapped price cube, i.e. interval x region x price type x source. It is saved as .npy
+    file and can be opened read-only (and shared) by other processes through load_cube.
+
+    Args:
+        start (datetime.datetime): first interval datetime
+        end (datetime.datetime): last interval datetime
+        name (str): name of the cube
+        path_to_out (pathlib.Path): path to our results, or None for AEMO's records only
+        k (int): iteration number
+        intervention (str): intervention flag of AEMO's records
+
+    Returns:
+        numpy.memmap: price cube
+    """
+    CUBE_DIR.mkdir(parents=True, exist_ok=True)
+    p = get_cube_path(start, end, name, intervention)
+    temp_path = p.with_name(f'{p.stem}.tmp.npy')
+    intervals = get_interval_index(end, start) + 1
+    cube = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float64, shape=(intervals, len(REGIONS), len(PRICE_TYPES), len(SOURCES)))
+    cube[:] = np.nan
+    add_aemo_prices(cube, start, end, intervention)
+    if path_to_out is not None:
+        add_custom_prices(cube, start, path_to_out, k)
+    cube.flush()
+    del cube
+    temp_path.replace(p)
+    return load_cube(start, end, name, intervention)
+
+
+def load_cube(start, end, name='AEMO', intervention='0'):
+    """Open the price cube read-only, building it if not exists (AEMO's cube only).
+
+    Args:
+        start (datetime.datetime): first interval datetime
+        end (datetime.datetime): last interval datetime
+        name (str): name of the cube
+        intervention (str): intervention flag of AEMO's records
+
+    Returns:
+        numpy.memmap: price cube
+    """
+    p = get_cube_path(start, end, name, intervention)
+    if not p.is_file():
+        if name != 'AEMO':
+            raise FileNotFoundError(f'{p} not found. Build the cube with our results by build_cube first.')
+        return build_cube(start, end, name, intervention=intervention)
+    return np.load(p, mmap_mode='r')
+
+
+def get_prices(cube, region_id, price_type='ENERGY', source='AEMO'):
+    """Get price series of the region.
+
+    Args:
+        cube (numpy.ndarray): price cube
+        region_id (str): region ID
+        price_type (str): 'ENERGY' or FCAS type
+        source (str): 'AEMO' or 'CUSTOM'
+
+    Returns:
+        numpy.ndarray: prices of all intervals
+    """
+    return cube[:, REGIONS.index(region_id), PRICE_TYPES.index(price_type), SOURCES.index(source)]
+
+
+def calculate_quantiles(cube, q, source='AEMO'):
+    """Calculate price quantiles of all regions and price types, ignoring missing intervals.
+
+    Args:
+        cube (numpy.ndarray): price cube
+        q (float or list): quantile(s) in [0, 1]
+        source (str): 'AEMO' or 'CUSTOM'
+
+    Returns:
+        numpy.ndarray: quantiles, i.e. (quantiles x) region x price type
+    """
+    return np.nanquantile(cube[:, :, :, SOURCES.index(source)], q, axis=0)
+
+
+def calculate_histogram(cube, region_id, price_type='ENERGY', source='AEMO', bins=100, price_range=None):
+    """Calculate price histogram of the region, ignoring missing intervals.
+
+    Args:
+        cube (numpy.ndarray): price cube
+        region_id (str): region ID
+        price_type (str): 'ENERGY' or FCAS type
+        source (str): 'AEMO' or 'CUSTOM'
+        bins (int or list): number of bins or bin edges
+        price_range (tuple): (lower, upper) price range, or None
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): counts, bin edges
+    """
+    prices = get_prices(cube, region_id, price_type, source)
+    return np.histogram(prices[~np.isnan(prices)], bins=bins, range=price_range)
+
+
+def calculate_volatility(cube, source='AEMO', intervals=default.INTERVALS):
+    """Calculate mean and standard deviation of prices of each day (or each block of the given intervals).
+
+    Args:
+        cube (numpy.ndarray): price cube
+        source (str): 'AEMO' or 'CUSTOM'
+        intervals (int): number of intervals per block
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): means and standard deviations, i.e. block x region x price type
+    """
+    days = cube.shape[0] // intervals
+    prices = cube[:days * intervals, :, :, SOURCES.index(source)].reshape(days, intervals, len(REGIONS), len(PRICE_TYPES))
+    return np.nanmean(prices, axis=1), np.nanstd(prices, axis=1)
@@ -0,0 +1,165 @@
+import default
+import json
+import logging
+import pathlib
+import requests
+import time
+import urllib.parse
+
+RETRIES = 3  # Number of retries of failed HTTP requests
+BACKOFF = 1.0  # Backoff factor (seconds) between retries, i.e. 1s, 2s, 4s, ...
+POOL_SIZE = 16  # Maximum number of pooled connections per host
+TIMEOUT = (10, 300)  # (connect, read) timeout in seconds of each request, so a stalled connection is retried
+
+
+class Response:
+    """Response of the local archive, providing the same attributes as requests.Response used in preprocess."""
+    def __init__(self, url, content=None):
+        self.url = url
+        self.ok = content is not None
+        self.content = b'' if content is None else content
+
+    @property
+    def text(self):
+        return self.content.decode(errors='replace')
+
+
+class HttpSource:
+    """Download files from nemweb (or AEMO) through HTTP, sharing one connection pool and retrying with backoff."""
+    def __init__(self, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE, timeout=TIMEOUT):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url):
+        """Get the file or directory listing of the given URL.
+
+        Args:
+            url (str): URL
+
+        Returns:
+            requests.Response: response
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                result = self.session.get(url, timeout=self.timeout)
+                if result.status_code != 429 and result.status_code < 500:
+                    return result
+                logging.warning(f'{url} responded {result.status_code} (attempt {attempt + 1}).')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                logging.warning(f'{url} failed: {e} (attempt {attempt + 1}).')
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        return result
+
+
+class ArchiveSource:
+    """Resolve files from a pre-populated local directory tree instead of downloading them.
+
+    The manifest (manifest.json in the root directory) maps URL paths, e.g.
+    'Reports/Current/DispatchIS_Reports/PUBLIC_DISPATCHIS_202107180405_0000000344000000.zip', to paths relative to the
+    root directory. If there is no manifest, it is built by walking the tree, i.e. the tree mirrors the URL paths.
+    """
+    def __init__(self, root, manifest_path=None):
+        self.root = pathlib.Path(root)
+        self.manifest_path = self.root / 'manifest.json' if manifest_path is None else pathlib.Path(manifest_path)
+        self.index = {}  # {URL key: path to the file}
+        self.listings = {}  # {URL key of directory: list of file names}
+        if self.manifest_path.is_file():
+            with self.manifest_path.open() as f:
+                manifest = json.load(f)
+        else:
+            manifest = build_manifest(self.root, self.manifest_path)
+        for url_path, file_path in manifest.items():
+            key = get_key(url_path)
+            self.index[key] = self.root / file_path
+            directory, _, name = url_path.strip('/').rpartition('/')
+            self.listings.setdefault(get_key(directory), []).append(name)
+
+    def get(self, url):
+        """Get the file or directory listing of the given URL. Directory listing is rendered as a simple HTML page so
+        that file names can be matched in the same way as nemweb pages.
+
+        Args:
+            url (str): URL
+
+        Returns:
+            Response: response
+        """
+        key = get_key(url)
+        p = self.index.get(key)
+        if p is not None and p.is_file():
+            return Response(url, p.read_bytes())
+        if key in self.listings:
+            page = ''.join(f'<a href="{name}">{name}</a><br>' for name in sorted(self.listings[key]))
+            return Response(url, page.encode())
+        logging.error(f'{url} not found in local archive {self.root}.')
+        return Response(url)
+
+
+def get_key(url):
+    """Convert URL to the key of the index, ignoring scheme, host, letter case and duplicate slashes.
+
+    Args:
+        url (str): URL or URL path
+
+    Returns:
+        str: key
+    """
+    path = urllib.parse.urlparse(url).path if '://' in url else url
+    return '/'.join(part for part in path.split('/') if part).lower()
+
+
+def build_manifest(root, manifest_path=None):
+    """Build the manifest of a local archive whose directory tree mirrors the URL paths.
+
+    Args:
+        root (pathlib.Path): root directory of the archive
+        manifest_path (pathlib.Path): path to write the manifest, or None
+
+    Returns:
+        dict: {URL path: file path relative to the root directory}
+    """
+    manifest = {}
+    for p in sorted(root.rglob('*')):
+        if p.is_file() and p != manifest_path:
+            relative_path = p.relative_to(root).as_posix()
+            manifest[relative_path] = relative_path
+    if manifest_path is not None:
+        with manifest_path.open('w') as f:
+            json.dump(manifest, f, indent=1)
+    return manifest
+
+
+data_source = HttpSource() if default.ARCHIVE_DIR is None else ArchiveSource(default.ARCHIVE_DIR)
+
+
+def set_data_source(source):
+    """Set the data source used by preprocess.
+
+    Args:
+        source (HttpSource or ArchiveSource): data source
+
+    Returns:
+        None
+    """
+    global data_source
+    data_source = source
+
+
+def get(url):
+    """Get the file or directory listing of the given URL from the current data source.
+
+    Args:
+        url (str): URL
+
+    Returns:
+        requests.Response or Response: response
+    """
+    return data_source.get(url)
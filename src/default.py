@@ -10,6 +10,7 @@ MODEL_DIR = BASE_DIR / 'model'  # Model directory
 DEBUG_DIR = BASE_DIR / 'debug'  # Debug directory
 RECORD_DIR = OUT_DIR / 'record'
 EXPERIMENT_DIR = BASE_DIR / 'experiment'
+ARCHIVE_DIR = None  # Local archive of nemweb files used instead of downloading (None to download)
 
 ZERO = datetime.timedelta(seconds=0)
 ONE_MIN = datetime.timedelta(minutes=1)
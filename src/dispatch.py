@@ -8,10 +8,13 @@ import gurobipy as gp
 import helpers
 import interconnect
 import logging
+import matrix
 import offer
 import parse
 import random
 import result
+import solver
+import template
 from preprocess import get_market_price
 from plot import plot_optimisation_with_bids
 
@@ -112,7 +115,8 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
              hard_flag=False, fcas_flag=True, constr_flag=True, losses_flag=True, link_flag=True, dual_flag=True,
              fixed_interflow_flag=False, fixed_total_cleared_flag=False, fixed_fcas_value_flag=False,
              fixed_local_fcas_flag=False, ic_record_flag=False, debug_flag=False, der_flag=False, last_prob_id=None,
-             intervals=None, batteries=None, daily_energy_flag=False, dispatchload_record=False, prob=None):
+             intervals=None, batteries=None, daily_energy_flag=False, dispatchload_record=False, prob=None,
+             builder='scalar'):
     """ Dispatch part of NEMDE formulation.
     Args:
         current (datetime.datetime): Current datetime
@@ -144,6 +148,7 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
         intervals (int): Pre-defined number of intervals
         batteries (dict): Participant battery
         dispatchload_record (bool): Use AEMO's DISPATCHLOAD record
+        builder (str): 'scalar' to add unit offers one at a time; 'matrix' to add them with matrix API (see matrix.py)
     Returns:
         (Problem, gurobipy.Model, dict)
     """
@@ -307,6 +312,11 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
         #     parse.add_nemspdoutputs_fcas(current, prob.units, parse.add_fcas)
             # parse.add_nemspdoutputs_fcas(current, units, parse.verify_fcas)
         energy_bands = {'GENERATOR': {'NSW1': {}, 'QLD1': {}, 'SA1': {}, 'TAS1': {}, 'VIC1':{}}, 'LOAD': {'NSW1': {}, 'QLD1': {}, 'SA1': {}, 'TAS1': {}, 'VIC1':{}}}
+        # Add energy offers and total band MW offer constraints of all units at once
+        if builder == 'matrix':
+            energy_units = matrix.get_energy_units(prob.units)
+            matrix.add_energy_offers(model, energy_units, prob.problem_id)
+            prob.penalty = matrix.add_total_band_constrs(model, energy_units, prob.problem_id, prob.penalty, cvp)
         for unit in prob.units.values():
             # if der_flag and last_prob_id is not None:
             if last_prob_id is not None:
@@ -316,13 +326,8 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
             # Unit participates in the energy market
             # Normally-on loads have already been included as a component of the metered demand calculation
             if unit.energy is not None and unit.normally_on_flag != 'Y':
-                # Dispatch target at each price band
-                for no, avail in enumerate(unit.energy.band_avail):
-                    bid_offer = model.addVar(name=f'Energy_Avail{no}_{unit.duid}_{prob.problem_id}')
-                    unit.offers.append(bid_offer)
-                    model.addLConstr(bid_offer <= avail, name=f'ENERGY_AVAIL{no}_{unit.duid}_{prob.problem_id}')
-                # Total dispatch total_cleared
-                unit.total_cleared = model.addVar(name=f'Total_Cleared_{unit.duid}_{prob.problem_id}')
+                if builder == 'scalar':
+                    constrain.add_energy_offer(model, unit, prob.problem_id)
 
                 # if unit.duid == 'LOYYB1':
                 #     model.addConstr(unit.total_cleared, gp.GRB.EQUAL, 487.75331844441655, name='DEBUG')
@@ -339,7 +344,8 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
                 if process == 'predispatch' and daily_energy_flag and unit.energy.daily_energy_limit != 0 and unit.energy.daily_energy_limit is not None:
                     prob.penalty = constrain.add_daily_energy_constr(model, unit, prob.problem_id, debug_flag, prob.penalty, cvp)
                 # Add total band MW offer constraint
-                prob.penalty = constrain.add_total_band_constr(model, unit, prob.problem_id, debug_flag, prob.penalty, cvp)
+                if builder == 'scalar':
+                    prob.penalty = constrain.add_total_band_constr(model, unit, prob.problem_id, debug_flag, prob.penalty, cvp)
                 # Add Unconstrained Intermittent Generation Forecasts (UIGF) constraint (See AEMO2019Dispatch)
                 if process != 'predispatch':
                     prob.penalty = constrain.add_uigf_constr(model, unit, prob.problem_id, debug_flag, prob.penalty, cvp)
@@ -512,7 +518,8 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
 
 def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_out=default.OUT_DIR,
               dispatchload_path=None, dispatchload_flag=True, hard_flag=False, fcas_flag=True, dual_flag=True,
-              fixed_total_cleared_flag=False, debug_flag=False, batt_no=None, dispatchload_record=False, link_flag=True):
+              fixed_total_cleared_flag=False, debug_flag=False, batt_no=None, dispatchload_record=False, link_flag=True,
+              builder='scalar', template_key=None, warm_start_key=None):
     """Original NEMDE model.
 
     Args:
@@ -530,6 +537,11 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
         fixed_total_cleared_flag (bool): Whether fix generator target or not
         debug_flag (bool): Whether to write debugging information into log file
         batt_no (str): battery number (used to debug)
+        builder (str): 'scalar' or 'matrix' model builder
+        template_key (hashable): key of the model template reused across consecutive intervals (see template.py), or
+                                 None to build a new model
+        warm_start_key (hashable): key to warm start from the last solve of the same key (see solver.optimize), or
+                                   None to solve from scratch
 
     Returns:
         (pathlib.Path, float, dict): path to DISPATCHLOAD file, RRP, FCAS RRP
@@ -543,12 +555,14 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
         predispatch_current = None
     logging.info('----------------------------------------------------------------------------------')
     logging.info(f'Current interval is {current} (No. {interval} starting at {start}) for {process}')
-    with gp.Env() as env, gp.Model(env=env,
-                                   name=f'{process}{default.get_case_datetime(current)}{interval}{iteration}') as model:
+    prob_id = f'{process}_{default.get_case_datetime(predispatch_current if process == "predispatch" else current)}'
+    with template.open_model(f'{process}{default.get_case_datetime(current)}{interval}{iteration}', prob_id,
+                             template_key) as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         prob, model, cvp = dispatch(current, start, predispatch_current, interval, process, model, iteration, custom_unit,
                                     path_to_out, dispatchload_path, dispatchload_flag, fcas_flag=fcas_flag, dual_flag=dual_flag,
-                                    debug_flag=debug_flag, der_flag=False, dispatchload_record=dispatchload_record, link_flag=link_flag)
+                                    debug_flag=debug_flag, der_flag=False, dispatchload_record=dispatchload_record, link_flag=link_flag,
+                                    builder=builder)
         # Calculate marginal prices
         prices = {'NSW1': None, 'VIC1': None, 'SA1': None, 'TAS1': None, 'QLD1': None}
         # Calculate dual variable as marginal price
@@ -572,11 +586,15 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
             # for unit in custom_unit:
             if link_flag:
                 # obj_battery_constr = model.addLConstr(unit.total_cleared, sense=gp.GRB.EQUAL, rhs=0, name=f'Battery_{unit.duid}_{prob.problem_id}')
+                # Fix one direction of Basslink at a time by its upper bound so that the model is built once and
+                # the second solve starts from the retained basis
+                solver.update(model)
                 for link_id in ['BLNKVIC', 'BLNKTAS']:
                     link = prob.links[link_id]
-                    obj_link_constr = model.addLConstr(link.mw_flow, sense=gp.GRB.EQUAL, rhs=0, name=f'BASSLINK_{link_id}_{prob.problem_id}')
+                    link_ub = link.mw_flow.UB
+                    link.mw_flow.UB = 0
                     # Optimize model
-                    model.optimize()
+                    solver.optimize(model, warm_start_key, prob.problem_id)
                     if model.status == gp.GRB.Status.INFEASIBLE or model.status == gp.GRB.Status.INF_OR_UNBD:
                         debug.debug_infeasible_model(model)
                         return None
@@ -594,16 +612,16 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
                         if objVal is None:
                             objective = model.getObjective()
                             objVal = model.objVal
-                            model.remove(obj_link_constr)
+                            link.mw_flow.UB = link_ub
                         else:
                             objVal_temp = model.objVal
                             if objVal <= objVal_temp:
-                                model.remove(obj_link_constr)
+                                link.mw_flow.UB = link_ub
                                 continue
                             else:
                                 objVal = objVal_temp
                                 objective = model.getObjective()
-                                model.remove(obj_link_constr)
+                                link.mw_flow.UB = link_ub
                         # Get dual total_cleared of regional energy balance constraint
                         for region in prob.regions.values():
                             prices[region.region_id] = region.rrp_constr.pi
@@ -670,7 +688,7 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
                 model.setObjective(prob.cost + prob.penalty, gp.GRB.MINIMIZE)
                 path_to_model = path_to_out / process / f'SOS_{default.get_case_datetime(current)}.lp'
                 model.write(str(path_to_model))
-                model.optimize()
+                solver.optimize(model, warm_start_key, prob.problem_id)
                 if model.status == gp.GRB.Status.INFEASIBLE or model.status == gp.GRB.Status.INF_OR_UNBD:
                     debug.debug_infeasible_model(model)
                     return None
@@ -780,8 +798,7 @@ def formulate_sequence(start, e, usage, results=None, times=None, extended_times
         saved_regions, saved_ids = [], []
         last_prob_id = None
         prob = None
-        with gp.Env() as env, gp.Model(env=env,
-                                       name=f'Integration {default.get_case_datetime(start)}') as model:
+        with solver.open_model(f'Integration {default.get_case_datetime(start)}') as model:
             model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
             # Initiate cost and penalty of objective function
             # total_costs, total_penalty = 0, 0
@@ -926,7 +943,9 @@ def formulate_sequence(start, e, usage, results=None, times=None, extended_times
 def get_all_dispatch(start, process, path_to_out, custom_unit=None):
     total = helpers.get_total_intervals(process, start)
     for i in range(total):
-        prices = formulate(start=start, interval=i, process=process, custom_unit=custom_unit, debug_flag=False, path_to_out=path_to_out, dispatchload_flag=False if i == 0 else True)
+        prices = formulate(start=start, interval=i, process=process, custom_unit=custom_unit, debug_flag=False, path_to_out=path_to_out, dispatchload_flag=False if i == 0 else True, template_key=(process, start))
+    template.release_template((process, start))
+    solver.report_solve_stats()
     return prices
 
 
@@ -11,6 +11,8 @@ import logging
 import offer
 import parse
 import result
+import solver
+import template
 from preprocess import get_market_price
 
 RENEWABLE_RATE = 2
@@ -447,7 +449,8 @@ def dispatch(current, start, predispatch_current, interval, process, model, iter
 def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_out=default.OUT_DIR, batteries=None,
               constr_flag=True, dispatchload_path=None, dispatchload_flag=True, hard_flag=False, fcas_flag=True,
               dual_flag=True, der_flag=False, losses_flag=True, fixed_total_cleared_flag=False, debug_flag=False,
-              batt_no=None, dispatchload_record=True, link_flag=True, intervals=None, renewable_flag=False):
+              batt_no=None, dispatchload_record=True, link_flag=True, intervals=None, renewable_flag=False,
+              template_key=None, warm_start_key=None):
     """Original NEMDE model.
 
     Args:
@@ -465,6 +468,10 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
         fixed_total_cleared_flag (bool): Whether fix generator target or not
         debug_flag (bool): Whether to write debugging information into log file
         batt_no (str): battery number (used to debug)
+        template_key (hashable): key of the model template reused across consecutive intervals (see template.py), or
+                                 None to build a new model
+        warm_start_key (hashable): key to warm start from the last solve of the same key (see solver.optimize), or
+                                   None to solve from scratch
 
     Returns:
         (pathlib.Path, float, dict): path to DISPATCHLOAD file, RRP, FCAS RRP
@@ -482,8 +489,9 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
         predispatch_current = None
     logging.info('----------------------------------------------------------------------------------')
     logging.info(f'Current interval is {current} (No. {interval} starting at {start}) for {process}')
-    with gp.Env() as env, gp.Model(env=env,
-                                   name=f'{process}{default.get_case_datetime(current)}{interval}{iteration}') as model:
+    prob_id = f'{process}_{default.get_case_datetime(predispatch_current if process == "predispatch" else current)}'
+    with template.open_model(f'{process}{default.get_case_datetime(current)}{interval}{iteration}', prob_id,
+                             template_key) as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         prob, model, cvp = dispatch(current, start, predispatch_current, interval, process, model, iteration,
                                     custom_unit, path_to_out, dispatchload_path, dispatchload_flag, fcas_flag=fcas_flag,
@@ -513,11 +521,15 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
             # for unit in custom_unit:
             if link_flag:
                 # obj_battery_constr = model.addLConstr(unit.total_cleared, sense=gp.GRB.EQUAL, rhs=0, name=f'Battery_{unit.duid}_{prob.problem_id}')
+                # Fix one direction of Basslink at a time by its upper bound so that the model is built once and
+                # the second solve starts from the retained basis
+                solver.update(model)
                 for link_id in ['BLNKVIC', 'BLNKTAS']:
                     link = prob.links[link_id]
-                    obj_link_constr = model.addLConstr(link.mw_flow, sense=gp.GRB.EQUAL, rhs=0, name=f'BASSLINK_{link_id}_{prob.problem_id}')
+                    link_ub = link.mw_flow.UB
+                    link.mw_flow.UB = 0
                     # Optimize model
-                    model.optimize()
+                    solver.optimize(model, warm_start_key, prob.problem_id)
                     if model.status == gp.GRB.Status.INFEASIBLE or model.status == gp.GRB.Status.INF_OR_UNBD:
                         debug.debug_infeasible_model(model)
                         return None
@@ -525,16 +537,16 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
                         if objVal is None:
                             objective = model.getObjective()
                             objVal = model.objVal
-                            model.remove(obj_link_constr)
+                            link.mw_flow.UB = link_ub
                         else:
                             objVal_temp = model.objVal
                             if objVal <= objVal_temp:
-                                model.remove(obj_link_constr)
+                                link.mw_flow.UB = link_ub
                                 continue
                             else:
                                 objVal = objVal_temp
                                 objective = model.getObjective()
-                                model.remove(obj_link_constr)
+                                link.mw_flow.UB = link_ub
                         # Get dual total_cleared of regional energy balance constraint
                         for region in prob.regions.values():
                             prices[region.region_id] = region.rrp_constr.pi
@@ -585,7 +597,7 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
                             # model.write(str(path_to_model))
                 # model.remove(obj_battery_constr)
             else:
-                model.optimize()
+                solver.optimize(model, warm_start_key, prob.problem_id)
                 path_to_model = path_to_out / process / f'{process}_{default.get_case_datetime(current)}.lp'
                 # model.write(str(path_to_model))
                 for region in prob.regions.values():
@@ -632,7 +644,7 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
                     model.addLConstr(prob.penalty, sense=gp.GRB.EQUAL, rhs=0, name='PENALTY_CONSTR')
                 model.setObjective(prob.cost + prob.penalty, gp.GRB.MINIMIZE)
 
-                model.optimize()
+                solver.optimize(model, warm_start_key, prob.problem_id)
                 if model.status == gp.GRB.Status.INFEASIBLE or model.status == gp.GRB.Status.INF_OR_UNBD:
                     debug.debug_infeasible_model(model)
                     return None
@@ -666,7 +678,7 @@ def formulate(start, interval, process, iteration=0, custom_unit=None, path_to_o
         #         prob.penalty = add_regional_energy_demand_supply_balance_constr(model, region, region_id, prob.problem_id, debug_flag, prob.penalty, cvp)
         #     # Set objective
         #     model.setObjective(prob.cost + prob.penalty, gp.GRB.MINIMIZE)
-        #     model.optimize()
+        #     solver.optimize(model, warm_start_key, prob.problem_id)
         #     fixed = model.fixed()
         #     fixed.optimize()
         #     for region_id, region in prob.regions.items():
@@ -7,6 +7,7 @@ import numpy as np
 import datetime
 import csv
 import gurobipy as gp
+import solver
 from pandas.plotting import register_matplotlib_converters
 register_matplotlib_converters()
 import matplotlib.pyplot as plt
@@ -406,7 +407,7 @@ def uplift(times, prices, battery, bidding_prices, transition_prices=None):
     tstep = 1
     E_initial = 0.5 * battery.size
     obj = 0
-    with gp.Env() as env, gp.Model(env=env, name=f'price-taker_{battery.name}') as model:
+    with solver.open_model(f'price-taker_{battery.name}') as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         # Battery variables
         E = [model.addVar(lb=battery.Emin, ub=battery.Emax, name=f'E_{j}') for j in range(T)]  # Battery charge level (MWh)
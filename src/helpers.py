@@ -1,5 +1,7 @@
+import datetime
 import json
 import default
+import preprocess
 from offer import Unit, EnergyBid, FcasBid
 
 
@@ -47,15 +49,36 @@ def condition3(process, dis, pre, rhs):
     return (c1 or c2) and c3
 
 
+cvp_factors = None  # Predefined CVP factors
+predispatch_intervals = None  # Number of predispatch intervals of each start time, i.e. {'HH:MM': intervals}
+
+
 def read_cvp():
-    """Read predefined CVP factors.
+    """Read predefined CVP factors. The file is read once per process.
 
     Returns:
         dict: a dictionary of CVP factors
     """
-    input_dir = default.DATA_DIR / 'CVP.json'
-    with input_dir.open() as f:
-        return json.load(f)
+    global cvp_factors
+    if cvp_factors is None:
+        input_dir = default.DATA_DIR / 'CVP.json'
+        with input_dir.open() as f:
+            cvp_factors = json.load(f)
+    return dict(cvp_factors)
+
+
+def read_predispatch_intervals():
+    """Read the number of predispatch intervals of each start time. The file is read once per process.
+
+    Returns:
+        dict: {'HH:MM': number of intervals}
+    """
+    global predispatch_intervals
+    if predispatch_intervals is None:
+        pre_dir = default.DATA_DIR / 'predispatch_intervals.json'
+        with pre_dir.open() as f:
+            predispatch_intervals = json.load(f)
+    return predispatch_intervals
 
 
 def get_total_intervals(process, start_time=None):
@@ -75,9 +98,26 @@ def get_total_intervals(process, start_time=None):
     elif process == 'p5min' or process == 'P5MIN':
         return p5min_intervals
     else:
-        pre_dir = default.DATA_DIR / 'predispatch_intervals.json'
-        with pre_dir.open() as f:
-            return json.load(f)[start_time.strftime('%H:%M')]
+        return read_predispatch_intervals()[start_time.strftime('%H:%M')]
+
+
+def load_static_reference(start, end=None):
+    """Load market price thresholds of the months between start and end, CVP factors and predispatch intervals. Called
+    before creating a pool so that forked workers share the loaded data instead of reading the files again.
+
+    Args:
+        start (datetime.datetime): start datetime
+        end (datetime.datetime): end datetime (inclusive), or None for start only
+
+    Returns:
+        None
+    """
+    read_cvp()
+    read_predispatch_intervals()
+    month = datetime.datetime(start.year, start.month, 1)
+    while month <= (start if end is None else end):
+        preprocess.get_market_price_thresholds(month)
+        month = datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
 
 
 class Battery:
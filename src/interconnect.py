@@ -3,11 +3,69 @@ import datetime
 import default
 import gurobipy as gp
 import logging
+import mms
+import numpy as np
 import predefine
 import preprocess
 
 log = logging.getLogger(__name__)
 intervention = '0'
+# DISPATCHIS columns: attribute (or FCAS type) of the record
+REGIONSUM_RECORDS = {
+    'AVAILABLEGENERATION': 'available_generation_record',
+    'AVAILABLELOAD': 'available_load_record',
+    'DISPATCHABLEGENERATION': 'dispatchable_generation_record',
+    'DISPATCHABLELOAD': 'dispatchable_load_record',
+    'NETINTERCHANGE': 'net_interchange_record',
+    'UIGF': 'uigf_record'
+}
+REGIONSUM_FCAS_RECORDS = {
+    'LOWER5MINLOCALDISPATCH': 'LOWER5MIN',
+    'LOWER60SECLOCALDISPATCH': 'LOWER60SEC',
+    'LOWER6SECLOCALDISPATCH': 'LOWER6SEC',
+    'RAISE5MINLOCALDISPATCH': 'RAISE5MIN',
+    'RAISE60SECLOCALDISPATCH': 'RAISE60SEC',
+    'RAISE6SECLOCALDISPATCH': 'RAISE6SEC',
+    'LOWERREGLOCALDISPATCH': 'LOWERREG',
+    'RAISEREGLOCALDISPATCH': 'RAISEREG'
+}
+PRICE_FCAS_RECORDS = {
+    'RAISE6SECRRP': 'RAISE6SEC',
+    'RAISE60SECRRP': 'RAISE60SEC',
+    'RAISE5MINRRP': 'RAISE5MIN',
+    'RAISEREGRRP': 'RAISEREG',
+    'LOWER6SECRRP': 'LOWER6SEC',
+    'LOWER60SECRRP': 'LOWER60SEC',
+    'LOWER5MINRRP': 'LOWER5MIN',
+    'LOWERREGRRP': 'LOWERREG'
+}
+INTERCONNECTORRES_RECORDS = {
+    'MWLOSSES': 'mw_losses_record',
+    'MARGINALVALUE': 'marginal_value_record',
+    'VIOLATIONDEGREE': 'violation_degree_record',
+    'EXPORTLIMIT': 'export_limit_record',
+    'IMPORTLIMIT': 'import_limit_record',
+    'MARGINALLOSS': 'marginal_loss_record'
+}
+CASE_SOLUTION_VIOLATIONS = {
+    'TOTALAREAGENVIOLATION': 'total_area_gen_violation',
+    'TOTALINTERCONNECTORVIOLATION': 'total_interconnector_violation',
+    'TOTALGENERICVIOLATION': 'total_generic_violation',
+    'TOTALRAMPRATEVIOLATION': 'total_ramp_rate_violation',
+    'TOTALUNITMWCAPACITYVIOLATION': 'total_unit_mw_capacity_violation',
+    'TOTAL5MINVIOLATION': 'total_5min_violation',
+    'TOTALREGVIOLATION': 'total_reg_violation',
+    'TOTAL6SECVIOLATION': 'total_6sec_violation',
+    'TOTAL60SECVIOLATION': 'total_60sec_violation',
+    'TOTALASPROFILEVIOLATION': 'total_as_profile_violation',
+    'TOTALFASTSTARTVIOLATION': 'total_fast_start_violation',
+    'TOTALENERGYOFFERVIOLATION': 'total_energy_offer_violation'
+}
+# Violations of CASESOLUTION (P5MIN) and CASE_SOLUTION (PREDISPATCHIS) tables
+RUN_CASE_SOLUTION_VIOLATIONS = {**CASE_SOLUTION_VIOLATIONS, 'TOTALENERGYCONSTRVIOLATION': 'total_energy_constr_violation'}
+RUN_INTERCONNECTOR_RECORDS = {**INTERCONNECTORRES_RECORDS, 'FCASEXPORTLIMIT': 'fcas_export_limit_record',
+                              'FCASIMPORTLIMIT': 'fcas_import_limit_record'}
+run_tables = {}  # Decoded tables of the latest run file, i.e. {(path to run file, intervention, debug flag): tables}
 
 
 class Solution:
@@ -238,44 +296,36 @@ def init_interconnectors():
 
 
 def add_interconnector_constraint(interconnectors, t):
-    ic_dir = preprocess.download_dvd_data('INTERCONNECTORCONSTRAINT', t)
-    with ic_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[6]) <= t:
-                ic = interconnectors.get(row[8])
-                if ic:
-                    ic.from_region_loss_share = float(row[5])
-                    # ic.max_mw_in = float(row[9])
-                    # ic.max_mw_out = float(row[10])
-                    ic.loss_constant = float(row[11])
-                    ic.loss_flow_coefficient = float(row[12])
-                    ic.import_limit = int(row[17])
-                    ic.export_limit = int(row[18])
-                    # ic.fcas_support_unavailable = int(row[24])
-                    # ic.ic_type = row[25]
+    index = preprocess.index_dvd_data('INTERCONNECTORCONSTRAINT', t, (8,), 6)
+    for ic_id, ic in interconnectors.items():
+        for row in preprocess.get_effective_rows(index, (ic_id,), t):
+            ic.from_region_loss_share = float(row[5])
+            # ic.max_mw_in = float(row[9])
+            # ic.max_mw_out = float(row[10])
+            ic.loss_constant = float(row[11])
+            ic.loss_flow_coefficient = float(row[12])
+            ic.import_limit = int(row[17])
+            ic.export_limit = int(row[18])
+            # ic.fcas_support_unavailable = int(row[24])
+            # ic.ic_type = row[25]
 
 
 def add_loss_factor_model(interconnectors, t):
-    lfm_dir = preprocess.download_dvd_data('LOSSFACTORMODEL', t)
-    with lfm_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[4]) <= t:
-                ic = interconnectors.get(row[6])
-                if ic:
-                    ic.demand_coefficient[row[7]] = float(row[8])
+    index = preprocess.index_dvd_data('LOSSFACTORMODEL', t, (6, 7), 4)
+    for key in index:
+        ic = interconnectors.get(key[0])
+        if ic:
+            for row in preprocess.get_effective_rows(index, key, t):
+                ic.demand_coefficient[row[7]] = float(row[8])
 
 
 def add_loss_model(interconnectors, t):
-    lm_dir = preprocess.download_dvd_data('LOSSMODEL', t)
-    with lm_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[4]) <= t:
-                ic = interconnectors.get(row[6])
-                if ic:
-                    ic.mw_breakpoint[int(row[8])] = float(row[9])
+    index = preprocess.index_dvd_data('LOSSMODEL', t, (6, 8), 4)
+    for key in index:
+        ic = interconnectors.get(key[0])
+        if ic:
+            for row in preprocess.get_effective_rows(index, key, t):
+                ic.mw_breakpoint[int(row[8])] = float(row[9])
 
 
 class Link:
@@ -564,89 +614,110 @@ def add_dispatchis_record(regions, interconnectors, t, fcas_flag, debug_flag):
     """
     solution = None
     dispatch_dir = preprocess.download_dispatch_summary(t)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGIONSUM' and row[8] == intervention:
-                region = regions[row[6]]
-                region.total_demand = float(row[9])
-                if debug_flag:
-                    region.available_generation_record = float(row[10])
-                    region.available_load_record = float(row[11])
-                    region.dispatchable_generation_record = float(row[13])
-                    region.dispatchable_load_record = float(row[14])
-                    region.net_interchange_record = float(row[15])
-                    if fcas_flag:
-                        region.fcas_local_dispatch_record['LOWER5MIN'] = float(row[19])
-                        region.fcas_local_dispatch_record['LOWER60SEC'] = float(row[27])
-                        region.fcas_local_dispatch_record['LOWER6SEC'] = float(row[35])
-                        region.fcas_local_dispatch_record['RAISE5MIN'] = float(row[43])
-                        region.fcas_local_dispatch_record['RAISE60SEC'] = float(row[51])
-                        region.fcas_local_dispatch_record['RAISE6SEC'] = float(row[59])
-                        region.fcas_local_dispatch_record['LOWERREG'] = float(row[71])
-                        region.fcas_local_dispatch_record['RAISEREG'] = float(row[75])
-                    # region.lower5min_local_dispatch_record = float(row[19])
-                    # region.lower60sec_local_dispatch_record = float(row[27])
-                    # region.lower6sec_local_dispatch_record = float(row[35])
-                    # region.raise5min_local_dispatch_record = float(row[43])
-                    # region.raise60sec_local_dispatch_record = float(row[51])
-                    # region.raise6sec_local_dispatch_record = float(row[59])
-                    # region.lowerreg_local_dispatch_record = float(row[71])
-                    # region.raisereg_local_dispatch_record = float(row[75])
-                    region.uigf_record = float(row[106])
-            elif debug_flag and row[0] == 'D' and row[2] == 'PRICE' and row[8] == intervention:
-                region = regions[row[6]]
-                region.rrp_record = float(row[9])
-                region.rop_record = float(row[11])
-                if fcas_flag:
-                    region.fcas_rrp_record['RAISE6SEC'] = float(row[15])
-                    region.fcas_rrp_record['RAISE60SEC'] = float(row[18])
-                    region.fcas_rrp_record['RAISE5MIN'] = float(row[21])
-                    region.fcas_rrp_record['RAISEREG'] = float(row[24])
-                    region.fcas_rrp_record['LOWER6SEC'] = float(row[27])
-                    region.fcas_rrp_record['LOWER60SEC'] = float(row[30])
-                    region.fcas_rrp_record['LOWER5MIN'] = float(row[33])
-                    region.fcas_rrp_record['LOWERREG'] = float(row[36])
-                # region.raise6sec_rrp_record = float(row[15])
-                # region.raise60sec_rrp_record = float(row[18])
-                # region.raise5min_rrp_record = float(row[21])
-                # region.raisereg_rrp_record = float(row[24])
-                # region.lower6sec_rrp_record = float(row[27])
-                # region.lower60sec_rrp_record = float(row[30])
-                # region.lower5min_rrp_record = float(row[33])
-                # region.lowerreg_rrp_record = float(row[36])
-            elif debug_flag and row[0] == 'D' and row[2] == 'CASE_SOLUTION':
-                solution = Solution()
-                solution.intervention = row[6]
-                solution.case_subtype = row[7]
-                solution.solution_status = int(row[8])
-                solution.spd_version = row[9]
-                solution.non_physical_losses = int(row[10])
-                solution.total_objective = float(row[11])
-                solution.violations['total_area_gen_violation'] = float(row[12])
-                solution.violations['total_interconnector_violation'] = float(row[13])
-                solution.violations['total_generic_violation'] = float(row[14])
-                solution.violations['total_ramp_rate_violation'] = float(row[15])
-                solution.violations['total_unit_mw_capacity_violation'] = float(row[16])
-                solution.violations['total_5min_violation'] = float(row[17]) if row[17] != '' else 0
-                solution.violations['total_reg_violation'] = float(row[18]) if row[18] != '' else 0
-                solution.violations['total_6sec_violation'] = float(row[19]) if row[19] != '' else 0
-                solution.violations['total_60sec_violation'] = float(row[20]) if row[20] != '' else 0
-                solution.violations['total_as_profile_violation'] = float(row[21])
-                solution.violations['total_fast_start_violation'] = float(row[22])
-                solution.violations['total_energy_offer_violation'] = float(row[23])
-                solution.total_violation = sum(solution.violations.values())
-            elif row[0] == 'D' and row[2] == 'INTERCONNECTORRES' and row[8] == intervention:
-                interconnector = interconnectors[row[6]]
-                interconnector.metered_mw_flow = float(row[9])
-                interconnector.mw_flow_record = float(row[10])
-                if debug_flag:
-                    interconnector.mw_losses_record = float(row[11])
-                    interconnector.marginal_value_record = float(row[12])
-                    interconnector.violation_degree_record = float(row[13])
-                    interconnector.export_limit_record = float(row[15])
-                    interconnector.import_limit_record = float(row[16])
-                    interconnector.marginal_loss_record = float(row[17])
+    schemas = {
+        'REGIONSUM': {'REGIONID': mms.STR, 'TOTALDEMAND': mms.FLOAT},
+        'INTERCONNECTORRES': {'INTERCONNECTORID': mms.STR, 'METEREDMWFLOW': mms.FLOAT, 'MWFLOW': mms.FLOAT}
+    }
+    where = {'REGIONSUM': {'INTERVENTION': intervention}, 'INTERCONNECTORRES': {'INTERVENTION': intervention}}
+    if debug_flag:
+        schemas['REGIONSUM'].update({column: mms.FLOAT for column in REGIONSUM_RECORDS})
+        schemas['INTERCONNECTORRES'].update({column: mms.FLOAT for column in INTERCONNECTORRES_RECORDS})
+        schemas['PRICE'] = {'REGIONID': mms.STR, 'RRP': mms.FLOAT, 'ROP': mms.FLOAT}
+        where['PRICE'] = {'INTERVENTION': intervention}
+        if fcas_flag:
+            schemas['REGIONSUM'].update({column: mms.FLOAT for column in REGIONSUM_FCAS_RECORDS})
+            schemas['PRICE'].update({column: mms.FLOAT for column in PRICE_FCAS_RECORDS})
+        schemas['CASE_SOLUTION'] = {'INTERVENTION': mms.STR, 'CASESUBTYPE': mms.STR, 'SOLUTIONSTATUS': mms.INT,
+                                    'SPDVERSION': mms.STR, 'NONPHYSICALLOSSES': mms.INT, 'TOTALOBJECTIVE': mms.FLOAT}
+        schemas['CASE_SOLUTION'].update({column: mms.FLOAT for column in CASE_SOLUTION_VIOLATIONS})
+    tables = mms.read_tables(dispatch_dir, schemas, where)
+    for record in mms.iter_records(tables['REGIONSUM']):
+        region = regions[record['REGIONID']]
+        region.total_demand = record['TOTALDEMAND']
+        if debug_flag:
+            for column, attribute in REGIONSUM_RECORDS.items():
+                setattr(region, attribute, record[column])
+            if fcas_flag:
+                for column, bid_type in REGIONSUM_FCAS_RECORDS.items():
+                    region.fcas_local_dispatch_record[bid_type] = record[column]
+    for record in mms.iter_records(tables.get('PRICE', {})):
+        region = regions[record['REGIONID']]
+        region.rrp_record = record['RRP']
+        region.rop_record = record['ROP']
+        if fcas_flag:
+            for column, bid_type in PRICE_FCAS_RECORDS.items():
+                region.fcas_rrp_record[bid_type] = record[column]
+    for record in mms.iter_records(tables.get('CASE_SOLUTION', {})):
+        solution = Solution()
+        solution.intervention = record['INTERVENTION']
+        solution.case_subtype = record['CASESUBTYPE']
+        solution.solution_status = int(record['SOLUTIONSTATUS'])
+        solution.spd_version = record['SPDVERSION']
+        solution.non_physical_losses = int(record['NONPHYSICALLOSSES'])
+        solution.total_objective = record['TOTALOBJECTIVE']
+        for column, violation in CASE_SOLUTION_VIOLATIONS.items():
+            solution.violations[violation] = 0 if np.isnan(record[column]) else record[column]
+        solution.total_violation = sum(solution.violations.values())
+    for record in mms.iter_records(tables['INTERCONNECTORRES']):
+        interconnector = interconnectors[record['INTERCONNECTORID']]
+        interconnector.metered_mw_flow = record['METEREDMWFLOW']
+        interconnector.mw_flow_record = record['MWFLOW']
+        if debug_flag:
+            for column, attribute in INTERCONNECTORRES_RECORDS.items():
+                setattr(interconnector, attribute, record[column])
+    return solution
+
+
+def get_run_tables(p, schemas, where, debug_flag):
+    """Decode the run file once. Only the latest run is kept in memory because intervals of a run are formulated one
+    after another.
+
+    Args:
+        p (pathlib.Path): path to the run file, i.e. P5MIN or PREDISPATCHIS file
+        schemas (dict): {table name: {column name: column type}}
+        where (dict): {table name: {column name: raw string}} to keep matched rows only
+        debug_flag (bool): whether the schemas include debug records or not
+
+    Returns:
+        dict: {table name: {column name: numpy.ndarray}}
+    """
+    key = (p, intervention, debug_flag)
+    if key not in run_tables:
+        run_tables.clear()
+        run_tables[key] = mms.read_tables(p, schemas, where)
+    return run_tables[key]
+
+
+def iter_interval_records(batch, column, value):
+    """Iterate records of the given interval (or period) of a run table.
+
+    Args:
+        batch (dict): {column name: numpy.ndarray}
+        column (str): interval column, i.e. INTERVAL_DATETIME or PERIODID
+        value (numpy.datetime64 or int): interval datetime or period ID
+
+    Returns:
+        generator: {column name: value} of each row
+    """
+    return mms.iter_records(mms.select(batch, batch[column] == value))
+
+
+def add_run_solution(record, violations):
+    """Create solution instance from case solution record of a run.
+
+    Args:
+        record (dict): case solution record
+        violations (dict): {column name: violation attribute}
+
+    Returns:
+        Solution: solution instance
+    """
+    solution = Solution()
+    solution.non_physical_losses = int(record['NONPHYSICALLOSSES'])
+    solution.total_objective = record['TOTALOBJECTIVE']
+    for column, violation in violations.items():
+        solution.violations[violation] = 0 if np.isnan(record[column]) else record[column]
+    solution.total_violation = sum(solution.violations.values())
     return solution
 
 
@@ -665,75 +736,50 @@ def add_predispatch_record(regions, interconnectors, i, start, debug_flag):
     """
     solution = None
     dispatch_dir = preprocess.download_predispatch(start)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGION_SOLUTION' and int(row[7]) == i + 1 and row[8] == intervention:  # 7: Period ID; 8: Intervention flag
-                region = regions[row[6]]
-                region.total_demand = float(row[9])
-                if debug_flag:
-                    region.available_generation_record = float(row[10])
-                    region.available_load_record = float(row[11])
-                    region.dispatchable_generation_record = float(row[13])
-                    region.dispatchable_load_record = float(row[14])
-                    region.net_interchange_record = float(row[15])
-                    region.fcas_local_dispatch_record['LOWER5MIN'] = float(row[19])
-                    region.fcas_local_dispatch_record['LOWER60SEC'] = float(row[27])
-                    region.fcas_local_dispatch_record['LOWER6SEC'] = float(row[35])
-                    region.fcas_local_dispatch_record['RAISE5MIN'] = float(row[43])
-                    region.fcas_local_dispatch_record['RAISE60SEC'] = float(row[51])
-                    region.fcas_local_dispatch_record['RAISE6SEC'] = float(row[59])
-                    region.fcas_local_dispatch_record['LOWERREG'] = float(row[70])
-                    region.fcas_local_dispatch_record['RAISEREG'] = float(row[74])
-                    region.uigf_record = float(row[106])
-            elif debug_flag and row[0] == 'D' and row[2] == 'REGION_PRICES' and int(row[7]) == i + 1 and row[8] == intervention:
-                region = regions[row[6]]
-                region.rrp_record = float(row[9])
-                region.fcas_rrp_record['RAISE6SEC'] = float(row[29])
-                region.fcas_rrp_record['RAISE60SEC'] = float(row[30])
-                region.fcas_rrp_record['RAISE5MIN'] = float(row[31])
-                region.fcas_rrp_record['RAISEREG'] = float(row[32])
-                region.fcas_rrp_record['LOWER6SEC'] = float(row[33])
-                region.fcas_rrp_record['LOWER60SEC'] = float(row[34])
-                region.fcas_rrp_record['LOWER5MIN'] = float(row[35])
-                region.fcas_rrp_record['LOWERREG'] = float(row[36])
-            elif debug_flag and row[0] == 'D' and row[2] == 'CASE_SOLUTION':
-                solution = Solution()
-                # solution.intervention = row[6]
-                # solution.case_subtype = row[7]
-                solution.solution_status = int(row[6])
-                solution.spd_version = row[7]
-                solution.non_physical_losses = int(row[8])
-                solution.total_objective = float(row[9])
-                solution.violations['total_area_gen_violation'] = float(row[10])
-                solution.violations['total_interconnector_violation'] = float(row[11])
-                solution.violations['total_generic_violation'] = float(row[12])
-                solution.violations['total_ramp_rate_violation'] = float(row[13])
-                solution.violations['total_unit_mw_capacity_violation'] = float(row[14])
-                solution.violations['total_5min_violation'] = float(row[15]) if row[15] != '' else 0
-                solution.violations['total_reg_violation'] = float(row[16]) if row[16] != '' else 0
-                solution.violations['total_6sec_violation'] = float(row[17]) if row[17] != '' else 0
-                solution.violations['total_60sec_violation'] = float(row[18]) if row[18] != '' else 0
-                solution.violations['total_as_profile_violation'] = float(row[19])
-                # solution.violations['total_fast_start_violation'] = float(row[22])
-                solution.violations['total_energy_constr_violation'] = float(row[20])
-                solution.violations['total_energy_offer_violation'] = float(row[21])
-                solution.total_violation = sum(solution.violations.values())
-            elif row[0] == 'D' and row[2] == 'INTERCONNECTOR_SOLN' and int(row[7]) == i + 1 and row[8] == intervention:
-                ic = interconnectors[row[6]]
-                ic.metered_mw_flow = float(row[9])
-                ic.mw_flow_record = float(row[10])
-                if debug_flag:
-                    ic.mw_losses_record = float(row[11])
-                    ic.marginal_value_record = float(row[12])
-                    ic.violation_degree_record = float(row[13])
-                    ic.export_limit_record = float(row[16])
-                    ic.import_limit_record = float(row[17])
-                    ic.marginal_loss_record = float(row[18])
-                    ic.fcas_export_limit_record = float(row[21])
-                    ic.fcas_import_limit_record = float(row[22])
+    schemas = {
+        'REGION_SOLUTION': {'REGIONID': mms.STR, 'PERIODID': mms.INT, 'TOTALDEMAND': mms.FLOAT},
+        'INTERCONNECTOR_SOLN': {'INTERCONNECTORID': mms.STR, 'PERIODID': mms.INT, 'METEREDMWFLOW': mms.FLOAT,
+                                'MWFLOW': mms.FLOAT}
+    }
+    where = {table: {'INTERVENTION': intervention} for table in ['REGION_SOLUTION', 'REGION_PRICES', 'INTERCONNECTOR_SOLN']}
+    violations = {column: violation for column, violation in RUN_CASE_SOLUTION_VIOLATIONS.items()
+                  if column != 'TOTALFASTSTARTVIOLATION'}
+    if debug_flag:
+        schemas['REGION_SOLUTION'].update({column: mms.FLOAT for column in {**REGIONSUM_RECORDS, **REGIONSUM_FCAS_RECORDS}})
+        schemas['REGION_PRICES'] = {'REGIONID': mms.STR, 'PERIODID': mms.INT, 'RRP': mms.FLOAT}
+        schemas['REGION_PRICES'].update({column: mms.FLOAT for column in PRICE_FCAS_RECORDS})
+        schemas['CASE_SOLUTION'] = {'SOLUTIONSTATUS': mms.INT, 'SPDVERSION': mms.STR, 'NONPHYSICALLOSSES': mms.INT,
+                                    'TOTALOBJECTIVE': mms.FLOAT}
+        schemas['CASE_SOLUTION'].update({column: mms.FLOAT for column in violations})
+        schemas['INTERCONNECTOR_SOLN'].update({column: mms.FLOAT for column in RUN_INTERCONNECTOR_RECORDS})
+    tables = get_run_tables(dispatch_dir, schemas, where, debug_flag)
+    for record in iter_interval_records(tables['REGION_SOLUTION'], 'PERIODID', i + 1):
+        region = regions[record['REGIONID']]
+        region.total_demand = record['TOTALDEMAND']
+        if debug_flag:
+            for column, attribute in REGIONSUM_RECORDS.items():
+                setattr(region, attribute, record[column])
+            for column, bid_type in REGIONSUM_FCAS_RECORDS.items():
+                region.fcas_local_dispatch_record[bid_type] = record[column]
+    if debug_flag:
+        for record in iter_interval_records(tables['REGION_PRICES'], 'PERIODID', i + 1):
+            region = regions[record['REGIONID']]
+            region.rrp_record = record['RRP']
+            for column, bid_type in PRICE_FCAS_RECORDS.items():
+                region.fcas_rrp_record[bid_type] = record[column]
+        for record in mms.iter_records(tables['CASE_SOLUTION']):
+            solution = add_run_solution(record, violations)
+            solution.solution_status = int(record['SOLUTIONSTATUS'])
+            solution.spd_version = record['SPDVERSION']
+    for record in iter_interval_records(tables['INTERCONNECTOR_SOLN'], 'PERIODID', i + 1):
+        ic = interconnectors[record['INTERCONNECTORID']]
+        ic.metered_mw_flow = record['METEREDMWFLOW']
+        ic.mw_flow_record = record['MWFLOW']
+        if debug_flag:
+            for column, attribute in RUN_INTERCONNECTOR_RECORDS.items():
+                setattr(ic, attribute, record[column])
     return solution
-                
+
 
 def add_p5min_record(regions, interconnectors, t, start, debug_flag):
     """Add P5MIN region and interconnector record from P5MIN file.
@@ -749,69 +795,43 @@ def add_p5min_record(regions, interconnectors, t, start, debug_flag):
     """
     solution = None
     dispatch_dir = preprocess.download_5min_predispatch(start)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGIONSOLUTION' and default.extract_datetime(row[6]) == t and row[5] == intervention:
-                region = regions[row[7]]
-                region.total_demand = float(row[27])
-                if debug_flag:
-                    region.rrp_record = float(row[8])
-                    region.rop_record = float(row[9])
-                    region.fcas_rrp_record['RAISE6SEC'] = float(row[11])
-                    region.fcas_rrp_record['RAISE60SEC'] = float(row[13])
-                    region.fcas_rrp_record['RAISE5MIN'] = float(row[15])
-                    region.fcas_rrp_record['RAISEREG'] = float(row[17])
-                    region.fcas_rrp_record['LOWER6SEC'] = float(row[19])
-                    region.fcas_rrp_record['LOWER60SEC'] = float(row[21])
-                    region.fcas_rrp_record['LOWER5MIN'] = float(row[23])
-                    region.fcas_rrp_record['LOWERREG'] = float(row[25])
-                    region.available_generation_record = float(row[28])
-                    region.available_load_record = float(row[29])
-                    region.dispatchable_generation_record = float(row[31])
-                    region.dispatchable_load_record = float(row[32])
-                    region.net_interchange_record = float(row[33])
-                    region.fcas_local_dispatch_record['LOWER5MIN'] = float(row[36])
-                    region.fcas_local_dispatch_record['LOWER60SEC'] = float(row[41])
-                    region.fcas_local_dispatch_record['LOWER6SEC'] = float(row[46])
-                    region.fcas_local_dispatch_record['RAISE5MIN'] = float(row[51])
-                    region.fcas_local_dispatch_record['RAISE60SEC'] = float(row[56])
-                    region.fcas_local_dispatch_record['RAISE6SEC'] = float(row[61])
-                    region.fcas_local_dispatch_record['LOWERREG'] = float(row[69])
-                    region.fcas_local_dispatch_record['RAISEREG'] = float(row[74])
-                    region.uigf_record = float(row[96])
-            elif debug_flag and row[0] == 'D' and row[2] == 'CASESOLUTION':
-                solution = Solution()
-                solution.intervention = row[6]
-                solution.total_objective = float(row[7])
-                solution.non_physical_losses = int(row[8])
-                solution.violations['total_area_gen_violation'] = float(row[9])
-                solution.violations['total_interconnector_violation'] = float(row[10])
-                solution.violations['total_generic_violation'] = float(row[11])
-                solution.violations['total_ramp_rate_violation'] = float(row[12])
-                solution.violations['total_unit_mw_capacity_violation'] = float(row[13])
-                solution.violations['total_5min_violation'] = float(row[14]) if row[14] != '' else 0
-                solution.violations['total_reg_violation'] = float(row[15]) if row[15] != '' else 0
-                solution.violations['total_6sec_violation'] = float(row[16]) if row[16] != '' else 0
-                solution.violations['total_60sec_violation'] = float(row[17]) if row[17] != '' else 0
-                solution.violations['total_as_profile_violation'] = float(row[20])
-                solution.violations['total_fast_start_violation'] = float(row[21])
-                solution.violations['total_energy_offer_violation'] = float(row[19])
-                solution.violations['total_energy_constr_violation'] = float(row[18])
-                solution.total_violation = sum(solution.violations.values())
-            elif row[0] == 'D' and row[2] == 'INTERCONNECTORSOLN' and default.extract_datetime(row[7]) == t and row[5] == intervention:
-                ic = interconnectors[row[6]]
-                ic.metered_mw_flow = float(row[8])
-                ic.mw_flow_record = float(row[9])
-                if debug_flag:
-                    ic.mw_losses_record = float(row[10])
-                    ic.marginal_value_record = float(row[11])
-                    ic.violation_degree_record = float(row[12])
-                    ic.export_limit_record = float(row[14])
-                    ic.import_limit_record = float(row[15])
-                    ic.marginal_loss_record = float(row[16])
-                    ic.fcas_export_limit_record = float(row[19])
-                    ic.fcas_import_limit_record = float(row[20])
+    schemas = {
+        'REGIONSOLUTION': {'REGIONID': mms.STR, 'INTERVAL_DATETIME': mms.DATETIME, 'TOTALDEMAND': mms.FLOAT},
+        'INTERCONNECTORSOLN': {'INTERCONNECTORID': mms.STR, 'INTERVAL_DATETIME': mms.DATETIME,
+                               'METEREDMWFLOW': mms.FLOAT, 'MWFLOW': mms.FLOAT}
+    }
+    where = {table: {'INTERVENTION': intervention} for table in ['REGIONSOLUTION', 'INTERCONNECTORSOLN']}
+    if debug_flag:
+        schemas['REGIONSOLUTION'].update({'RRP': mms.FLOAT, 'ROP': mms.FLOAT})
+        schemas['REGIONSOLUTION'].update({column: mms.FLOAT for column in {**PRICE_FCAS_RECORDS, **REGIONSUM_RECORDS, **REGIONSUM_FCAS_RECORDS}})
+        schemas['CASESOLUTION'] = {'INTERVENTION': mms.STR, 'NONPHYSICALLOSSES': mms.INT, 'TOTALOBJECTIVE': mms.FLOAT}
+        schemas['CASESOLUTION'].update({column: mms.FLOAT for column in RUN_CASE_SOLUTION_VIOLATIONS})
+        schemas['INTERCONNECTORSOLN'].update({column: mms.FLOAT for column in RUN_INTERCONNECTOR_RECORDS})
+    tables = get_run_tables(dispatch_dir, schemas, where, debug_flag)
+    interval_datetime = mms.to_datetime64(t)
+    for record in iter_interval_records(tables['REGIONSOLUTION'], 'INTERVAL_DATETIME', interval_datetime):
+        region = regions[record['REGIONID']]
+        region.total_demand = record['TOTALDEMAND']
+        if debug_flag:
+            region.rrp_record = record['RRP']
+            region.rop_record = record['ROP']
+            for column, bid_type in PRICE_FCAS_RECORDS.items():
+                region.fcas_rrp_record[bid_type] = record[column]
+            for column, attribute in REGIONSUM_RECORDS.items():
+                setattr(region, attribute, record[column])
+            for column, bid_type in REGIONSUM_FCAS_RECORDS.items():
+                region.fcas_local_dispatch_record[bid_type] = record[column]
+    if debug_flag:
+        for record in mms.iter_records(tables['CASESOLUTION']):
+            solution = add_run_solution(record, RUN_CASE_SOLUTION_VIOLATIONS)
+            solution.intervention = record['INTERVENTION']
+    for record in iter_interval_records(tables['INTERCONNECTORSOLN'], 'INTERVAL_DATETIME', interval_datetime):
+        ic = interconnectors[record['INTERCONNECTORID']]
+        ic.metered_mw_flow = record['METEREDMWFLOW']
+        ic.mw_flow_record = record['MWFLOW']
+        if debug_flag:
+            for column, attribute in RUN_INTERCONNECTOR_RECORDS.items():
+                setattr(ic, attribute, record[column])
     return solution
 
 
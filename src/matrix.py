@@ -0,0 +1,178 @@
+# Matrix-API construction of the unit offer part of NEMDE formulation
+import datetime
+import default
+import gurobipy as gp
+import logging
+import numpy as np
+import offer
+import scipy.sparse as sp
+import solver
+import time
+
+BUILDERS = ['scalar', 'matrix']  # Available model builders of dispatch.dispatch
+
+
+def get_energy_units(units):
+    """Get units whose energy offers are formulated, i.e. units participating in the energy market except normally-on
+    loads (included as a component of the metered demand).
+
+    Args:
+        units (dict): dictionary of units
+
+    Returns:
+        list: list of units
+    """
+    return [unit for unit in units.values() if unit.energy is not None and unit.normally_on_flag != 'Y']
+
+
+def add_energy_offers(model, units, prob_id):
+    """Add energy offer band variables, band availability constraints and total cleared variables of all units with
+    one call each. Names are the same as the scalar builder so that variables can be found by name across intervals
+    (and matched by a model template).
+
+    Args:
+        model (gurobipy.Model): model
+        units (list): list of units generated by get_energy_units
+        prob_id (str): problem ID
+
+    Returns:
+        None
+    """
+    n = len(units)
+    if n == 0:
+        return
+    avail = np.array([unit.energy.band_avail for unit in units], dtype=np.float64).reshape(n * offer.BANDS)
+    offers = model.addMVar(n * offer.BANDS, name=[f'Energy_Avail{no}_{unit.duid}_{prob_id}' for unit in units for no in range(offer.BANDS)])
+    model.addMConstr(sp.identity(n * offer.BANDS, format='csr'), offers, gp.GRB.LESS_EQUAL, avail,
+                     name=[f'ENERGY_AVAIL{no}_{unit.duid}_{prob_id}' for unit in units for no in range(offer.BANDS)])
+    total_cleared = model.addMVar(n, name=[f'Total_Cleared_{unit.duid}_{prob_id}' for unit in units])
+    offer_list, total_cleared_list = offers.tolist(), total_cleared.tolist()
+    for u, unit in enumerate(units):
+        unit.offers = offer_list[u * offer.BANDS:(u + 1) * offer.BANDS]
+        unit.total_cleared = total_cleared_list[u]
+
+
+def add_total_band_constrs(model, units, prob_id, penalty, cvp):
+    """Total Band MW Offer constraints of all units, i.e. total cleared + deficit = sum of offer bands.
+
+    Args:
+        model (gurobipy.Model): model
+        units (list): list of units whose offers are added by add_energy_offers
+        prob_id (str): problem ID
+        penalty (gurobipy.LinExpr): the linear expression who represents the penalty
+        cvp (dict): the dictionary of Constraint Violation Penalty (CVP) factor
+
+    Returns:
+        The penalty linear expression
+    """
+    n = len(units)
+    if n == 0:
+        return penalty
+    deficit = model.addMVar(n, name=[f'Deficit_Offer_MW_{unit.duid}_{prob_id}' for unit in units])
+    deficit_list = deficit.tolist()
+    identity = sp.identity(n, format='csr')
+    bands = sp.kron(identity, np.ones((1, offer.BANDS)), format='csr')
+    variables = deficit_list + [unit.total_cleared for unit in units] + [o for unit in units for o in unit.offers]
+    x = gp.MVar.fromlist(variables)
+    model.addMConstr(sp.hstack([identity, identity, -bands], format='csr'), x, gp.GRB.EQUAL, np.zeros(n),
+                     name=[f'TOTAL_BAND_MW_OFFER_{unit.duid}_{prob_id}' for unit in units])
+    penalty += gp.LinExpr([cvp['OfferPrice']] * n, deficit_list)
+    return penalty
+
+
+def build_model(model, builder, current, start, predispatch_current, interval, process, **kwargs):
+    """Build the dispatch model of one interval with the given builder.
+
+    Args:
+        model (gurobipy.Model): model
+        builder (str): 'scalar' or 'matrix'
+        current (datetime.datetime): current datetime
+        start (datetime.datetime): start datetime
+        predispatch_current (datetime.datetime): predispatch datetime
+        interval (int): interval number
+        process (str): 'dispatch', 'p5min' or 'predispatch'
+        **kwargs: other arguments of dispatch.dispatch
+
+    Returns:
+        Problem
+    """
+    import dispatch
+    prob, model, cvp = dispatch.dispatch(current, start, predispatch_current, interval, process, model,
+                                         builder=builder, **kwargs)
+    for region_id, region in prob.regions.items():
+        prob.penalty = dispatch.add_regional_energy_demand_supply_balance_constr(model, region, region_id, prob.problem_id, False, prob.penalty, cvp)
+    model.setObjective(prob.cost + prob.penalty, gp.GRB.MINIMIZE)
+    model.update()
+    return prob
+
+
+def compare_builders(cases, process='dispatch', tolerance=1e-6, repeats=3, **kwargs):
+    """Build and solve recorded cases with both builders and compare objective values, primal values (by name) and
+    regional prices. Build times are logged so that the builders can be benchmarked side by side.
+
+    Each case is built once untimed first so that XML/CSV inputs are parsed and cached before timing. Each builder is
+    then built repeats times, alternating which builder goes first, and the fastest build of each is reported.
+
+    Args:
+        cases (list): list of (start datetime, interval number)
+        process (str): 'dispatch', 'p5min' or 'predispatch'
+        tolerance (float): absolute tolerance of the comparison
+        repeats (int): number of timed builds of each builder per case
+        **kwargs: other arguments of dispatch.dispatch
+
+    Returns:
+        list: list of (start datetime, interval number, mismatch description)
+    """
+    mismatches = []
+    for n, (start, interval) in enumerate(cases):
+        intervals = 30 if process == 'predispatch' else 5
+        current = start + interval * datetime.timedelta(minutes=intervals)
+        predispatch_current = current if process == 'predispatch' else None
+        if process == 'predispatch':
+            current -= default.TWENTYFIVE_MIN
+        case_args = (current, start, predispatch_current, interval, process)
+        # Load inputs outside the timed builds
+        with solver.open_model(f'warmup{default.get_case_datetime(current)}') as model:
+            build_model(model, BUILDERS[0], *case_args, **kwargs)
+        build_times = {builder: [] for builder in BUILDERS}
+        solutions = {}
+        for r in range(repeats):
+            for builder in (BUILDERS if (n + r) % 2 == 0 else BUILDERS[::-1]):
+                with solver.open_model(f'{builder}{default.get_case_datetime(current)}') as model:
+                    model.setParam('OutputFlag', 0)
+                    build_time = time.time()
+                    prob = build_model(model, builder, *case_args, **kwargs)
+                    build_times[builder].append(time.time() - build_time)
+                    if builder in solutions:
+                        continue
+                    model.optimize()
+                    logging.info(f'{builder} builder: {model.NumVars} vars {model.NumConstrs} constrs solved in {model.Runtime:.3f}s')
+                    if model.status != gp.GRB.Status.OPTIMAL:
+                        mismatches.append((start, interval, f'{builder} builder status {model.status}'))
+                        solutions[builder] = None
+                        continue
+                    solutions[builder] = (model.objVal,
+                                          dict(zip(model.getAttr('VarName', model.getVars()), model.getAttr('X', model.getVars()))),
+                                          {region_id: region.rrp_constr.pi for region_id, region in prob.regions.items()})
+        logging.info(' '.join(f'{builder} builder built in {min(times):.3f}s (best of {repeats});' for builder, times in build_times.items()))
+        if None in solutions.values():
+            continue
+        (scalar_obj, scalar_x, scalar_prices), (matrix_obj, matrix_x, matrix_prices) = solutions['scalar'], solutions['matrix']
+        if abs(scalar_obj - matrix_obj) > tolerance:
+            mismatches.append((start, interval, f'objective {scalar_obj} but {matrix_obj}'))
+        if scalar_x.keys() != matrix_x.keys():
+            mismatches.append((start, interval, f'variables {sorted(scalar_x.keys() ^ matrix_x.keys())[:10]} are not in both models'))
+        for name in scalar_x.keys() & matrix_x.keys():
+            if abs(scalar_x[name] - matrix_x[name]) > tolerance:
+                mismatches.append((start, interval, f'{name} {scalar_x[name]} but {matrix_x[name]}'))
+        for region_id, price in scalar_prices.items():
+            if abs(price - matrix_prices[region_id]) > tolerance:
+                mismatches.append((start, interval, f'{region_id} price {price} but {matrix_prices[region_id]}'))
+    return mismatches
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    start = datetime.datetime(2021, 7, 18, 4, 5)
+    for mismatch in compare_builders([(start, i) for i in range(0, 288, 36)]):
+        print(mismatch)
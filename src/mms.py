@@ -0,0 +1,340 @@
+import csv
+import default
+import json
+import logging
+import numpy as np
+import os
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar cache is skipped and CSV files are decoded directly
+    pa = pq = None
+
+# Column types of the decoder
+FLOAT = 'float'
+INT = 'int'
+STR = 'str'
+DATETIME = 'datetime'
+
+CACHE_DIR = default.DATA_DIR / 'columnar'  # Columnar cache of files read many times, partitioned by table and trading day
+ROW_GROUP_SIZE = 4096  # Rows per Parquet row group, i.e. granularity of predicate pushdown
+SORT_COLUMNS = ['INTERVAL_DATETIME', 'DATETIME', 'SETTLEMENTDATE', 'EFFECTIVEDATE']  # Candidates to sort rows by
+
+
+def to_datetime64(t):
+    """Convert datetime.datetime to numpy.datetime64 to compare with decoded datetime columns.
+
+    Args:
+        t (datetime.datetime): datetime
+
+    Returns:
+        numpy.datetime64: converted datetime
+    """
+    return np.datetime64(t, 's')
+
+
+def get_column_indices(row, table, columns):
+    """Get column indices from the I (header) row of the MMS table.
+
+    Args:
+        row (list): I row, i.e. ['I', report, table, version, column names...]
+        table (str): table name
+        columns (iterable): requested column names
+
+    Returns:
+        dict: {column name: index in the row}
+    """
+    header = {name.upper(): i for i, name in enumerate(row) if i > 3}
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f'Columns {missing} are not in table {table} (version {row[3]}).')
+    return {column: header[column] for column in columns}
+
+
+def convert_column(values, column_type):
+    """Convert raw strings of a column into numpy.ndarray of the given type. Empty floats become NaN.
+
+    Args:
+        values (list): list of raw strings
+        column_type (str): FLOAT, INT, STR or DATETIME
+
+    Returns:
+        numpy.ndarray: typed column
+    """
+    if column_type == FLOAT:
+        return np.array([v if v else 'nan' for v in values]).astype(np.float64) if values else np.empty(0, np.float64)
+    elif column_type == INT:
+        return np.array(values).astype(np.int64) if values else np.empty(0, np.int64)
+    elif column_type == DATETIME:
+        return np.array([v.replace('/', '-') for v in values], dtype='datetime64[s]')
+    return np.array(values, dtype=object)
+
+
+def matches(raw, value):
+    """Check whether the raw string of a row matches the condition.
+
+    Args:
+        raw (str): raw string
+        value (str or set): raw string to equal, or collection of raw strings to be in
+
+    Returns:
+        bool: True if matched
+    """
+    return raw == value if isinstance(value, str) else raw in value
+
+
+def read_tables(p, schemas, where=None):
+    """Decode MMS tables of a CSV file into typed columnar batches in one pass. Columns are located by the I (header)
+    row of each table rather than fixed indices. Used for files read once, e.g. DISPATCHIS, P5MIN or PREDISPATCHIS
+    files of a run.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        schemas (dict): {table name: {column name: column type}}
+        where (dict): {table name: {column name: raw string or collection of raw strings}} to keep matched rows only,
+                      or None
+
+    Returns:
+        dict: {table name: {column name: numpy.ndarray}}; tables not found in the file have empty columns
+    """
+    where = {} if where is None else where
+    raw = {table: {column: [] for column in schema} for table, schema in schemas.items()}
+    indices, filters = {}, {}
+    with p.open() as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) < 3 or row[2] not in schemas:
+                continue
+            table = row[2]
+            if row[0] == 'I':
+                conditions = where.get(table, {})
+                indices[table] = get_column_indices(row, table, schemas[table])
+                filters[table] = [(i, conditions[column]) for column, i in get_column_indices(row, table, conditions).items()]
+            elif row[0] == 'D':
+                if table not in indices:
+                    logging.error(f'Table {table} in {p} has no header row.')
+                    continue
+                if all(matches(row[i], value) for i, value in filters[table]):
+                    for column, i in indices[table].items():
+                        raw[table][column].append(row[i])
+    return {table: {column: convert_column(raw[table][column], column_type) for column, column_type in schema.items()}
+            for table, schema in schemas.items()}
+
+
+def read_table(p, table, schema, where=None):
+    """Decode one MMS table of a CSV file into typed columnar batch.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        table (str): table name
+        schema (dict): {column name: column type}
+        where (dict): {column name: raw string or collection of raw strings} to keep matched rows only, or None
+
+    Returns:
+        dict: {column name: numpy.ndarray}
+    """
+    return read_tables(p, {table: schema}, None if where is None else {table: where})[table]
+
+
+def select(batch, mask):
+    """Select rows of a columnar batch.
+
+    Args:
+        batch (dict): {column name: numpy.ndarray}
+        mask (numpy.ndarray): boolean mask of rows
+
+    Returns:
+        dict: {column name: numpy.ndarray}
+    """
+    return {column: values[mask] for column, values in batch.items()}
+
+
+def iter_records(batch):
+    """Iterate rows of a columnar batch as dictionaries.
+
+    Args:
+        batch (dict): {column name: numpy.ndarray}
+
+    Returns:
+        generator: {column name: value} of each row
+    """
+    columns = list(batch.keys())
+    for values in zip(*batch.values()):
+        yield dict(zip(columns, values))
+
+
+def read_raw_tables(p):
+    """Read all MMS tables of a CSV file as raw strings. Rows under different header versions are aligned by name.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+
+    Returns:
+        dict: {table name: {column name: list of raw strings}}
+    """
+    tables, headers, sizes = {}, {}, {}
+    with p.open() as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) < 3:
+                continue
+            table = row[2]
+            if row[0] == 'I':
+                columns = tables.setdefault(table, {})
+                sizes.setdefault(table, 0)
+                headers[table] = [(name.upper(), i) for i, name in enumerate(row) if i > 3]
+                for name, _ in headers[table]:
+                    if name not in columns:
+                        columns[name] = [''] * sizes[table]
+            elif row[0] == 'D' and table in headers:
+                columns = tables[table]
+                for name, i in headers[table]:
+                    columns[name].append(row[i] if i < len(row) else '')
+                sizes[table] += 1
+                for values in columns.values():
+                    if len(values) < sizes[table]:
+                        values.append('')
+    return tables
+
+
+def get_cache_path(p, t, table):
+    """Get path to the columnar cache of a table of the CSV file.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+        table (str): table name
+
+    Returns:
+        pathlib.Path: path to the Parquet file
+    """
+    return CACHE_DIR / table / default.get_first_datetime(t).strftime('%Y%m%d') / f'{p.stem}.parquet'
+
+
+def get_marker_path(p, t):
+    """Get path to the marker indicating the CSV file has been converted, i.e. JSON of the modification time (ns) and
+    size of the CSV file when it was converted and the converted tables.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+
+    Returns:
+        pathlib.Path: path to the marker
+    """
+    return CACHE_DIR / 'converted' / default.get_first_datetime(t).strftime('%Y%m%d') / p.stem
+
+
+def read_marker(p, t):
+    """Read the marker of the CSV file if it matches the current modification time and size of the CSV file.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+
+    Returns:
+        dict: marker, or None if the CSV file has not been converted or has changed since
+    """
+    marker = get_marker_path(p, t)
+    if not marker.is_file():
+        return None
+    try:
+        with marker.open() as f:
+            content = json.load(f)
+    except ValueError:  # Empty marker of an earlier version
+        return None
+    stat = p.stat()
+    if content.get('mtime') != stat.st_mtime_ns or content.get('size') != stat.st_size:
+        logging.info(f'{p} has changed since it was converted.')
+        return None
+    return content
+
+
+def write_cache(p, t):
+    """Convert all MMS tables of the CSV file into Parquet files sorted by interval datetime (if any). The marker is
+    written last so that tables absent from the file are not converted again until the CSV file changes.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+
+    Returns:
+        dict: marker
+    """
+    stat = p.stat()  # Taken before reading so that a file replaced meanwhile is converted again next time
+    raw_tables = read_raw_tables(p)
+    for table, columns in raw_tables.items():
+        arrow_table = pa.table({name: pa.array(values, pa.string()) for name, values in columns.items()})
+        sort_columns = [name for name in SORT_COLUMNS if name in columns]
+        if sort_columns:
+            arrow_table = arrow_table.sort_by(sort_columns[0])
+        path = get_cache_path(p, t, table)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        pq.write_table(arrow_table, temp, row_group_size=ROW_GROUP_SIZE)
+        os.replace(temp, path)
+    content = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'tables': sorted(raw_tables)}
+    marker = get_marker_path(p, t)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    temp = marker.with_name(f'{marker.name}.{os.getpid()}.tmp')
+    with temp.open('w') as f:
+        json.dump(content, f)
+    os.replace(temp, marker)
+    return content
+
+
+def read_cached_tables(p, t, schemas, where=None):
+    """Decode MMS tables through the columnar cache, converting the CSV file on first access or after it has changed.
+    Only requested columns are read and conditions are pushed down to Parquet row groups. Converting costs a full pass
+    over the file plus a Parquet file per table, so the cache is only for files read many times (e.g. monthly DVD
+    files); files read once are decoded by read_tables. Falls back to read_tables without pyarrow.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+        schemas (dict): {table name: {column name: column type}}
+        where (dict): {table name: {column name: raw string or collection of raw strings}} to keep matched rows only,
+                      e.g. interval datetime in format YYYY/mm/dd HH:MM:SS, region IDs or DUIDs
+
+    Returns:
+        dict: {table name: {column name: numpy.ndarray}}
+    """
+    if pq is None:
+        return read_tables(p, schemas, where)
+    where = {} if where is None else where
+    marker = read_marker(p, t)
+    if marker is None:
+        marker = write_cache(p, t)
+    tables = {}
+    for table, schema in schemas.items():
+        path = get_cache_path(p, t, table)
+        # Parquet file of a table absent from the CSV file may be left by an earlier version of the file
+        if table not in marker['tables'] or not path.is_file():
+            tables[table] = {column: convert_column([], column_type) for column, column_type in schema.items()}
+            continue
+        names = pq.read_schema(path).names
+        missing = [column for column in list(schema) + list(where.get(table, {})) if column not in names]
+        if missing:
+            raise ValueError(f'Columns {missing} are not in table {table} of {p}.')
+        filters = [(column, '==', value) if isinstance(value, str) else (column, 'in', list(value))
+                   for column, value in where.get(table, {}).items()]
+        arrow_table = pq.read_table(path, columns=list(schema), filters=filters if filters else None)
+        tables[table] = {column: convert_column(arrow_table.column(column).to_pylist(), column_type)
+                         for column, column_type in schema.items()}
+    return tables
+
+
+def read_cached_table(p, t, table, schema, where=None):
+    """Decode one MMS table through the columnar cache.
+
+    Args:
+        p (pathlib.Path): path to the CSV file
+        t (datetime.datetime): datetime of the file (trading day or month)
+        table (str): table name
+        schema (dict): {column name: column type}
+        where (dict): {column name: raw string or collection of raw strings} to keep matched rows only, or None
+
+    Returns:
+        dict: {column name: numpy.ndarray}
+    """
+    return read_cached_tables(p, t, {table: schema}, None if where is None else {table: where})[table]
@@ -1,9 +1,12 @@
 import dispatch
 import datetime
 import default
+import helpers
 import multiprocessing as mp
 import time
 import preprocess
+import solver
+import template
 from itertools import repeat
 
 
@@ -13,9 +16,10 @@ def apply_multiprocess_dispatch(s, intervals_per_process, process_type):
         t = s + m * (default.THIRTY_MIN if process_type == 'predispatch' else default.FIVE_MIN)
         if process_type == 'dispatch':
             dispatch.formulate(start=t, interval=0, process=process_type, path_to_out=path_to_out,
-                               dispatchload_flag=False)
+                               dispatchload_flag=False, template_key=process_type)
         else:
             dispatch.get_all_dispatch(t, process_type, path_to_out)
+    template.release_template(process_type)
 
 
 def multiformulate(start_datetime, process_type, num_usage, download_flag=False):
@@ -39,7 +43,8 @@ def multiformulate(start_datetime, process_type, num_usage, download_flag=False)
     # end = datetime.datetime(2021, 7, 21, 4, 5)
     # times = [start + default.FIVE_MIN * i for i in range(37)]
     # intervals_per_process = 1
-    with mp.Pool(len(times)) as pool:
+    helpers.load_static_reference(start_datetime, start_datetime + default.ONE_DAY)
+    with mp.Pool(len(times), initializer=solver.init_worker) as pool:
         pool.starmap(apply_multiprocess_dispatch, zip(times, repeat(intervals_per_process), repeat(process_type)))
     pool.close()
     pool.join()
@@ -49,7 +54,7 @@ def multiformulate_sequence_batteries():
     start_timeit = time.time()
     energies = [30, 3000]
     # energies = [150, 300, 600, 1500, 3000]
-    with mp.Pool(len(energies)) as pool:
+    with mp.Pool(len(energies), initializer=solver.init_worker) as pool:
         pool.map(dispatch.formulate_sequence, energies)
     print("--- %s ---" % (time.time() - start_timeit))
 
@@ -4,6 +4,7 @@ import multiprocessing as mp
 import price_taker
 import time
 import helpers
+import solver
 import operate
 import write
 import read
@@ -170,6 +171,7 @@ if __name__ == '__main__':
         p = 30 * a
         b = helpers.Battery(e, p, region_id, method)
         batteries.append(b)
-    with mp.Pool(len(batteries)) as pool:
+    helpers.load_static_reference(datetime.datetime(2020, 9, 1, 4, 5))
+    with mp.Pool(len(batteries), initializer=solver.init_worker) as pool:
         pool.map(apply_multiprocess_forward_iterative_optimise_with_bids, batteries)
     print("--- %s seconds ---" % (time.time() - start_timeit))
\ No newline at end of file
@@ -2,6 +2,8 @@ import csv
 import datetime
 import default
 import logging
+import mms
+import pickle
 import preprocess
 import predefine
 import pandas as pd
@@ -18,10 +20,10 @@ class Bid:
 
     """
 
-    def __init__(self, row):
-        self.bid_type = row[6]
+    def __init__(self, record):
+        self.bid_type = record['BIDTYPE']
         # Daily bids
-        self.price_band = [float(price) for price in row[13:23]]
+        self.price_band = [float(record[column]) for column in PRICE_BAND_COLUMNS]
         # Period bids
         self.max_avail = None
         self.band_avail = None
@@ -44,21 +46,21 @@ class EnergyBid(Bid):
         roc_down (int): MW/min for lower
 
     """
-    def __init__(self, row):
-        if row != []:
-            super().__init__(row)
+    def __init__(self, record):
+        if record:
+            super().__init__(record)
             # Daily bids
-            self.daily_energy_limit = float(row[11])
+            self.daily_energy_limit = float(record['DAILYENERGYCONSTRAINT'])
             self.daily_energy = 0.0
             self.daily_energy_record = 0.0
             self.last_daily_energy = 0.0
             self.last_daily_energy_record = 0.0
-            self.minimum_load = int(row[23])
-            self.t1 = int(row[24])
-            self.t2 = int(row[25])
-            self.t3 = int(row[26])
-            self.t4 = int(row[27])
-            self.normal_status = row[28]
+            self.minimum_load = int(record['MINIMUMLOAD'])
+            self.t1 = int(record['T1'])
+            self.t2 = int(record['T2'])
+            self.t3 = int(record['T3'])
+            self.t4 = int(record['T4'])
+            self.normal_status = record['NORMALSTATUS']
             # Period bids
             self.fixed_load = 0
             self.roc_up = None
@@ -103,9 +105,9 @@ class FcasBid(Bid):
         high_breakpoint (int): Maximum Energy Output (MW) at which the unit can provide the full availability (MAXAVAIL) for this ancillary service
         flag (int): A flag exists for each ancillary service type such that a unit trapped or stranded in one or more service type can be immediately identified
     """
-    def __init__(self, row):
-        if row != []:
-            super().__init__(row)
+    def __init__(self, record):
+        if record:
+            super().__init__(record)
         else:
             self.bid_type = None
             # Daily bids
@@ -310,6 +312,36 @@ class BiUnit:
         self.bat_dir.mkdir(parents=True, exist_ok=True)
 
 
+# UNIT_SOLUTION columns of NEXT_DAY_DISPATCH: attribute of the unit
+AGC_RECORDS = {
+    'RAISEREGAVAILABILITY': 'raisereg_availability',
+    'RAISEREGENABLEMENTMAX': 'raisereg_enablement_max',
+    'RAISEREGENABLEMENTMIN': 'raisereg_enablement_min',
+    'LOWERREGAVAILABILITY': 'lowerreg_availability',
+    'LOWERREGENABLEMENTMAX': 'lowerreg_enablement_max',
+    'LOWERREGENABLEMENTMIN': 'lowerreg_enablement_min'
+}
+DISPATCHLOAD_RECORDS = {
+    'INITIALMW': 'initial_mw',
+    'TOTALCLEARED': 'total_cleared_record',
+    'RAMPDOWNRATE': 'ramp_down_rate',
+    'RAMPUPRATE': 'ramp_up_rate',
+    **AGC_RECORDS
+}
+BANDS = 10  # Number of price bands of each offer
+PRICE_BAND_COLUMNS = [f'PRICEBAND{i}' for i in range(1, BANDS + 1)]
+BAND_AVAIL_COLUMNS = [f'BANDAVAIL{i}' for i in range(1, BANDS + 1)]
+# Integer columns are decoded as floats because they are empty in rows of the other bid types
+BIDDAYOFFER_SCHEMA = {'DUID': mms.STR, 'BIDTYPE': mms.STR, 'DAILYENERGYCONSTRAINT': mms.FLOAT,
+                      **{column: mms.FLOAT for column in PRICE_BAND_COLUMNS},
+                      'MINIMUMLOAD': mms.FLOAT, 'T1': mms.FLOAT, 'T2': mms.FLOAT, 'T3': mms.FLOAT, 'T4': mms.FLOAT,
+                      'NORMALSTATUS': mms.STR}
+BIDPEROFFER_SCHEMA = {'DUID': mms.STR, 'BIDTYPE': mms.STR, 'MAXAVAIL': mms.FLOAT, 'FIXEDLOAD': mms.FLOAT,
+                      'ROCUP': mms.FLOAT, 'ROCDOWN': mms.FLOAT, 'ENABLEMENTMIN': mms.FLOAT, 'ENABLEMENTMAX': mms.FLOAT,
+                      'LOWBREAKPOINT': mms.FLOAT, 'HIGHBREAKPOINT': mms.FLOAT,
+                      **{column: mms.FLOAT for column in BAND_AVAIL_COLUMNS}}
+
+
 def add_unit_bids(units, t, process, fcas_flag=True):
     """ Add unit bids.
     Args:
@@ -322,36 +354,38 @@ def add_unit_bids(units, t, process, fcas_flag=True):
         None
     """
     bids_dir = preprocess.download_bidmove_summary(t) if process == 'predispatch' else preprocess.download_bidmove_complete(t)
-    interval_datetime = default.get_interval_datetime(t)
-    with bids_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'BIDDAYOFFER_D':
-                duid = row[5]
-                unit = units.get(duid)
-                if not unit:
-                    unit = Unit(duid)
-                    units[duid] = unit
-                if row[6] == 'ENERGY':
-                    unit.energy = EnergyBid(row)
-                elif fcas_flag:
-                    unit.fcas_bids[row[6]] = FcasBid(row)
-            elif row[0] == 'D' and row[2] == 'BIDPEROFFER_D' and row[31] == interval_datetime:
-                if row[6] == 'ENERGY':
-                    energy = units[row[5]].energy
-                    energy.max_avail = float(row[11])
-                    energy.fixed_load = float(row[12])
-                    energy.roc_up = int(row[13])
-                    energy.roc_down = int(row[14])
-                    energy.band_avail = [int(avail) for avail in row[19:29]]
-                elif fcas_flag:
-                    bid = units[row[5]].fcas_bids[row[6]]
-                    bid.max_avail = float(row[11])
-                    bid.enablement_min = int(row[15])
-                    bid.enablement_max = int(row[16])
-                    bid.low_breakpoint = int(row[17])
-                    bid.high_breakpoint = int(row[18])
-                    bid.band_avail = [int(avail) for avail in row[19:29]]
+    # The daily bid file is read for every interval of the day, so it goes through the columnar cache
+    where = {'BIDPEROFFER_D': {'INTERVAL_DATETIME': default.get_interval_datetime(t)}}
+    if not fcas_flag:
+        where['BIDPEROFFER_D']['BIDTYPE'] = 'ENERGY'
+    tables = mms.read_cached_tables(bids_dir, t, {'BIDDAYOFFER_D': BIDDAYOFFER_SCHEMA,
+                                                  'BIDPEROFFER_D': BIDPEROFFER_SCHEMA}, where)
+    for record in mms.iter_records(tables['BIDDAYOFFER_D']):
+        duid = record['DUID']
+        unit = units.get(duid)
+        if not unit:
+            unit = Unit(duid)
+            units[duid] = unit
+        if record['BIDTYPE'] == 'ENERGY':
+            unit.energy = EnergyBid(record)
+        elif fcas_flag:
+            unit.fcas_bids[record['BIDTYPE']] = FcasBid(record)
+    for record in mms.iter_records(tables['BIDPEROFFER_D']):
+        if record['BIDTYPE'] == 'ENERGY':
+            energy = units[record['DUID']].energy
+            energy.max_avail = float(record['MAXAVAIL'])
+            energy.fixed_load = float(record['FIXEDLOAD'])
+            energy.roc_up = int(record['ROCUP'])
+            energy.roc_down = int(record['ROCDOWN'])
+            energy.band_avail = [int(record[column]) for column in BAND_AVAIL_COLUMNS]
+        else:
+            bid = units[record['DUID']].fcas_bids[record['BIDTYPE']]
+            bid.max_avail = float(record['MAXAVAIL'])
+            bid.enablement_min = int(record['ENABLEMENTMIN'])
+            bid.enablement_max = int(record['ENABLEMENTMAX'])
+            bid.low_breakpoint = int(record['LOWBREAKPOINT'])
+            bid.high_breakpoint = int(record['HIGHBREAKPOINT'])
+            bid.band_avail = [int(record[column]) for column in BAND_AVAIL_COLUMNS]
 
 
 def add_du_detail(units, t):
@@ -365,28 +399,24 @@ def add_du_detail(units, t):
         A dictionary of connection points
     """
     connection_points = {}
-    dd_dir = preprocess.download_dvd_data('DUDETAIL', t)
-    with dd_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[4]) <= t:
-                unit = units.get(row[5])
-                if unit:
-                    if row[7] in connection_points and row[5] != connection_points[row[7]]:
-                        logging.error(f'Connection point ID {row[7]} has more than one unit.')
-                    connection_points[row[7]] = row[5]
-                    unit.connection_point_id = row[7]
-                    # unit.volt_level = row[8]
-                    # unit.registered_capacity = int(row[9])
-                    unit.agc_capability = row[10]
-                    unit.dispatch_type = row[11]
-                    # unit.max_capacity = int(row[12])
-                    unit.start_type = row[13]
-                    unit.normally_on_flag = row[14]
-                    # unit.intermittent_flag = row[20]
-                    # unit.semischedule_flag = row[21]
-                    # unit.max_rate_of_change_up = int(row[22]) if row[22] else None
-                    # unit.max_rate_of_change_down = int(row[23]) if row[23] else None
+    index = preprocess.index_dvd_data('DUDETAIL', t, (5,), 4)
+    for duid, unit in units.items():
+        for row in preprocess.get_effective_rows(index, (duid,), t):
+            if row[7] in connection_points and row[5] != connection_points[row[7]]:
+                logging.error(f'Connection point ID {row[7]} has more than one unit.')
+            connection_points[row[7]] = row[5]
+            unit.connection_point_id = row[7]
+            # unit.volt_level = row[8]
+            # unit.registered_capacity = int(row[9])
+            unit.agc_capability = row[10]
+            unit.dispatch_type = row[11]
+            # unit.max_capacity = int(row[12])
+            unit.start_type = row[13]
+            unit.normally_on_flag = row[14]
+            # unit.intermittent_flag = row[20]
+            # unit.semischedule_flag = row[21]
+            # unit.max_rate_of_change_up = int(row[22]) if row[22] else None
+            # unit.max_rate_of_change_down = int(row[23]) if row[23] else None
     return connection_points
 
 
@@ -400,25 +430,22 @@ def add_du_detail_summary(units, t):
     Returns:
         None
     """
-    dds_dir = preprocess.download_dvd_data('DUDETAILSUMMARY', t)
+    index = preprocess.index_dvd_data('DUDETAILSUMMARY', t, (4,), 5)
     # logging.info('Read du detail summary.')
-    with dds_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[5]) <= t < default.extract_datetime(row[6]):
-                unit = units.get(row[4])
-                if unit:
-                    unit.region_id = row[9]
-                    # unit.station_id = row[10]
-                    unit.transmission_loss_factor = float(row[13])
-                    # unit.distribution_loss_factor = float(row[15])
-                    # unit.minimum_energy_price = float(row[16])
-                    # unit.maximum_energy_price = float(row[17])
-                    # unit.schedule_type = row[18]
-                    # unit.min_ramp_rate_up = int(row[19]) if row[19] else None
-                    # unit.min_ramp_rate_down = int(row[20]) if row[20] else None
-                    # unit.max_ramp_rate_up = int(row[21]) if row[21] else None
-                    # unit.max_ramp_rate_down = int(row[22]) if row[22] else None
+    for duid, unit in units.items():
+        for row in preprocess.get_effective_rows(index, (duid,), t):
+            if t < default.extract_datetime(row[6]):
+                unit.region_id = row[9]
+                # unit.station_id = row[10]
+                unit.transmission_loss_factor = float(row[13])
+                # unit.distribution_loss_factor = float(row[15])
+                # unit.minimum_energy_price = float(row[16])
+                # unit.maximum_energy_price = float(row[17])
+                # unit.schedule_type = row[18]
+                # unit.min_ramp_rate_up = int(row[19]) if row[19] else None
+                # unit.min_ramp_rate_down = int(row[20]) if row[20] else None
+                # unit.max_ramp_rate_up = int(row[21]) if row[21] else None
+                # unit.max_ramp_rate_down = int(row[22]) if row[22] else None
 
 
 # def add_marginal_loss_factors(units):
@@ -487,63 +514,28 @@ def add_dispatchload_record(units, t, fcas_flag, debug_flag):
     Returns:
         None
     """
-    record_dir = preprocess.download_next_day_dispatch(t)
-    interval_datetime = default.get_interval_datetime(t)
-    with record_dir.open() as f:
-        reader = csv.reader(f)
-        # logging.info('Read next day dispatch.')
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'UNIT_SOLUTION' and row[4] == interval_datetime:
-                duid = row[6]
-                if duid in units:
-                    unit = units[duid]
-                    unit.dispatch_mode = int(row[11])
-                    unit.agc_status = int(row[12])
-                    unit.initial_mw = float(row[13])
-                    unit.total_cleared_record = float(row[14])
-                    unit.ramp_down_rate = float(row[15])
-                    unit.ramp_up_rate = float(row[16])
-                    unit.raisereg_availability = float(row[45])
-                    unit.raisereg_enablement_max = float(row[46])
-                    unit.raisereg_enablement_min = float(row[47])
-                    unit.lowerreg_availability = float(row[48])
-                    unit.lowerreg_enablement_max = float(row[49])
-                    unit.lowerreg_enablement_min = float(row[50])
-                    if debug_flag:
-                        # unit.marginal_value_record['ENERGY'] = float(row[28]) if row[28] else None
-                        # unit.violation_degree_record['ENERGY'] = float(row[32]) if row[32] else None
-                        unit.availability = float(row[36])
-                        if fcas_flag:
-                            unit.target_record['LOWER5MIN'] = float(row[17])
-                            unit.target_record['LOWER60SEC'] = float(row[18])
-                            unit.target_record['LOWER6SEC'] = float(row[19])
-                            unit.target_record['RAISE5MIN'] = float(row[20])
-                            unit.target_record['RAISE60SEC'] = float(row[21])
-                            unit.target_record['RAISE6SEC'] = float(row[22])
-                            # unit.marginal_value_record['5MIN'] = float(row[25]) if row[25] else None
-                            # unit.marginal_value_record['60SEC'] = float(row[26]) if row[26] else None
-                            # unit.marginal_value_record['6SEC'] = float(row[27]) if row[27] else None
-                            # unit.violation_degree_record['5MIN'] = float(row[29]) if row[29] else None
-                            # unit.violation_degree_record['60SEC'] = float(row[30]) if row[30] else None
-                            # unit.violation_degree_record['6SEC'] = float(row[31]) if row[31] else None
-                            unit.target_record['LOWERREG'] = float(row[34])
-                            unit.target_record['RAISEREG'] = float(row[35])
-                            unit.flags['RAISE6SEC'] = int(row[37])
-                            unit.flags['RAISE60SEC'] = int(row[38])
-                            unit.flags['RAISE5MIN'] = int(row[39])
-                            unit.flags['RAISEREG'] = int(row[40])
-                            unit.flags['LOWER6SEC'] = int(row[41])
-                            unit.flags['LOWER60SEC'] = int(row[42])
-                            unit.flags['LOWER5MIN'] = int(row[43])
-                            unit.flags['LOWERREG'] = int(row[44])
-                            unit.actual_availability_record['RAISE6SEC'] = float(row[51])
-                            unit.actual_availability_record['RAISE60SEC'] = float(row[52])
-                            unit.actual_availability_record['RAISE5MIN'] = float(row[53])
-                            unit.actual_availability_record['RAISEREG'] = float(row[54])
-                            unit.actual_availability_record['LOWER6SEC'] = float(row[55])
-                            unit.actual_availability_record['LOWER60SEC'] = float(row[56])
-                            unit.actual_availability_record['LOWER5MIN'] = float(row[57])
-                            unit.actual_availability_record['LOWERREG'] = float(row[58])
+    schema = {'DUID': mms.STR, 'DISPATCHMODE': mms.INT, 'AGCSTATUS': mms.INT}
+    schema.update({column: mms.FLOAT for column in DISPATCHLOAD_RECORDS})
+    if debug_flag:
+        schema['AVAILABILITY'] = mms.FLOAT
+        if fcas_flag:
+            for bid_type in default.FCAS_TYPES:
+                schema.update({bid_type: mms.FLOAT, f'{bid_type}FLAGS': mms.INT, f'{bid_type}ACTUALAVAILABILITY': mms.FLOAT})
+    for record in mms.iter_records(preprocess.read_next_day_dispatch_unit_solution(t, schema)):
+        duid = record['DUID']
+        if duid in units:
+            unit = units[duid]
+            unit.dispatch_mode = int(record['DISPATCHMODE'])
+            unit.agc_status = int(record['AGCSTATUS'])
+            for column, attribute in DISPATCHLOAD_RECORDS.items():
+                setattr(unit, attribute, float(record[column]))
+            if debug_flag:
+                unit.availability = float(record['AVAILABILITY'])
+                if fcas_flag:
+                    for bid_type in default.FCAS_TYPES:
+                        unit.target_record[bid_type] = float(record[bid_type])
+                        unit.flags[bid_type] = int(record[f'{bid_type}FLAGS'])
+                        unit.actual_availability_record[bid_type] = float(record[f'{bid_type}ACTUALAVAILABILITY'])
 
 
 def add_unit_solution(units, t, start, fcas_flag):
@@ -733,21 +725,14 @@ def add_agc(units, t):
     Returns:
         None
     """
-    record_dir = preprocess.download_next_day_dispatch(t)
-    interval_datetime = default.get_interval_datetime(t)
-    with record_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'UNIT_SOLUTION' and row[4] == interval_datetime:
-                duid = row[6]
-                if duid in units:
-                    unit = units[duid]
-                    unit.raisereg_availability = float(row[45])
-                    unit.raisereg_enablement_max = float(row[46])
-                    unit.raisereg_enablement_min = float(row[47])
-                    unit.lowerreg_availability = float(row[48])
-                    unit.lowerreg_enablement_max = float(row[49])
-                    unit.lowerreg_enablement_min = float(row[50])
+    schema = {'DUID': mms.STR}
+    schema.update({column: mms.FLOAT for column in AGC_RECORDS})
+    for record in mms.iter_records(preprocess.read_next_day_dispatch_unit_solution(t, schema)):
+        duid = record['DUID']
+        if duid in units:
+            unit = units[duid]
+            for column, attribute in AGC_RECORDS.items():
+                setattr(unit, attribute, float(record[column]))
 
 
 def add_scada_value(units, t):
@@ -769,8 +754,100 @@ def add_scada_value(units, t):
                     units[row[5]].scada_value = float(row[6])
 
 
+daily_energy_sums = {}  # Running daily energy, i.e. {(path to out, k, first datetime): (last datetime, {duid: [energy, energy record, MW]})}
+
+
+def get_daily_energy_path(first, k, path_to_out):
+    return path_to_out / ('dispatch' if k == 0 else f'dispatch_{k}') / f'daily_energy_{default.get_case_datetime(first)}.csv'
+
+
+def read_daily_energy_sum(first, k, path_to_out):
+    """ Read running daily energy of the trading day from memory or the saved file.
+
+    Args:
+        first (datetime.datetime): the first dispatch interval of the trading day
+        k (int): iteration number
+        path_to_out (Path): path to out file
+
+    Returns:
+        (datetime.datetime, dict): last accumulated interval (None if empty), {duid: [energy, energy record, MW]}
+    """
+    key = (path_to_out, k, first)
+    if key not in daily_energy_sums:
+        path_to_file = get_daily_energy_path(first, k, path_to_out)
+        last, sums = None, {}
+        if k != 0 and path_to_file.is_file():
+            with path_to_file.open() as f:
+                reader = csv.reader(f)
+                for row in reader:
+                    if row[0] == 'I':
+                        last = default.extract_datetime(row[1])
+                    elif row[0] == 'D':
+                        sums[row[1]] = [float(row[2]), float(row[3]), float(row[4]) if row[4] else None]
+        daily_energy_sums[key] = (last, sums)
+    return daily_energy_sums[key]
+
+
+def write_daily_energy_sum(first, k, path_to_out, last, sums):
+    daily_energy_sums[(path_to_out, k, first)] = (last, sums)
+    if k != 0:
+        path_to_file = get_daily_energy_path(first, k, path_to_out)
+        path_to_file.parent.mkdir(parents=True, exist_ok=True)
+        with path_to_file.open('w') as f:
+            writer = csv.writer(f)
+            writer.writerow(['I', default.get_interval_datetime(last)])
+            for duid, (energy, energy_record, mw) in sums.items():
+                writer.writerow(['D', duid, energy, energy_record, '' if mw is None else mw])
+
+
+def drop_daily_energy_sum(first, k, path_to_out):
+    """ Drop the running daily energy of the trading day in memory and on disk, so that it is rebuilt from files.
+
+    Args:
+        first (datetime.datetime): first interval datetime of the trading day
+        k (int): iteration number
+        path_to_out (Path): path to out file
+
+    Returns:
+        None
+    """
+    daily_energy_sums.pop((path_to_out, k, first), None)
+    get_daily_energy_path(first, k, path_to_out).unlink(missing_ok=True)
+
+
+def update_daily_energy(t, k, path_to_out, values):
+    """ Add one dispatch interval to the running daily energy. Called when our DISPATCHLOAD is written, so that
+        PREDISPATCH doesn't need to re-read every interval of the trading day. If an interval already in the sum is
+        written again (e.g. rerun), the sum is dropped since it includes the overwritten DISPATCHLOAD.
+
+    Args:
+        t (datetime.datetime): dispatch interval datetime
+        k (int): iteration number
+        path_to_out (Path): path to out file
+        values (dict): {duid: (total cleared, total cleared record)}
+
+    Returns:
+        None
+    """
+    first = default.get_first_datetime(t, 'dispatch')
+    last, sums = read_daily_energy_sum(first, k, path_to_out)
+    if t == first:
+        sums = {}
+    elif last is not None and t <= last:
+        return drop_daily_energy_sum(first, k, path_to_out)
+    elif last != t - default.FIVE_MIN:
+        return None  # Not contiguous; calculate_daily_energy catches up from files when required
+    for duid, (mw, mw_record) in values.items():
+        if duid not in sums:
+            sums[duid] = [0, 0, None]
+        sums[duid][0] += mw / 12.0
+        sums[duid][1] += mw_record / 12.0 if mw_record is not None else 0
+        sums[duid][2] = mw
+    write_daily_energy_sum(first, k, path_to_out, t, sums)
+
+
 def calculate_daily_energy(units, t, k, path_to_out):
-    """ Calculate daily energy sum for PREDISPATCH.
+    """ Calculate daily energy sum for PREDISPATCH. Intervals already in the running daily energy are not read again.
 
     Args:
         units (dict): the dictionary of units
@@ -781,47 +858,90 @@ def calculate_daily_energy(units, t, k, path_to_out):
     Returns:
         None
     """
-    start = default.get_first_datetime(t, 'dispatch')
+    first = default.get_first_datetime(t, 'dispatch')
+    last, sums = read_daily_energy_sum(first, k, path_to_out)
+    if last is None or last >= t:
+        start, sums = first, {}
+    else:
+        start = last + default.FIVE_MIN
     while start < t:
-        interval_datetime = default.get_interval_datetime(start)
         if k == 0:
-            path_to_file = preprocess.download_next_day_dispatch(start)
-            with path_to_file.open() as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if row[0] == 'D' and row[2] == 'UNIT_SOLUTION' and row[4] == interval_datetime:
-                        duid = row[6]
-                        if duid in units:
-                            unit = units[duid]
-                            if unit.energy is not None and unit.energy.daily_energy_limit != 0:
-                                unit.energy.daily_energy += float(row[14]) / 12.0
-                                unit.energy.daily_energy_record += float(row[14]) / 12.0
+            batch = preprocess.read_next_day_dispatch_unit_solution(start, {'DUID': mms.STR, 'TOTALCLEARED': mms.FLOAT})
+            for duid, total_cleared in zip(batch['DUID'], batch['TOTALCLEARED']):
+                if duid not in sums:
+                    sums[duid] = [0, 0, None]
+                sums[duid][0] += float(total_cleared) / 12.0
+                sums[duid][1] += float(total_cleared) / 12.0
         else:
             path_to_file = path_to_out / ('dispatch' if k == 0 else f'dispatch_{k}') / f'dispatchload_{default.get_case_datetime(start + default.FIVE_MIN)}.csv'
             with path_to_file.open() as f:
                 reader = csv.reader(f)
                 # logging.info('Read next day dispatch.')
                 for row in reader:
-                    if row[0] == 'D':
+                    if row[0] == 'D' and row[1] in units:
                         duid = row[1]
-                        if duid in units:
-                            unit = units[duid]
-                            unit.initial_mw = float(row[2])
-                            if unit.energy is not None and unit.energy.daily_energy_limit != 0:
-                                unit.energy.daily_energy += float(row[2]) / 12.0
-                                unit.energy.daily_energy_record += float(row[3]) / 12.0 if row[3] != '-' else 0
+                        if duid not in sums:
+                            sums[duid] = [0, 0, None]
+                        sums[duid][0] += float(row[2]) / 12.0
+                        sums[duid][1] += float(row[3]) / 12.0 if row[3] != '-' else 0
+                        sums[duid][2] = float(row[2])
         start += default.FIVE_MIN
+    if t > first:
+        write_daily_energy_sum(first, k, path_to_out, t - default.FIVE_MIN, sums)
+    for duid, (energy, energy_record, mw) in sums.items():
+        unit = units.get(duid)
+        if unit:
+            if mw is not None:
+                unit.initial_mw = mw
+            if unit.energy is not None and unit.energy.daily_energy_limit != 0:
+                unit.energy.daily_energy += energy
+                unit.energy.daily_energy_record += energy_record
 
 
-def add_registeration(units):
+REGISTRATION_SNAPSHOT_VERSION = 2  # Format of the saved registration snapshot, i.e. rows of each DUID since version 2
+registration = {}  # Registration snapshot in memory, i.e. {path to workbook: (modification time, snapshot)}
+
+
+def read_registration():
+    """ Read registration snapshot, i.e. {DUID: list of (fuel source, dispatch type, classification, region)}. All rows
+        of a DUID are kept in workbook order since some units have several registration rows. The snapshot is compiled
+        from the registration workbook once, saved next to it and invalidated by the workbook's modification time.
+
+    Returns:
+        dict: registration snapshot
+    """
     path_to_registeration = preprocess.download_registration(True)
-    with pd.ExcelFile(path_to_registeration) as xls:
-        df = pd.read_excel(xls, 'Generators and Scheduled Loads')
-        for index, row in df.iterrows():
-            unit = units.get(row['DUID'])
-            if unit:
-                if row['Fuel Source - Primary'] in ['Solar', 'Wind']:
-                    unit.renewable_flag = True
+    mtime = path_to_registeration.stat().st_mtime
+    if path_to_registeration in registration and registration[path_to_registeration][0] == mtime:
+        return registration[path_to_registeration][1]
+    path_to_snapshot = path_to_registeration.with_suffix('.pkl')
+    snapshot = None
+    if path_to_snapshot.is_file():
+        with path_to_snapshot.open('rb') as f:
+            content = pickle.load(f)
+        if content[:2] == (mtime, REGISTRATION_SNAPSHOT_VERSION):  # Otherwise outdated or saved by an earlier version
+            snapshot = content[2]
+    if snapshot is None:
+        snapshot = {}
+        with pd.ExcelFile(path_to_registeration) as xls:
+            df = pd.read_excel(xls, 'Generators and Scheduled Loads')
+        columns = ['DUID', 'Fuel Source - Primary', 'Dispatch Type', 'Classification', 'Region']
+        for duid, fuel_source, dispatch_type, classification, region in df[columns].itertuples(index=False):
+            if fuel_source in ['', ' ', '-'] or pd.isna(fuel_source):
+                fuel_source = None
+            snapshot.setdefault(duid, []).append((fuel_source, dispatch_type, classification, region))
+        with path_to_snapshot.open('wb') as f:
+            pickle.dump((mtime, REGISTRATION_SNAPSHOT_VERSION, snapshot), f)
+    registration[path_to_registeration] = (mtime, snapshot)
+    return snapshot
+
+
+def add_registeration(units):
+    for duid, rows in read_registration().items():
+        unit = units.get(duid)
+        if unit:
+            if any(fuel_source in ['Solar', 'Wind'] for fuel_source, _, _, _ in rows):
+                unit.renewable_flag = True
 
 
 def get_units(t, start, i, process, units={}, links={}, fcas_flag=True, dispatchload_path=None, dispatchload_flag=True, daily_energy_flag=True, agc_flag=True, predispatch_t=None, k=0, path_to_out=default.OUT_DIR, debug_flag=False, dispatchload_record=False):
@@ -2,6 +2,7 @@
 
 import gurobipy as gp
 import default, write
+import solver
 from helpers import marginal_costs
 from price import process_prices_by_interval, process_given_prices_by_interval, process_prices_by_hour
 
@@ -93,7 +94,7 @@ def schedule(current, battery, p5min_times=None, p5min_prices=None, aemo_p5min_p
     T1 = 6
     T = len(prices)  # Total number of intervals
     # Formulate battery operation optimisation problem using gurobi
-    with gp.Env() as env, gp.Model(env=env, name=f'operation_{battery.name}_{horizon}{fcas_type}{band}') as model:
+    with solver.open_model(f'operation_{battery.name}_{horizon}{fcas_type}{band}') as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         # Battery variables
         soc = [model.addVar(lb=SOC_MIN, ub=SOC_MAX, name=f'SOC_{j}') for j in range(T)]  # Battery SOC (%)
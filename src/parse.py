@@ -1,7 +1,9 @@
+import collections
 import constrain
 import logging
 import preprocess
 import xmltodict
+import xml.etree.ElementTree as ET
 from offer import Unit, EnergyBid, FcasBid
 
 fcas_types = {'R5RE': 'RAISEREG',
@@ -14,6 +16,15 @@ fcas_types = {'R5RE': 'RAISEREG',
               'L5MI': 'LOWER5MIN'
               }
 
+XML_CACHE_BUDGET = 256 * 1024 * 1024  # Size budget (bytes of .loaded file) of cached XML content
+# Cached XML content (parsed dict or streamed sections) in LRU order, i.e. {(interval datetime, kind): (size, value)}
+xml_cache = collections.OrderedDict()
+# Elements required by the formulation, i.e. (parent tag, tag), streamed from XML file in one pass
+SECTIONS = {('NemSpdInputs', 'Case'), ('TraderCollection', 'Trader'), ('TraderPeriodCollection', 'TraderPeriod'),
+            ('NemSpdOutputs', 'TraderSolution'), ('InterconnectorCollection', 'Interconnector'),
+            ('InterconnectorPeriodCollection', 'InterconnectorPeriod'),
+            ('GenericConstraintCollection', 'GenericConstraint'), ('NemSpdOutputs', 'ConstraintSolution')}
+
 
 def add_dayoffer(xml, units):
     """Add day offer.
@@ -29,59 +40,72 @@ def add_dayoffer(xml, units):
     for trader in traders:
         # if trader['@TraderID'] in units:
         #     unit = units[trader['@TraderID']]
-        duid = trader['@TraderID']
-        unit = Unit(duid)
-        if trader['@TraderType'] == 'NORMALLY_ON_LOAD':
-            unit.dispatch_type = 'LOAD'
-            unit.normally_on_flag = 'Y'
-        elif trader['@TraderType'] == 'LOAD':
-            unit.dispatch_type = trader['@TraderType']
-            unit.normally_on_flag = 'N'
-        elif trader['@TraderType'] == 'GENERATOR':
-            unit.dispatch_type = trader['@TraderType']
-        elif trader['@TraderType'] == 'WDR':
-            unit.dispatch_type = 'GENERATOR'
+        add_trader(trader, units)
+
+
+def add_trader(trader, units):
+    """Add day offer of one trader.
+
+    Args:
+        trader (dict): dictionary of the Trader element
+        units (dict): dictionary of units
+
+    Returns:
+        None
+    """
+    duid = trader['@TraderID']
+    unit = Unit(duid)
+    if trader['@TraderType'] == 'NORMALLY_ON_LOAD':
+        unit.dispatch_type = 'LOAD'
+        unit.normally_on_flag = 'Y'
+    elif trader['@TraderType'] == 'LOAD':
+        unit.dispatch_type = trader['@TraderType']
+        unit.normally_on_flag = 'N'
+    elif trader['@TraderType'] == 'GENERATOR':
+        unit.dispatch_type = trader['@TraderType']
+    elif trader['@TraderType'] == 'WDR':
+        unit.dispatch_type = 'GENERATOR'
+    else:
+        print('DISPATCH TYPE ERROR')
+        exit()
+    unit.start_type = 'FAST' if '@FastStart' in trader else 'SLOW'
+    if '@CurrentMode' in trader:
+        unit.current_mode = int(trader['@CurrentMode'])
+    if '@CurrentModeTime' in trader:
+        unit.current_mode_time = float(trader['@CurrentModeTime'])
+    for condition in trader['TraderInitialConditionCollection']['TraderInitialCondition']:
+        if condition['@InitialConditionID'] == 'SCADARampUpRate':
+            # scada_up_rate = float(condition['@Value'])
+            # if abs(scada_up_rate - unit.ramp_up_rate) > 0.1:
+            #     logging.debug(f'{unit.duid} up {unit.ramp_up_rate} roc {unit.energy.roc_up} but xml {scada_up_rate}')
+            unit.ramp_up_rate = float(condition['@Value'])
+        if condition['@InitialConditionID'] == 'SCADARampDnRate':
+            # scada_dn_rate = float(condition['@Value'])
+            # if abs(scada_dn_rate - unit.ramp_down_rate) > 0.1:
+            #     logging.debug(f'{unit.duid} dn {unit.ramp_down_rate} roc {unit.energy.roc_down} but xml {scada_dn_rate}')
+            unit.ramp_down_rate = float(condition['@Value'])
+        if condition['@InitialConditionID'] == 'InitialMW':
+            unit.initial_mw = float(condition['@Value'])
+    structures = trader['TradePriceStructureCollection']['TradePriceStructure']['TradeTypePriceStructureCollection']['TradeTypePriceStructure']
+    if type(structures) != list:
+        structures = [structures]
+    units[duid] = unit
+    for structure in structures:
+        if structure['@TradeType'] == 'ENOF' or structure['@TradeType'] == 'LDOF' or structure['@TradeType'] == 'DROF':
+            unit.energy = EnergyBid([])
+            unit.energy.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1, 11)]
+            if '@T1' in trader:
+                unit.energy.minimum_load = int(trader['@MinLoadingMW'])
+                unit.energy.t1 = int(trader['@T1'])
+                unit.energy.t2 = int(trader['@T2'])
+                unit.energy.t3 = int(trader['@T3'])
+                unit.energy.t4 = int(trader['@T4'])
         else:
-            print('DISPATCH TYPE ERROR')
-            exit()
-        unit.start_type = 'FAST' if '@FastStart' in trader else 'SLOW'
-        if '@CurrentMode' in trader:
-            unit.current_mode = int(trader['@CurrentMode'])
-        if '@CurrentModeTime' in trader:
-            unit.current_mode_time = float(trader['@CurrentModeTime'])
-        for condition in trader['TraderInitialConditionCollection']['TraderInitialCondition']:
-            if condition['@InitialConditionID'] == 'SCADARampUpRate':
-                # scada_up_rate = float(condition['@Value'])
-                # if abs(scada_up_rate - unit.ramp_up_rate) > 0.1:
-                #     logging.debug(f'{unit.duid} up {unit.ramp_up_rate} roc {unit.energy.roc_up} but xml {scada_up_rate}')
-                unit.ramp_up_rate = float(condition['@Value'])
-            if condition['@InitialConditionID'] == 'SCADARampDnRate':
-                # scada_dn_rate = float(condition['@Value'])
-                # if abs(scada_dn_rate - unit.ramp_down_rate) > 0.1:
-                #     logging.debug(f'{unit.duid} dn {unit.ramp_down_rate} roc {unit.energy.roc_down} but xml {scada_dn_rate}')
-                unit.ramp_down_rate = float(condition['@Value'])
-            if condition['@InitialConditionID'] == 'InitialMW':
-                unit.initial_mw = float(condition['@Value'])
-        structures = trader['TradePriceStructureCollection']['TradePriceStructure']['TradeTypePriceStructureCollection']['TradeTypePriceStructure']
-        if type(structures) != list:
-            structures = [structures]
-        units[duid] = unit
-        for structure in structures:
-            if structure['@TradeType'] == 'ENOF' or structure['@TradeType'] == 'LDOF' or structure['@TradeType'] == 'DROF':
-                unit.energy = EnergyBid([])
-                unit.energy.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1,11)]
-                if '@T1' in trader:
-                    unit.energy.minimum_load = int(trader['@MinLoadingMW'])
-                    unit.energy.t1 = int(trader['@T1'])
-                    unit.energy.t2 = int(trader['@T2'])
-                    unit.energy.t3 = int(trader['@T3'])
-                    unit.energy.t4 = int(trader['@T4'])
-            else:
-                bid_type = fcas_types[structure['@TradeType']]
-                fcas_bid = FcasBid([])
-                fcas_bid.bid_type = bid_type
-                fcas_bid.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1, 11)]
-                unit.fcas_bids[bid_type] = fcas_bid
+            bid_type = fcas_types[structure['@TradeType']]
+            fcas_bid = FcasBid([])
+            fcas_bid.bid_type = bid_type
+            fcas_bid.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1, 11)]
+            unit.fcas_bids[bid_type] = fcas_bid
 
 
 def add_peroffer(xml, units):
@@ -97,27 +121,40 @@ def add_peroffer(xml, units):
     trader_periods = xml['NEMSPDCaseFile']['NemSpdInputs']['PeriodCollection']['Period']['TraderPeriodCollection'][
         'TraderPeriod']
     for trader_period in trader_periods:
-        unit = units[trader_period['@TraderID']]
-        unit.region_id = trader_period['@RegionID']
-        if '@UIGF' in trader_period:
-            unit.forecast_poe50 = float(trader_period['@UIGF'])
-        trades = trader_period['TradeCollection']['Trade']
-        if type(trades) != list:
-            trades = [trades]
-        for trade in trades:
-            if trade['@TradeType'] == 'ENOF' or trade['@TradeType'] == 'LDOF' or trade['@TradeType'] == 'DROF':
-                unit.ramp_up_rate = float(trade['@RampUpRate'])
-                unit.ramp_down_rate = float(trade['@RampDnRate'])
-                unit.energy.max_avail = float(trade['@MaxAvail'])
-                unit.energy.band_avail = [float(trade[f'@BandAvail{i}']) for i in range(1, 11)]
-            else:
-                bid_type = fcas_types[trade['@TradeType']]
-                unit.fcas_bids[bid_type].max_avail = float(trade['@MaxAvail'])
-                unit.fcas_bids[bid_type].enablement_min = float(trade['@EnablementMin'])
-                unit.fcas_bids[bid_type].enablement_max = float(trade['@EnablementMax'])
-                unit.fcas_bids[bid_type].low_breakpoint = float(trade['@LowBreakpoint'])
-                unit.fcas_bids[bid_type].high_breakpoint = float(trade['@HighBreakpoint'])
-                unit.fcas_bids[bid_type].band_avail = [float(trade[f'@BandAvail{i}']) for i in range(1, 11)]
+        add_trader_peroffer(trader_period, units)
+
+
+def add_trader_peroffer(trader_period, units):
+    """Add period offer of one trader.
+
+    Args:
+        trader_period (dict): dictionary of the TraderPeriod element
+        units (dict): dictionary of units
+
+    Returns:
+        None
+    """
+    unit = units[trader_period['@TraderID']]
+    unit.region_id = trader_period['@RegionID']
+    if '@UIGF' in trader_period:
+        unit.forecast_poe50 = float(trader_period['@UIGF'])
+    trades = trader_period['TradeCollection']['Trade']
+    if type(trades) != list:
+        trades = [trades]
+    for trade in trades:
+        if trade['@TradeType'] == 'ENOF' or trade['@TradeType'] == 'LDOF' or trade['@TradeType'] == 'DROF':
+            unit.ramp_up_rate = float(trade['@RampUpRate'])
+            unit.ramp_down_rate = float(trade['@RampDnRate'])
+            unit.energy.max_avail = float(trade['@MaxAvail'])
+            unit.energy.band_avail = [float(trade[f'@BandAvail{i}']) for i in range(1, 11)]
+        else:
+            bid_type = fcas_types[trade['@TradeType']]
+            unit.fcas_bids[bid_type].max_avail = float(trade['@MaxAvail'])
+            unit.fcas_bids[bid_type].enablement_min = float(trade['@EnablementMin'])
+            unit.fcas_bids[bid_type].enablement_max = float(trade['@EnablementMax'])
+            unit.fcas_bids[bid_type].low_breakpoint = float(trade['@LowBreakpoint'])
+            unit.fcas_bids[bid_type].high_breakpoint = float(trade['@HighBreakpoint'])
+            unit.fcas_bids[bid_type].band_avail = [float(trade[f'@BandAvail{i}']) for i in range(1, 11)]
 
 
 def add_case(xml):
@@ -129,7 +166,18 @@ def add_case(xml):
     Returns:
         (dict, int, int): violation prices, market price cap, market price fllor
     """
-    case = xml['NEMSPDCaseFile']['NemSpdInputs']['Case']
+    return extract_case(xml['NEMSPDCaseFile']['NemSpdInputs']['Case'])
+
+
+def extract_case(case):
+    """Extract relevant prices from the Case element.
+
+    Args:
+        case (dict): dictionary of the Case element
+
+    Returns:
+        (dict, int, int): violation prices, market price cap, market price fllor
+    """
     violation_prices = {}
     for name, price in case.items():
         if name == '@VoLL':
@@ -153,13 +201,26 @@ def add_mnsp_peroffer(xml, links):
     """
     ic_periods = xml['NEMSPDCaseFile']['NemSpdInputs']['PeriodCollection']['Period']['InterconnectorPeriodCollection']['InterconnectorPeriod']
     for ic_period in ic_periods:
-        if ic_period['@InterconnectorID'] == 'T-V-MNSP1':
-            for mnsp_offer in ic_period['MNSPOfferCollection']['MNSPOffer']:
-                link = links['BLNK' + mnsp_offer['@RegionID'][:-1]]
-                link.max_avial = float(mnsp_offer['@MaxAvail'])
-                link.ramp_up_rate = float(mnsp_offer['@RampUpRate'])
-                link.ramp_down_rate = float(mnsp_offer['@RampDnRate'])
-                link.band_avail = [float(mnsp_offer[f'@BandAvail{i}']) for i in range(1, 11)]
+        add_mnsp_interconnector_period(ic_period, links)
+
+
+def add_mnsp_interconnector_period(ic_period, links):
+    """Add MNSP period offer of one interconnector.
+
+    Args:
+        ic_period (dict): dictionary of the InterconnectorPeriod element
+        links (dict): dictionary of links
+
+    Returns:
+        None
+    """
+    if ic_period['@InterconnectorID'] == 'T-V-MNSP1':
+        for mnsp_offer in ic_period['MNSPOfferCollection']['MNSPOffer']:
+            link = links['BLNK' + mnsp_offer['@RegionID'][:-1]]
+            link.max_avial = float(mnsp_offer['@MaxAvail'])
+            link.ramp_up_rate = float(mnsp_offer['@RampUpRate'])
+            link.ramp_down_rate = float(mnsp_offer['@RampDnRate'])
+            link.band_avail = [float(mnsp_offer[f'@BandAvail{i}']) for i in range(1, 11)]
 
 
 def add_mnsp_dayoffer(xml, links):
@@ -174,11 +235,24 @@ def add_mnsp_dayoffer(xml, links):
     """
     ics = xml['NEMSPDCaseFile']['NemSpdInputs']['InterconnectorCollection']['Interconnector']
     for ic in ics:
-        if ic['@InterconnectorID'] == 'T-V-MNSP1':
-            structures = ic['MNSPPriceStructureCollection']['MNSPPriceStructure']['MNSPRegionPriceStructureCollection']['MNSPRegionPriceStructure']
-            for structure in structures:
-                link = links[structure['@LinkID']]
-                link.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1, 11)]
+        add_mnsp_interconnector(ic, links)
+
+
+def add_mnsp_interconnector(ic, links):
+    """Add MNSP day offer of one interconnector.
+
+    Args:
+        ic (dict): dictionary of the Interconnector element
+        links (dict): dictionary of links
+
+    Returns:
+        None
+    """
+    if ic['@InterconnectorID'] == 'T-V-MNSP1':
+        structures = ic['MNSPPriceStructureCollection']['MNSPPriceStructure']['MNSPRegionPriceStructureCollection']['MNSPRegionPriceStructure']
+        for structure in structures:
+            link = links[structure['@LinkID']]
+            link.price_band = [float(structure[f'@PriceBand{i}']) for i in range(1, 11)]
 
 
 def add_uigf_forecast(xml, units):
@@ -265,33 +339,41 @@ def add_region_factor(constr, lhs_factor_collection, regions, fcas_flag, debug_f
 
 
 def add_generic_constraint(xml, units, regions, interconnectors, constraints, fcas_flag, debug_flag):
-    types = {'LE': '<=', 'GE': '>=', 'EQ': '='}
     for generic_constr in xml['NEMSPDCaseFile']['NemSpdInputs']['GenericConstraintCollection']['GenericConstraint']:
-        constr_id = generic_constr['@ConstraintID']
-        if constr_id not in constraints:
-            constr = constrain.Constraint(constr_id, float(generic_constr['@RHS']))
-            constr.constraint_type = types[generic_constr['@Type']]
-            constr.violation_price = float(generic_constr['@ViolationPrice'])
-            constraints[constr_id] = constr
+        add_generic_constr(generic_constr, units, regions, interconnectors, constraints, fcas_flag, debug_flag)
 
-            lhs_factor_collection = generic_constr['LHSFactorCollection']
-            add_trader_factor(constr, lhs_factor_collection, units, fcas_flag, debug_flag)
-            add_interconnector_factor(constr, lhs_factor_collection, interconnectors, debug_flag)
-            add_region_factor(constr, lhs_factor_collection, regions, fcas_flag, debug_flag)
+
+def add_generic_constr(generic_constr, units, regions, interconnectors, constraints, fcas_flag, debug_flag):
+    types = {'LE': '<=', 'GE': '>=', 'EQ': '='}
+    constr_id = generic_constr['@ConstraintID']
+    if constr_id not in constraints:
+        constr = constrain.Constraint(constr_id, float(generic_constr['@RHS']))
+        constr.constraint_type = types[generic_constr['@Type']]
+        constr.violation_price = float(generic_constr['@ViolationPrice'])
+        constraints[constr_id] = constr
+
+        lhs_factor_collection = generic_constr['LHSFactorCollection']
+        add_trader_factor(constr, lhs_factor_collection, units, fcas_flag, debug_flag)
+        add_interconnector_factor(constr, lhs_factor_collection, interconnectors, debug_flag)
+        add_region_factor(constr, lhs_factor_collection, regions, fcas_flag, debug_flag)
 
 
 def add_constraint_solution(xml, constraints):
     for constr_soln in xml['NEMSPDCaseFile']['NemSpdOutputs']['ConstraintSolution']:
-        constr_id = constr_soln['@ConstraintID']
-        if constr_id in constraints:
-            constr = constraints[constr_id]
-            xml_rhs = float(constr_soln['@RHS'])
-            if constr.rhs is None or abs(constr.rhs - xml_rhs) > 0.1:
-                constr.rhs = xml_rhs
-        else:
-            constr = constrain.Constraint(constr_id, float(constr_soln['@RHS']))
-            constr.marginal_value = float(constr_soln['@MarginalValue'])
-            constraints[constr_id] = constr
+        add_constr_soln(constr_soln, constraints)
+
+
+def add_constr_soln(constr_soln, constraints):
+    constr_id = constr_soln['@ConstraintID']
+    if constr_id in constraints:
+        constr = constraints[constr_id]
+        xml_rhs = float(constr_soln['@RHS'])
+        if constr.rhs is None or abs(constr.rhs - xml_rhs) > 0.1:
+            constr.rhs = xml_rhs
+    else:
+        constr = constrain.Constraint(constr_id, float(constr_soln['@RHS']))
+        constr.marginal_value = float(constr_soln['@MarginalValue'])
+        constraints[constr_id] = constr
 
 
 def verify_fcas(trade, fcas, duid):
@@ -383,14 +465,66 @@ def add_trader_period(xml, units, func):
 
 def add_trader_solution(xml, units):
     for trader_soln in xml['NEMSPDCaseFile']['NemSpdOutputs']['TraderSolution']:
-        trader_id = trader_soln['@TraderID']
-        if trader_id in units:
-            trader = units[trader_id]
-            trader.total_cleared_record = float(trader_soln['@EnergyTarget'])
+        add_trader_soln(trader_soln, units)
+
+
+def add_trader_soln(trader_soln, units):
+    trader_id = trader_soln['@TraderID']
+    if trader_id in units:
+        trader = units[trader_id]
+        trader.total_cleared_record = float(trader_soln['@EnergyTarget'])
+
+
+def get_xml_size(t):
+    """Get size of XML file, i.e. the extracted file or the member of the daily zip file.
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        int: size in bytes
+    """
+    outputs_dir, member = preprocess.locate_xml(t)
+    if member is None:
+        return outputs_dir.stat().st_size
+    return preprocess.get_xml_archive(t).getinfo(member).file_size
+
+
+def get_cached_xml(key):
+    """Get the cached content of XML file, marking it as recently used.
+
+    Args:
+        key (tuple): (interval datetime, 'xml' or 'sections')
+
+    Returns:
+        dict: XML to dict or streamed sections, or None if not cached
+    """
+    if key not in xml_cache:
+        return None
+    xml_cache.move_to_end(key)
+    return xml_cache[key][1]
+
+
+def cache_xml(key, size, value):
+    """Cache the content of XML file, evicting the least recently used within XML_CACHE_BUDGET.
+
+    Args:
+        key (tuple): (interval datetime, 'xml' or 'sections')
+        size (int): size of XML file in bytes
+        value (dict): XML to dict or streamed sections
+
+    Returns:
+        None
+    """
+    xml_cache[key] = (size, value)
+    total = sum(item[0] for item in xml_cache.values())
+    while total > XML_CACHE_BUDGET and len(xml_cache) > 1:
+        _, (evicted_size, _) = xml_cache.popitem(last=False)
+        total -= evicted_size
 
 
 def read_xml(t):
-    """Read XML file.
+    """Read XML file. Parsed XML is cached in process (see cache_xml).
 
     Args:
         t (datetime.datetime): current datetime
@@ -398,14 +532,101 @@ def read_xml(t):
     Returns:
         dict: XML to dict
     """
-    outputs_dir = preprocess.download_xml(t)
-    with outputs_dir.open() as f:
-        read = f.read()
-        xml = xmltodict.parse(read)
-        return xml
+    xml = get_cached_xml((t, 'xml'))
+    if xml is None:
+        with preprocess.open_xml(t) as f:
+            xml = xmltodict.parse(f)
+        cache_xml((t, 'xml'), get_xml_size(t), xml)
+    return xml
+
+
+def clear_xml_cache():
+    """Clear the parsed XML cache and close the opened daily zip files.
+
+    Returns:
+        None
+    """
+    xml_cache.clear()
+    preprocess.close_xml_archives()
+
+
+def local_name(tag):
+    """Remove namespace from tag, e.g. '{namespace}Trader' to 'Trader'."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def element_to_dict(element):
+    """Convert XML element into the same dictionary structure as xmltodict.
+
+    Args:
+        element (xml.etree.ElementTree.Element): XML element
+
+    Returns:
+        dict: element to dict, or None if the element is empty
+    """
+    d = {f'@{local_name(name)}': value for name, value in element.attrib.items()}
+    for child in element:
+        tag = local_name(child.tag)
+        value = element_to_dict(child)
+        if tag not in d:
+            d[tag] = value
+        elif type(d[tag]) != list:
+            d[tag] = [d[tag], value]
+        else:
+            d[tag].append(value)
+    return d if d else None
+
+
+def iter_xml(t, sections):
+    """Stream the required sections of XML file. Each element is cleared as soon as it has been used so that the whole
+    file is never held in memory.
+
+    Args:
+        t (datetime.datetime): current datetime
+        sections (set): set of (parent tag, tag) of required elements
+
+    Returns:
+        generator: (tag, dict) of each required element
+    """
+    path = []
+    inside = 0  # Depth of required elements being built
+    with preprocess.open_xml(t) as f:
+        for event, element in ET.iterparse(f, events=('start', 'end')):
+            tag = local_name(element.tag)
+            if event == 'start':
+                if len(path) > 0 and (path[-1], tag) in sections:
+                    inside += 1
+                path.append(tag)
+            else:
+                path.pop()
+                if len(path) > 0 and (path[-1], tag) in sections:
+                    inside -= 1
+                    yield tag, element_to_dict(element)
+                    element.clear()
+                elif inside == 0:
+                    element.clear()
+
+
+def read_sections(t):
+    """Stream the elements of all required sections of XML file in one pass. Units and links are read first and
+    generic constraints later by the formulation, so the elements are cached (see cache_xml).
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        dict: {tag: list of element dicts}
+    """
+    sections = get_cached_xml((t, 'sections'))
+    if sections is None:
+        sections = {}
+        for tag, item in iter_xml(t, SECTIONS):
+            sections.setdefault(tag, []).append(item)
+        cache_xml((t, 'sections'), get_xml_size(t), sections)
+    return sections
 
 
-def add_nemspdoutputs(t, units, links, link_flag, process):
+def add_nemspdoutputs(t, units, links, link_flag, process, stream_flag=True):
     """Add required information of link from XML file.
 
     Args:
@@ -414,10 +635,13 @@ def add_nemspdoutputs(t, units, links, link_flag, process):
         links (dict): dictionary of links
         link_flag (bool): consider link or not
         process (str): process type
+        stream_flag (bool): stream XML file (default) instead of parsing the whole file into dict
 
     Returns:
 
     """
+    if stream_flag:
+        return stream_nemspdoutputs(t, units, links, link_flag, process)
     xml = read_xml(t)
     add_dayoffer(xml, units)
     add_peroffer(xml, units)
@@ -432,7 +656,9 @@ def add_nemspdoutputs(t, units, links, link_flag, process):
     return add_case(xml)
 
 
-def add_xml_constr(t, start, predispatch_t, process, units, regions, interconnectors, constraints, fcas_flag, debug_flag):
+def add_xml_constr(t, start, predispatch_t, process, units, regions, interconnectors, constraints, fcas_flag, debug_flag, stream_flag=True):
+    if stream_flag:
+        return stream_xml_constr(t, start, predispatch_t, process, units, regions, interconnectors, constraints, fcas_flag, debug_flag)
     xml = read_xml(t)
     add_generic_constraint(xml, units, regions, interconnectors, constraints, fcas_flag, debug_flag)
     add_constraint_solution(xml, constraints)
@@ -447,6 +673,53 @@ def add_xml_constr(t, start, predispatch_t, process, units, regions, interconnec
         constrain.add_dispatch_constraint(t, constraints, debug_flag)
 
 
+def stream_nemspdoutputs(t, units, links, link_flag, process):
+    """Add required information of units and links by streaming XML file, i.e. the same as add_nemspdoutputs but
+    without building the whole XML dict.
+
+    Args:
+        t (datetime.datetime): current datetime
+        units (dict): dictionary of units
+        links (dict): dictionary of links
+        link_flag (bool): consider link or not
+        process (str): process type
+
+    Returns:
+        (dict, int, int): violation prices, market price cap, market price fllor
+    """
+    sections = read_sections(t)
+    # Period offers and solutions refer to units created by day offers
+    for trader in sections.get('Trader', []):
+        add_trader(trader, units)
+    for trader_period in sections.get('TraderPeriod', []):
+        add_trader_peroffer(trader_period, units)
+    for trader_soln in sections.get('TraderSolution', []):
+        add_trader_soln(trader_soln, units)
+    if link_flag:
+        for ic_period in sections.get('InterconnectorPeriod', []):
+            add_mnsp_interconnector_period(ic_period, links)
+        for ic in sections.get('Interconnector', []):
+            add_mnsp_interconnector(ic, links)
+    return extract_case(sections['Case'][0])
+
+
+def stream_xml_constr(t, start, predispatch_t, process, units, regions, interconnectors, constraints, fcas_flag, debug_flag):
+    """Add generic constraints by streaming XML file, i.e. the same as add_xml_constr but without building the whole
+    XML dict.
+    """
+    sections = read_sections(t)
+    for generic_constr in sections.get('GenericConstraint', []):
+        add_generic_constr(generic_constr, units, regions, interconnectors, constraints, fcas_flag, debug_flag)
+    for constr_soln in sections.get('ConstraintSolution', []):
+        add_constr_soln(constr_soln, constraints)
+    if process == 'predispatch':
+        constrain.add_predispatch_constraint(predispatch_t, start, constraints, debug_flag)
+    elif process == 'p5min':
+        constrain.add_p5min_constraint(t, start, constraints, debug_flag)
+    else:
+        constrain.add_dispatch_constraint(t, constraints, debug_flag)
+
+
 def add_nemspdoutputs_fcas(t, units, func):
     xml = read_xml(t)
     add_trader_period(xml, units, func)
@@ -1,6 +1,11 @@
+import collections
 import csv
 import preprocess
 import default
+import types
+
+MAX_REFERENCE_MONTHS = 4  # Maximum number of (file, month) lookup tables kept in the process
+reference_tables = collections.OrderedDict()  # Lookup tables of simplified files, i.e. {(file name, year, month): table}
 
 
 def simplify_dudetailsummary(t, out_file):
@@ -22,98 +27,129 @@ def simplify_dudetailsummary(t, out_file):
             writer.writerow(['D', duid, value[0], value[1]])
 
 
-def add_simplified_dudetailsummary(units, t):
-    in_file = default.DATA_DIR / 'predefined' / f'DUDETAILSUMMARY_{t.year}{t.month:02d}01.csv'
+def get_reference_table(name, t, load):
+    """Get the lookup table of a simplified monthly file, loading it once per month and keeping the recent ones.
+
+    Args:
+        name (str): name of the simplified file
+        t (datetime.datetime): current datetime
+        load (function): function to load the table, i.e. load(in_file, t) returns dict
+
+    Returns:
+        types.MappingProxyType: read-only lookup table
+    """
+    key = (name, t.year, t.month)
+    if key in reference_tables:
+        reference_tables.move_to_end(key)
+        return reference_tables[key]
+    table = types.MappingProxyType(load(default.DATA_DIR / 'predefined' / f'{name}_{t.year}{t.month:02d}01.csv', t))
+    reference_tables[key] = table
+    while len(reference_tables) > MAX_REFERENCE_MONTHS:
+        reference_tables.popitem(last=False)
+    return table
+
+
+def simplify_dvd_data(table, t, out_file, get_key):
+    """Keep the rows of interest of the monthly DVD file in a simplified file. Later rows of the same key overwrite
+    former ones.
+
+    Args:
+        table (str): table name
+        t (datetime.datetime): current datetime
+        out_file (pathlib.Path): path to the simplified file
+        get_key (function): function to get the key of a D row, or None to skip the row
+
+    Returns:
+        None
+    """
+    rows = {}
+    with preprocess.download_dvd_data(table, t).open() as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if row[0] == 'I':
+                rows['I'] = row
+            elif row[0] == 'D':
+                key = get_key(row)
+                if key is not None:
+                    rows[key] = row
+    with out_file.open('w') as wf:
+        writer = csv.writer(wf)
+        writer.writerows([r for r in rows.values()])
+
+
+def load_dudetailsummary(in_file, t):
     if not in_file.is_file():
         simplify_dudetailsummary(t, in_file)
+    table = {}
     with in_file.open() as f:
         reader = csv.reader(f)
         for row in reader:
             if row[0] == 'D':
-                unit = units.get(row[1])
-                if unit:
-                    unit.region_id = row[2]
-                    unit.transmission_loss_factor = float(row[3])
+                table[row[1]] = (row[2], float(row[3]))
+    return table
+
+
+def add_simplified_dudetailsummary(units, t):
+    table = get_reference_table('DUDETAILSUMMARY', t, load_dudetailsummary)
+    for duid in units.keys() & table.keys():
+        unit = units[duid]
+        unit.region_id, unit.transmission_loss_factor = table[duid]
 
 
 def add_simplified_interconnector_constraint(interconnectors, t):
-    out_file = default.DATA_DIR / 'predefined' / f'INTERCONNECTORCONSTRAINT_{t.year}{t.month:02d}01.csv'
-    if not out_file.is_file():
-        ic_dir = preprocess.download_dvd_data('INTERCONNECTORCONSTRAINT', t)
-        rows = {}
-        with ic_dir.open() as f:
+    def load(in_file, t):
+        if not in_file.is_file():
+            simplify_dvd_data('INTERCONNECTORCONSTRAINT', t, in_file, lambda row: row[8] if row[8] in interconnectors else None)
+        table = {}
+        with in_file.open() as f:
             reader = csv.reader(f)
             for row in reader:
-                if row[0] == 'I':
-                    rows['I'] = row
-                elif row[0] == 'D' and row[8] in interconnectors:
-                    rows[row[8]] = row
-        with out_file.open('w') as wf:
-            writer = csv.writer(wf)
-            writer.writerows([r for r in rows.values()])
-    with out_file.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D':
-                ic = interconnectors.get(row[8])
-                if ic:
-                    ic.from_region_loss_share = float(row[5])
-                    # ic.max_mw_in = float(row[9])
-                    # ic.max_mw_out = float(row[10])
-                    ic.loss_constant = float(row[11])
-                    ic.loss_flow_coefficient = float(row[12])
-                    ic.import_limit = int(row[17])
-                    ic.export_limit = int(row[18])
-                    # ic.fcas_support_unavailable = int(row[24])
-                    # ic.ic_type = row[25]
+                if row[0] == 'D':
+                    table[row[8]] = (float(row[5]), float(row[11]), float(row[12]), int(row[17]), int(row[18]))
+                    # max_mw_in = float(row[9])
+                    # max_mw_out = float(row[10])
+                    # fcas_support_unavailable = int(row[24])
+                    # ic_type = row[25]
+        return table
+
+    table = get_reference_table('INTERCONNECTORCONSTRAINT', t, load)
+    for ic_id in interconnectors.keys() & table.keys():
+        ic = interconnectors[ic_id]
+        ic.from_region_loss_share, ic.loss_constant, ic.loss_flow_coefficient, ic.import_limit, ic.export_limit = table[ic_id]
 
 
 def add_simplified_loss_factor_model(interconnectors, t):
-    out_file = default.DATA_DIR / 'predefined' / f'LOSSFACTORMODEL_{t.year}{t.month:02d}01.csv'
-    if not out_file.is_file():
-        lfm_dir = preprocess.download_dvd_data('LOSSFACTORMODEL', t)
-        rows = {}
-        with lfm_dir.open() as f:
+    def load(in_file, t):
+        if not in_file.is_file():
+            simplify_dvd_data('LOSSFACTORMODEL', t, in_file, lambda row: row[6] + row[7] if row[6] in interconnectors else None)
+        table = {}
+        with in_file.open() as f:
             reader = csv.reader(f)
             for row in reader:
-                if row[0] == 'I':
-                    rows['I'] = row
-                elif row[0] == 'D' and row[6] in interconnectors:
-                    rows[row[6]+row[7]] = row
-        with out_file.open('w') as wf:
-            writer = csv.writer(wf)
-            writer.writerows([r for r in rows.values()])
-    with out_file.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D':
-                ic = interconnectors.get(row[6])
-                if ic:
-                    ic.demand_coefficient[row[7]] = float(row[8])
+                if row[0] == 'D':
+                    table.setdefault(row[6], []).append((row[7], float(row[8])))
+        return {ic_id: tuple(coefficients) for ic_id, coefficients in table.items()}
+
+    table = get_reference_table('LOSSFACTORMODEL', t, load)
+    for ic_id in interconnectors.keys() & table.keys():
+        interconnectors[ic_id].demand_coefficient.update(table[ic_id])
 
 
 def add_simplified_loss_model(interconnectors, t):
-    out_file = default.DATA_DIR / 'predefined' / f'LOSSMODEL_{t.year}{t.month:02d}01.csv'
-    if not out_file.is_file():
-        lm_dir = preprocess.download_dvd_data('LOSSMODEL', t)
-        rows = {}
-        with lm_dir.open() as f:
+    def load(in_file, t):
+        if not in_file.is_file():
+            simplify_dvd_data('LOSSMODEL', t, in_file, lambda row: row[6] + row[8] if row[6] in interconnectors else None)
+        table = {}
+        with in_file.open() as f:
             reader = csv.reader(f)
             for row in reader:
-                if row[0] == 'I':
-                    rows['I'] = row
-                elif row[0] == 'D' and row[6] in interconnectors:
-                    rows[row[6] + row[8]] = row
-        with out_file.open('w') as wf:
-            writer = csv.writer(wf)
-            writer.writerows([r for r in rows.values()])
-    with out_file.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D':
-                ic = interconnectors.get(row[6])
-                if ic:
-                    ic.mw_breakpoint[int(row[8])] = float(row[9])
+                if row[0] == 'D':
+                    table.setdefault(row[6], []).append((int(row[8]), float(row[9])))
+        return {ic_id: tuple(breakpoints) for ic_id, breakpoints in table.items()}
+
+    table = get_reference_table('LOSSMODEL', t, load)
+    for ic_id in interconnectors.keys() & table.keys():
+        interconnectors[ic_id].mw_breakpoint.update(table[ic_id])
 
 
 def add_simplified_mnsp_interconnector(links, t):
@@ -126,30 +162,23 @@ def add_simplified_mnsp_interconnector(links, t):
     Returns:
         None
     """
-    out_file = default.DATA_DIR / 'predefined' / f'MNSP_INTERCONNECTOR_{t.year}{t.month:02d}01.csv'
-    if not out_file.is_file():
-        mnsp_dir = preprocess.download_dvd_data('MNSP_INTERCONNECTOR', t)
-        rows = {}
-        with mnsp_dir.open() as f:
+    def load(in_file, t):
+        if not in_file.is_file():
+            simplify_dvd_data('MNSP_INTERCONNECTOR', t, in_file, lambda row: row[4] if row[4] in links else None)
+        table = {}
+        with in_file.open() as f:
             reader = csv.reader(f)
             for row in reader:
-                if row[0] == 'I':
-                    rows['I'] = row
-                elif row [0] == 'D' and row[4] in links:
-                    rows [row[4]] = row
-        with out_file.open('w') as wf:
-            writer = csv.writer(wf)
-            writer.writerows([r for r in rows.values()])
-    with out_file.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and default.extract_datetime(row[5]) <= t:
-                link = links.get(row[4])
-                if link:
-                    link.interconnector_id = row[7]
-                    link.from_region = row[8]
-                    link.to_region = row[9]
-                    link.max_capacity = int(row[10])
-                    link.lhs_factor = float(row[12])
-                    link.from_region_tlf = float(row[17]) if row[17] else None
-                    link.to_region_tlf = float(row[18]) if row[18] else None
\ No newline at end of file
+                if row[0] == 'D':
+                    table[row[4]] = (default.extract_datetime(row[5]), row[7], row[8], row[9], int(row[10]),
+                                     float(row[12]), float(row[17]) if row[17] else None,
+                                     float(row[18]) if row[18] else None)
+        return table
+
+    table = get_reference_table('MNSP_INTERCONNECTOR', t, load)
+    for link_id in links.keys() & table.keys():
+        effective_date, *values = table[link_id]
+        if effective_date <= t:
+            link = links[link_id]
+            (link.interconnector_id, link.from_region, link.to_region, link.max_capacity, link.lhs_factor,
+             link.from_region_tlf, link.to_region_tlf) = values
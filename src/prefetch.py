@@ -0,0 +1,104 @@
+import datetime
+import default
+import logging
+import preprocess
+import time
+import traceback
+from multiprocessing.pool import ThreadPool as Pool
+
+# Report type: (download function, step between files)
+REPORTS = {
+    'xml': (preprocess.download_xml_archive, default.ONE_DAY),
+    'dispatch': (preprocess.download_dispatch_summary, default.FIVE_MIN),
+    'p5min': (preprocess.download_5min_predispatch, default.FIVE_MIN),
+    'scada': (preprocess.download_dispatch_scada, default.FIVE_MIN),
+    'predispatch': (preprocess.download_predispatch, default.THIRTY_MIN),
+    'tradingis': (preprocess.download_tradingis, default.THIRTY_MIN),
+    'next_day_dispatch': (preprocess.download_next_day_dispatch, default.ONE_DAY),
+    'next_day_predispatch': (preprocess.download_next_day_predispatch, default.ONE_DAY),
+    'bidmove_complete': (preprocess.download_bidmove_complete, default.ONE_DAY),
+    'mnsp_bids': (preprocess.download_mnsp_bids, default.ONE_DAY),
+    'intermittent': (preprocess.download_intermittent, default.ONE_DAY)
+}
+
+
+def generate_tasks(start, end, reports):
+    """Generate download tasks of the given reports between start and end dates.
+
+    Args:
+        start (datetime.datetime): start date
+        end (datetime.datetime): end date (inclusive)
+        reports (list): list of report types, i.e. keys of REPORTS
+
+    Returns:
+        list: list of (report type, datetime)
+    """
+    tasks = []
+    for report in reports:
+        _, step = REPORTS[report]
+        if step == default.ONE_DAY:
+            t = datetime.datetime(start.year, start.month, start.day, 4, 5)
+            last = datetime.datetime(end.year, end.month, end.day, 4, 5)
+        else:  # All intervals or periods of trading days, i.e. 04:05 (or 04:30) to 04:00 of the next day
+            t = datetime.datetime(start.year, start.month, start.day, 4, 0) + step
+            last = datetime.datetime(end.year, end.month, end.day, 4, 0) + default.ONE_DAY
+        while t <= last:
+            tasks.append((report, t))
+            t += step
+    return tasks
+
+
+def download_task(task):
+    """Download one file. Existing files and archive zip files are skipped by the download functions, so an interrupted
+    prefetch resumes where it stopped.
+
+    Args:
+        task (tuple): (report type, datetime)
+
+    Returns:
+        (tuple, bool): task, succeeded or not
+    """
+    report, t = task
+    func, _ = REPORTS[report]
+    try:
+        func(t)
+        return task, True
+    except Exception:
+        logging.error(f'Cannot prefetch {report} {t}.\n{traceback.format_exc()}')
+        return task, False
+
+
+def prefetch(start, end, reports, workers=8):
+    """Download reports between start and end dates concurrently.
+
+    Args:
+        start (datetime.datetime): start date
+        end (datetime.datetime): end date (inclusive)
+        reports (list): list of report types, i.e. keys of REPORTS
+        workers (int): maximum number of concurrent downloads
+
+    Returns:
+        list: failed tasks
+    """
+    tasks = generate_tasks(start, end, reports)
+    start_time = time.time()
+    # Download daily files first so that later tasks of the same day don't fetch them concurrently
+    daily_tasks = [task for task in tasks if REPORTS[task[0]][1] == default.ONE_DAY]
+    other_tasks = [task for task in tasks if REPORTS[task[0]][1] != default.ONE_DAY]
+    failed = []
+    with Pool(workers) as pool:
+        for task_list in [daily_tasks, other_tasks]:
+            for task, ok in pool.imap_unordered(download_task, task_list):
+                if not ok:
+                    failed.append(task)
+    logging.info(f'Prefetched {len(tasks) - len(failed)}/{len(tasks)} files in {time.time() - start_time:.1f}s.')
+    return failed
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    start = datetime.datetime(2021, 7, 18)
+    end = datetime.datetime(2021, 7, 24)
+    failed = prefetch(start, end, ['xml', 'dispatch', 'p5min', 'predispatch', 'next_day_dispatch'])
+    for report, t in failed:
+        print(f'Failed: {report} {t}')
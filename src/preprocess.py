@@ -1,10 +1,19 @@
+import bisect
+import collections
 import csv
+import datasource
 import datetime
 import default
 import logging
 import io
+import json
+import mms
+import os
+import pathlib
+import pickle
 import re
-import requests
+import threading
+import time
 import zipfile
 
 
@@ -23,6 +32,32 @@ NEMSPDOutputs_dir.mkdir(parents=True, exist_ok=True)
 CURRENT_URL = 'http://nemweb.com.au/Reports/Current'  # Base URL to download files
 ARCHIVE_URL = 'http://nemweb.com.au/Reports/Archive/'  # Archive URL to download files
 DVD_URL = 'http://www.nemweb.com.au/Data_Archive/Wholesale_Electricity/MMSDM/{}/MMSDM_{}_{:02d}/MMSDM_Historical_Data_SQLLoader/DATA/'
+CURRENT_LISTING_TTL = 300  # Seconds to reuse directory listing of Current section (Archive listing is kept permanently)
+listings = {}  # Directory listings, i.e. {URL: (fetched time, sorted file names, sorted (name, case datetime, report datetime))}
+listings_lock = threading.Lock()  # Lock of invalidating listings shared by prefetch threads
+MAX_SPLIT_WRITERS = 64  # Maximum number of shard files kept open while splitting a file
+SPLIT_BUFFER_SIZE = 1024 * 1024  # Buffer size (bytes) of each shard file while splitting a file
+archive_dir = default.DATA_DIR / 'archive'  # Downloaded zip files of Archive sections
+archive_locks = collections.defaultdict(threading.Lock)  # Locks of archive zip files being downloaded, i.e. {path: lock}
+archive_locks_lock = threading.Lock()
+market_price_thresholds = {}  # {(year, month): (sorted effective datetimes, [(VoLL, market price floor)])}
+
+
+def get_market_price_thresholds(t):
+    """Get market price thresholds of the month, converted once per process.
+
+    Args:
+        t (datetime.datetime): Current datetime
+
+    Returns:
+        (list, list): sorted effective datetimes, (Market Price Cap, Market Price Floor) of each effective datetime
+    """
+    key = (t.year, t.month)
+    thresholds = market_price_thresholds.get(key)
+    if thresholds is None:
+        dates, rows = index_dvd_data('MARKET_PRICE_THRESHOLDS', t, (), 4).get((), ([], []))
+        thresholds = market_price_thresholds[key] = (dates, [(float(row[6]), float(row[7])) for row in rows])
+    return thresholds
 
 
 def get_market_price(t):
@@ -34,15 +69,11 @@ def get_market_price(t):
     Returns:
         Market Price Cap, Market Price Floor
     """
-    constr_dir = download_dvd_data('MARKET_PRICE_THRESHOLDS', t)
-    # logging.info('Read Market Price Cap (MPC).')
-    with constr_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and t >= default.extract_datetime(row[4]):
-                voll = float(row[6])
-                market_price_floor = float(row[7])
-    return voll, market_price_floor
+    dates, prices = get_market_price_thresholds(t)
+    i = bisect.bisect_right(dates, t)
+    if i == 0:
+        raise ValueError(f'No market price thresholds effective at {t}.')
+    return prices[i - 1]
 
 
 def new_dir(t):
@@ -60,20 +91,89 @@ def read_p5min_unit_solution(start):
     return p
 
 
+def read_csv_rows(*paths):
+    """Read rows of CSV files one after another.
+
+    Args:
+        paths (pathlib.Path): paths to the files
+
+    Returns:
+        generator: rows
+    """
+    for p in paths:
+        with p.open() as f:
+            yield from csv.reader(f)
+
+
+def split_rows(rows, get_path, max_writers=MAX_SPLIT_WRITERS):
+    """Split rows into shard files in one pass. At most max_writers shards are kept open with buffered writers (the
+    least recently used is closed and reopened for appending when needed). Shards are written to temporary files and
+    renamed at the end, so that a partial shard is never left at its path.
+
+    Args:
+        rows (iterable): rows
+        get_path (function): function to get the path to the shard of the row, or None to skip the row
+        max_writers (int): maximum number of open shard files
+
+    Returns:
+        list: paths to the shards
+    """
+    writers = collections.OrderedDict()  # {path to shard: (file, writer)}
+    temp_paths = {}  # {path to shard: path to temporary file}
+    try:
+        for row in rows:
+            p = get_path(row)
+            if p is None:
+                continue
+            if p in writers:
+                writers.move_to_end(p)
+            else:
+                if len(writers) >= max_writers:
+                    _, (f, _) = writers.popitem(last=False)
+                    f.close()
+                if p in temp_paths:
+                    f = temp_paths[p].open('a', buffering=SPLIT_BUFFER_SIZE)
+                else:
+                    temp_paths[p] = p.with_name(f'{p.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+                    f = temp_paths[p].open('w', buffering=SPLIT_BUFFER_SIZE)
+                writers[p] = (f, csv.writer(f))
+            writers[p][1].writerow(row)
+    except BaseException:
+        for f, _ in writers.values():
+            f.close()
+        for temp_path in temp_paths.values():
+            temp_path.unlink(missing_ok=True)
+        raise
+    for f, _ in writers.values():
+        f.close()
+    for p, temp_path in temp_paths.items():
+        temp_path.replace(p)
+    return list(temp_paths)
+
+
 def preprocess_p5min_unit_solution(current):
+    """Split monthly P5MIN_UNITSOLUTION into one file per run in one pass.
+
+    Args:
+        current (datetime.datetime): datetime in the month
+
+    Returns:
+        None
+    """
     section = 'P5MIN_UNITSOLUTION'
     from_path = dvd_dir / f'PUBLIC_DVD_{section}_{current.year}{current.month:02d}010000.CSV'
-    with from_path.open('r') as infile:
-        reader = csv.reader(infile)
-        for row in reader:
-            if row[0] == 'I':
-                head = row
-            elif row[0] == 'D':
-                t = default.extract_datetime(row[4])
-                to_path = p5min_dir / f'DVD_{section}_{default.get_case_datetime(t)}.csv'
-                with to_path.open('a+') as f:
-                    writer = csv.writer(f, delimiter=',')
-                    writer.writerow(row)
+    paths = {}  # {run datetime string: path to shard}
+
+    def get_path(row):
+        if row[0] != 'D':
+            return None
+        p = paths.get(row[4])
+        if p is None:
+            t = default.extract_datetime(row[4])
+            p = paths[row[4]] = p5min_dir / f'DVD_{section}_{default.get_case_datetime(t)}.csv'
+        return p
+
+    split_rows(read_csv_rows(from_path), get_path)
 
 
 def process_p5min_unit_solution(current):
@@ -111,7 +211,7 @@ def download_p5min_unit_solution(current):
     p = dvd_dir / f'PUBLIC_DVD_{section}_{year}{month:02d}010000.CSV'
     if not p.is_file():
         url = (DVD_URL + '/PUBLIC_DVD_{}_{}{:02d}010000.zip').format(year, year, month, section, year, month)
-        result = requests.get(url)
+        result = datasource.get(url)
         if result.ok:
             with zipfile.ZipFile(io.BytesIO(result.content)) as zf:
                 csv_name = zf.namelist()[0]
@@ -169,19 +269,22 @@ def preprocess_predispatchload(start):
         None
     """
     first_period = default.get_first_datetime(start, 'predispatch')
-    for date in [first_period, first_period + default.ONE_DAY]:
-        record_dir = download_next_day_predispatch(date)
-        with record_dir.open() as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row[0] == 'D' and row[2] == 'UNIT_SOLUTION':
-                    t, no = default.extract_from_interval_no(interval_no=row[4], period_flag=True)
-                    if t.month == first_period.month and t.day == first_period.day:
-                        current = first_period + (no - 1) * default.THIRTY_MIN
-                        to_path = new_dir(first_period) / f'PREDISPATCHLOAD_{default.get_case_datetime(current)}.csv'
-                        with to_path.open(mode='a+') as f:
-                            writer = csv.writer(f)
-                            writer.writerow(row)
+    record_dirs = [download_next_day_predispatch(date) for date in [first_period, first_period + default.ONE_DAY]]
+    paths = {}  # {period ID: path to shard}
+
+    def get_path(row):
+        if row[0] != 'D' or row[2] != 'UNIT_SOLUTION':
+            return None
+        if row[4] not in paths:
+            t, no = default.extract_from_interval_no(interval_no=row[4], period_flag=True)
+            if t.month == first_period.month and t.day == first_period.day:
+                current = first_period + (no - 1) * default.THIRTY_MIN
+                paths[row[4]] = new_dir(first_period) / f'PREDISPATCHLOAD_{default.get_case_datetime(current)}.csv'
+            else:
+                paths[row[4]] = None
+        return paths[row[4]]
+
+    split_rows(read_csv_rows(*record_dirs), get_path)
 
 
 def read_predispatchload(start):
@@ -199,6 +302,23 @@ def read_predispatchload(start):
     return p
 
 
+def write_file(p, content):
+    """Write content to a temporary file and then rename it, so that a partial file is never left at the path even if
+    the download is interrupted or another thread writes the same file.
+
+    Args:
+        p (pathlib.Path): path to the file
+        content (bytes): content
+
+    Returns:
+        None
+    """
+    temp_path = p.with_name(f'{p.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    with temp_path.open('wb') as f:
+        f.write(content)
+    temp_path.replace(p)
+
+
 def download_from_url(url, file):
     """Download file from the given url.
 
@@ -210,14 +330,114 @@ def download_from_url(url, file):
         None
 
     """
-    result = requests.get(url)
+    result = datasource.get(url)
     if result.ok:
-        with file.open('wb') as f:
-            f.write(result.content)
+        write_file(file, result.content)
     else:
         print('Download error!')
 
 
+MAX_XML_ARCHIVES = 2  # Maximum number of daily NemSpdOutputs zip files kept open, e.g. two trading days of a horizon
+xml_archives = collections.OrderedDict()  # Opened daily NemSpdOutputs zip files, i.e. {zip name: (pid, zipfile.ZipFile)}
+xml_archives_lock = threading.Lock()
+
+
+def download_xml_archive(t):
+    """ Download the daily NemSpdOutputs zip file once and keep it in NEMSPDOutputs directory.
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        pathlib.Path: path to the zip file
+    """
+    last, no = default.datetime_to_interval(t)
+    p = NEMSPDOutputs_dir / f'NemSpdOutputs_{last.year}{last.month:02d}{last.day:02d}_loaded.zip'
+    if not p.is_file():
+        url = f'https://www.nemweb.com.au/Data_Archive/Wholesale_Electricity/NEMDE/{last.year}/NEMDE_{last.year}_{last.month:02d}/NEMDE_Market_Data/NEMDE_Files/{p.name}'
+        r = datasource.get(url)
+        if r.ok:
+            write_file(p, r.content)
+        else:
+            logging.error(f'Cannot download from URL: {url}.')
+    return p
+
+
+def get_xml_archive(t):
+    """ Get the opened daily NemSpdOutputs zip file. Opening the zip reads its central directory once, which then works
+        as the index of members (member name to offset). Zip files of the least recently used days are closed beyond
+        MAX_XML_ARCHIVES (members being streamed stay readable until they are closed).
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        zipfile.ZipFile: opened zip file
+    """
+    p = download_xml_archive(t)
+    with xml_archives_lock:
+        pid, zf = xml_archives.get(p.name, (None, None))
+        if pid != os.getpid():  # Forked processes should not share the file offset with the parent
+            zf = zipfile.ZipFile(p)
+            xml_archives[p.name] = (os.getpid(), zf)
+        xml_archives.move_to_end(p.name)
+        while len(xml_archives) > MAX_XML_ARCHIVES:
+            _, (evicted_pid, evicted_zf) = xml_archives.popitem(last=False)
+            if evicted_pid == os.getpid():
+                evicted_zf.close()
+    return zf
+
+
+def close_xml_archives():
+    """ Close the daily NemSpdOutputs zip files opened by this process.
+
+    Returns:
+        None
+    """
+    with xml_archives_lock:
+        while xml_archives:
+            _, (pid, zf) = xml_archives.popitem()
+            if pid == os.getpid():
+                zf.close()
+
+
+def locate_xml(t):
+    """ Locate XML file, either extracted file or member of the daily zip file.
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        (pathlib.Path, str): path to the extracted file or the zip file, member name (None if extracted)
+    """
+    last, no = default.datetime_to_interval(t)
+    names = [f'NEMSPDOutputs_{last.year}{last.month:02d}{last.day:02d}{no:03d}00.loaded',
+             f'NEMSPDOutputs_{last.year}{last.month:02d}{last.day:02d}{no:03d}00_OCD.loaded']
+    for name in names:
+        if (NEMSPDOutputs_dir / name).is_file():
+            return NEMSPDOutputs_dir / name, None
+    zf = get_xml_archive(t)
+    for name in names:
+        if name in zf.NameToInfo:
+            return pathlib.Path(zf.filename), name
+    raise FileNotFoundError(f'{names[0]} not found.')
+
+
+def open_xml(t):
+    """ Open XML file. Member of the daily zip file is streamed without being extracted.
+
+    Args:
+        t (datetime.datetime): current datetime
+
+    Returns:
+        file object in binary mode
+    """
+    p, member = locate_xml(t)
+    if member is None:
+        return p.open('rb')
+    return get_xml_archive(t).open(member)
+
+
 def download_xml(t, all_flag=False):
     """ Download XML file.
 
@@ -232,9 +452,7 @@ def download_xml(t, all_flag=False):
     if not f.is_file():
         ocd_f = NEMSPDOutputs_dir / f'NEMSPDOutputs_{last.year}{last.month:02d}{last.day:02d}{no:03d}00_OCD.loaded'
         if not ocd_f.is_file():
-            url = f'https://www.nemweb.com.au/Data_Archive/Wholesale_Electricity/NEMDE/{last.year}/NEMDE_{last.year}_{last.month:02d}/NEMDE_Market_Data/NEMDE_Files/NemSpdOutputs_{last.year}{last.month:02d}{last.day:02d}_loaded.zip'
-            r = requests.get(url)
-            zf = zipfile.ZipFile(io.BytesIO(r.content))
+            zf = get_xml_archive(t)
             for xml_file in zf.infolist():
                 if all_flag:
                     zf.extract(xml_file, NEMSPDOutputs_dir)
@@ -259,18 +477,123 @@ def download(url, p):
         None
 
     """
-    result = requests.get(url)
+    result = datasource.get(url)
     # print(url)
     if result.ok:
         with zipfile.ZipFile(io.BytesIO(result.content)) as zf:
             csv_name = zf.namelist()[0]
             # logging.info(f'Download {csv_name}')
-            with p.open('wb') as f:
-                f.write(zf.read(csv_name))
+            write_file(p, zf.read(csv_name))
             if not p.is_file():
                 logging.error(f'Cannot download from URL: {url}.')
 
 
+def extract_listing_datetime(digits):
+    """Convert digits in file name into datetime, e.g. 20210718 or 202107180405 or 20210718040519.
+
+    Args:
+        digits (str): digits
+
+    Returns:
+        datetime.datetime: datetime, or None if the digits are not datetime (e.g. event queue ID)
+    """
+    formats = {8: '%Y%m%d', 12: '%Y%m%d%H%M', 14: '%Y%m%d%H%M%S'}
+    try:
+        return datetime.datetime.strptime(digits, formats[len(digits)])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_listing(url, ttl=None):
+    """Get directory listing parsed into sorted file names. The listing is fetched once and then reused within TTL
+    (or permanently if TTL is None).
+
+    Args:
+        url (str): URL of the directory
+        ttl (float): seconds to reuse the listing, or None to reuse permanently
+
+    Returns:
+        (list, list): sorted file names, sorted (file name, case datetime, report datetime)
+    """
+    listing = listings.get(url)
+    if listing is None or (ttl is not None and time.time() - listing[0] > ttl):
+        page = datasource.get(url)
+        names = sorted(set(re.findall(r'>([^<>/\s]+\.[A-Za-z]+)<', page.text)))
+        entries = []
+        for name in names:
+            digits = re.findall(r'(?<![0-9])[0-9]{8,16}(?![0-9])', name)
+            entries.append((name,
+                            extract_listing_datetime(digits[0]) if len(digits) > 0 else None,
+                            extract_listing_datetime(digits[1]) if len(digits) > 1 else None))
+        listing = (time.time(), names, entries)
+        listings[url] = listing
+    return listing[1], listing[2]
+
+
+def find_files(url, pattern, ttl=None):
+    """Find file names in the directory listing matching the pattern. The literal prefix of the pattern is located by
+    binary search and only names sharing the prefix are matched. If nothing matches a listing fetched earlier, the
+    listing is refreshed once in case the file has been published (or archived) since.
+
+    Args:
+        url (str): URL of the directory
+        pattern (str): regular expression of the file name
+        ttl (float): seconds to reuse the listing, or None to reuse permanently
+
+    Returns:
+        list: matched file names
+    """
+    def search(names):
+        m = re.search(r'[\\\[\](){}.*+?|^$]', pattern)
+        prefix = pattern if m is None else pattern[:m.start()]
+        regex = re.compile(pattern)
+        i = bisect.bisect_left(names, prefix)
+        matches = []
+        while i < len(names) and names[i].startswith(prefix):
+            if regex.fullmatch(names[i]):
+                matches.append(names[i])
+            i += 1
+        return matches
+
+    cached = listings.get(url)
+    names, _ = get_listing(url, ttl)
+    matches = search(names)
+    if len(matches) == 0 and cached is not None and listings.get(url) is cached:
+        with listings_lock:
+            if listings.get(url) is cached:  # Otherwise another thread has refreshed it already
+                listings.pop(url)
+        names, _ = get_listing(url, ttl)
+        matches = search(names)
+    return matches
+
+
+def download_archive(section, name):
+    """Download zip file of the Archive section once and keep it in archive directory. Files of other intervals (or a
+    resumed prefetch) are then extracted from the local zip file instead of downloading the whole archive again.
+
+    Args:
+        section (str): Section to download from
+        name (str): Name of the zip file
+
+    Returns:
+        pathlib.Path: path to the zip file, or None if failed to download
+    """
+    p = archive_dir / section / name
+    if not p.is_file():
+        with archive_locks_lock:
+            lock = archive_locks[p]
+        with lock:  # Other threads needing the same archive wait for it rather than downloading it again
+            if not p.is_file():
+                url = f'{ARCHIVE_URL}/{section}/{name}'
+                result = datasource.get(url)
+                if not result.ok:
+                    logging.error(f'Cannot download from URL: {url}.')
+                    return None
+                p.parent.mkdir(parents=True, exist_ok=True)
+                write_file(p, result.content)
+    return p
+
+
 def download_file(section, file_pattern, date_pattern, file, t, archive_pattern=None):
     """Download a matched file from the section.
 
@@ -285,38 +608,32 @@ def download_file(section, file_pattern, date_pattern, file, t, archive_pattern=
         None
 
     """
-    page = requests.get(f'{CURRENT_URL}/{section}')
-    regex = re.compile(f'{file_pattern}_{date_pattern}<')
-    matches = regex.findall(page.text)
+    matches = find_files(f'{CURRENT_URL}/{section}', f'{file_pattern}_{date_pattern}', CURRENT_LISTING_TTL)
     if len(matches) == 0:
         current_date = default.get_current_date(t)
-        p = requests.get(f'{ARCHIVE_URL}/{section}')
-        r = re.compile(f'{file_pattern if archive_pattern is None else archive_pattern}_{current_date}.zip<')
-        match = r.findall(p.text)[0]
-        url = f'{ARCHIVE_URL}/{section}/{match[:-1]}'
-        result = requests.get(url)
-        if result.ok:
-            with zipfile.ZipFile(io.BytesIO(result.content)) as zf:
+        archive_matches = find_files(f'{ARCHIVE_URL}/{section}', f'{file_pattern if archive_pattern is None else archive_pattern}_{current_date}.zip')
+        if len(archive_matches) == 0:
+            logging.error(f'Cannot find {file_pattern}_{date_pattern} in {section}.')
+            return None
+        archive = download_archive(section, archive_matches[0])
+        if archive is not None:
+            with zipfile.ZipFile(archive) as zf:
                 regex = re.compile(f'{file_pattern}_{date_pattern}')
                 m = list(filter(regex.match, zf.namelist()))[0]
                 zzf = zipfile.ZipFile(io.BytesIO(zf.read(m)))
                 csv_name = zzf.namelist()[0]
-                with file.open('wb') as f:
-                    f.write(zzf.read(csv_name))
+                write_file(file, zzf.read(csv_name))
     else:
         match = matches[0]
-        download(f'{CURRENT_URL}/{section}/{match[:-1]}', file)
+        download(f'{CURRENT_URL}/{section}/{match}', file)
 
 
 def download_all_files(section, file_pattern, date_pattern, path_to_dir, t, archive_pattern=None):
     current_date = default.get_current_date(t)
-    p = requests.get(f'{ARCHIVE_URL}/{section}')
-    r = re.compile(f'{file_pattern if archive_pattern is None else archive_pattern}_{current_date}.zip<')
-    match = r.findall(p.text)[0]
-    url = f'{ARCHIVE_URL}/{section}/{match[:-1]}'
-    result = requests.get(url)
-    if result.ok:
-        with zipfile.ZipFile(io.BytesIO(result.content)) as zf:
+    match = find_files(f'{ARCHIVE_URL}/{section}', f'{file_pattern if archive_pattern is None else archive_pattern}_{current_date}.zip')[0]
+    archive = download_archive(section, match)
+    if archive is not None:
+        with zipfile.ZipFile(archive) as zf:
             for m in zf.namelist():
                 # print(m)
                 # regex = re.compile(f'{file_pattern}_{date_pattern}')
@@ -324,22 +641,18 @@ def download_all_files(section, file_pattern, date_pattern, path_to_dir, t, arch
                 zzf = zipfile.ZipFile(io.BytesIO(zf.read(m)))
                 csv_name = zzf.namelist()[0]
                 path_to_file = path_to_dir / ('_'.join(csv_name.split('_')[:-1]) + '.csv')
-                with path_to_file.open('wb') as f:
-                    f.write(zzf.read(csv_name))
+                write_file(path_to_file, zzf.read(csv_name))
 
 
 def download_all_predispatch_files(section, file_pattern, date_pattern, path_to_dir, t, all_flag=False):
-    p = requests.get(f'{ARCHIVE_URL}/{section}')
-    r = re.compile(f'{file_pattern}_[0-9]{{8}}_[0-9]{{8}}.zip<')
-    matches = r.findall(p.text)
+    matches = find_files(f'{ARCHIVE_URL}/{section}', f'{file_pattern}_[0-9]{{8}}_[0-9]{{8}}.zip')
+    _, entries = get_listing(f'{ARCHIVE_URL}/{section}')  # Fetched after find_files which may have refreshed the listing
     for match in matches:
-        r = re.compile(f'[0-9]{{8}}')
-        dates =[datetime.datetime.strptime(d, '%Y%m%d') for d in r.findall(match)]
-        if dates[0] <= t <= dates[1] + default.ONE_DAY:
-            url = f'{ARCHIVE_URL}/{section}/{match[:-1]}'
-            result = requests.get(url)
-            if result.ok:
-                with zipfile.ZipFile(io.BytesIO(result.content)) as zf:
+        _, first_date, last_date = entries[bisect.bisect_left(entries, (match,))]
+        if first_date <= t <= last_date + default.ONE_DAY:
+            archive = download_archive(section, match)
+            if archive is not None:
+                with zipfile.ZipFile(archive) as zf:
                     if all_flag:
                         for m in zf.namelist():
                             period_datetime = datetime.datetime.strptime(re.compile(f'[0-9]{{12}}').findall(m)[0], '%Y%m%d%H%M')
@@ -347,14 +660,12 @@ def download_all_predispatch_files(section, file_pattern, date_pattern, path_to_
                                 path_to_file = path_to_dir / f'PUBLIC_PREDISPATCHIS_{default.get_case_datetime(period_datetime)}.CSV'
                                 zzf = zipfile.ZipFile(io.BytesIO(zf.read(m)))
                                 csv_name = zzf.namelist()[0]
-                                with path_to_file.open('wb') as f:
-                                    f.write(zzf.read(csv_name))
+                                write_file(path_to_file, zzf.read(csv_name))
                     else:
                         m = re.compile(f'{file_pattern}_{date_pattern}').findall(' '.join(zf.namelist()))[0]
                         zzf = zipfile.ZipFile(io.BytesIO(zf.read(m)))
                         csv_name = zzf.namelist()[0]
-                        with path_to_dir.open('wb') as f:
-                            f.write(zzf.read(csv_name))
+                        write_file(path_to_dir, zzf.read(csv_name))
 
 
 def download_tradingis(t):
@@ -432,6 +743,75 @@ def download_next_day_dispatch(t):
     return record_dir
 
 
+next_day_dispatch_indices = {}  # Indices of NEXT_DAY_DISPATCH files, i.e. {path to file: index}
+
+
+def index_next_day_dispatch(t):
+    """Get the index of UNIT_SOLUTION rows in NEXT_DAY_DISPATCH file, i.e. {interval datetime: [(start byte, end byte)]}
+    and the I (header) row of the table under 'HEADER'. The index is built in one pass over the file and saved next to
+    it.
+
+    Args:
+        t (datetime.datetime): Date of data
+
+    Returns:
+        (pathlib.Path, dict): path to the file, index
+    """
+    record_dir = download_next_day_dispatch(t)
+    index = next_day_dispatch_indices.get(record_dir)
+    if index is not None:
+        return record_dir, index
+    index_dir = record_dir.with_name(f'{record_dir.stem}_INDEX.json')
+    if index_dir.is_file() and index_dir.stat().st_mtime >= record_dir.stat().st_mtime:
+        with index_dir.open() as f:
+            index = json.load(f)
+    if index is None or 'HEADER' not in index:
+        index = {}
+        offset = 0
+        with record_dir.open('rb') as f:
+            for line in f:
+                if line.startswith(b'I,DISPATCH,UNIT_SOLUTION,'):
+                    index['HEADER'] = next(csv.reader([line.decode()]))
+                elif line.startswith(b'D,DISPATCH,UNIT_SOLUTION,'):
+                    interval_datetime = line.split(b',', 5)[4].strip(b'"').decode()
+                    ranges = index.setdefault(interval_datetime, [])
+                    if ranges and ranges[-1][1] == offset:
+                        ranges[-1][1] = offset + len(line)
+                    else:
+                        ranges.append([offset, offset + len(line)])
+                offset += len(line)
+        temp_dir = index_dir.with_name(f'{index_dir.name}.{os.getpid()}.tmp')
+        with temp_dir.open('w') as f:
+            json.dump(index, f)
+        temp_dir.replace(index_dir)
+    next_day_dispatch_indices[record_dir] = index
+    return record_dir, index
+
+
+def read_next_day_dispatch_unit_solution(t, schema):
+    """Decode UNIT_SOLUTION rows of the given interval from NEXT_DAY_DISPATCH file through its index. Columns are
+    located by the I (header) row of the table.
+
+    Args:
+        t (datetime.datetime): Interval datetime
+        schema (dict): {column name: column type}, see mms
+
+    Returns:
+        dict: {column name: numpy.ndarray}
+    """
+    record_dir, index = index_next_day_dispatch(t)
+    raw = {column: [] for column in schema}
+    if 'HEADER' in index:
+        indices = mms.get_column_indices(index['HEADER'], 'UNIT_SOLUTION', schema)
+        with record_dir.open('rb') as f:
+            for start, end in index.get(default.get_interval_datetime(t), []):
+                f.seek(start)
+                for row in csv.reader(io.StringIO(f.read(end - start).decode())):
+                    for column, i in indices.items():
+                        raw[column].append(row[i])
+    return {column: mms.convert_column(raw[column], column_type) for column, column_type in schema.items()}
+
+
 def download_bidmove_summary(t):
     """Download bidmove summary of the given date from
     <#CURRENT_URL>/<#SECTION>/<#VISIBILITY_ID>_BIDMOVE_SUMMARY_<#CASE_DATE>_<#EVENT_QUEUE_ID>.zip
@@ -746,21 +1126,84 @@ def download_dvd_data(section, current=None):
     if section == 'DISPATCHCONSTRAINT':
         wf_dir = dvd_dir / f'{section}_{default.get_case_datetime(current)}.csv'
         if not wf_dir.is_file():
-            # rows = []
-            with f.open() as rf:
-                reader = csv.reader(rf)
-                # for row in reader:
-                #     if row[0] == 'I' or current == extract_datetime(row[4]):
-                #         rows.append(row)
-                rows = [row for row in reader if row[0] == 'D' and current == default.extract_datetime(row[4])]
-            with wf_dir.open(mode='w') as result_file:
-                writer = csv.writer(result_file, delimiter=',')
-                for row in rows:
-                    writer.writerow(row)
+            # Split all intervals of the month in one pass
+            paths = {}  # {settlement date string: path to shard}
+
+            def get_path(row):
+                if row[0] != 'D':
+                    return None
+                p = paths.get(row[4])
+                if p is None:
+                    t = default.extract_datetime(row[4])
+                    p = paths[row[4]] = dvd_dir / f'{section}_{default.get_case_datetime(t)}.csv'
+                return p
+
+            split_rows(read_csv_rows(f), get_path)
+            if not wf_dir.is_file():
+                write_file(wf_dir, b'')
         return wf_dir
     return f
 
 
+dvd_indices = {}  # Effective-dated indices of DVD tables, i.e. {(path to file, key columns, date column): index}
+
+
+def index_dvd_data(section, t, key_columns, date_column):
+    """Get the effective-dated index of the monthly DVD table, i.e. {key: (sorted effective datetimes, rows)}. The index
+    is built once per month, saved next to the DVD file and shared by all intervals of the month.
+
+    Args:
+        section (str): section
+        t (datetime.datetime): current datetime
+        key_columns (tuple): indices of key columns, e.g. (6,) for GENCONID of GENCONDATA
+        date_column (int): index of effective date column
+
+    Returns:
+        dict: index
+    """
+    f = download_dvd_data(section, t)
+    key = (f, key_columns, date_column)
+    index = dvd_indices.get(key)
+    if index is not None:
+        return index
+    index_dir = f.with_name(f'{f.stem}_INDEX_{"_".join(str(c) for c in key_columns)}_{date_column}.pkl')
+    if index_dir.is_file() and index_dir.stat().st_mtime >= f.stat().st_mtime:
+        with index_dir.open('rb') as rf:
+            index = pickle.load(rf)
+    else:
+        versions = {}
+        with f.open() as rf:
+            reader = csv.reader(rf)
+            for row in reader:
+                if row[0] == 'D':
+                    versions.setdefault(tuple(row[c] for c in key_columns), []).append((default.extract_datetime(row[date_column]), row))
+        index = {}
+        for k, rows in versions.items():
+            rows.sort(key=lambda version: version[0])  # Stable, i.e. versions of the same date keep file order
+            index[k] = ([version[0] for version in rows], [version[1] for version in rows])
+        temp_dir = index_dir.with_name(f'{index_dir.name}.{os.getpid()}.tmp')
+        with temp_dir.open('wb') as wf:
+            pickle.dump(index, wf, protocol=pickle.HIGHEST_PROTOCOL)
+        temp_dir.replace(index_dir)
+    dvd_indices[key] = index
+    return index
+
+
+def get_effective_rows(index, key, t):
+    """Get rows of the key effective at t (sorted by effective date) from the index.
+
+    Args:
+        index (dict): index generated by index_dvd_data
+        key (tuple): key
+        t (datetime.datetime): current datetime
+
+    Returns:
+        list: rows
+    """
+    dates, rows = index.get(key, ([], []))
+    return rows[:bisect.bisect_right(dates, t)]
+
+
 def download_interval(t):
     download_5min_predispatch(t)
     download_dispatch_summary(t)
@@ -1,4 +1,208 @@
 import default, read
+import numpy as np
+
+FCAS_ORDER = ['RAISEREG', 'RAISE6SEC', 'RAISE60SEC', 'RAISE5MIN', 'LOWERREG', 'LOWER6SEC', 'LOWER60SEC', 'LOWER5MIN']
+MAX_STORE_DAYS = 8  # Maximum number of (source, trading day) entries kept in the dispatch price store
+MAX_STORE_RUNS = 2 * default.INTERVALS  # Maximum number of P5MIN/PREDISPATCH runs kept in the run price store
+# Stores are kept in least recently used order
+dispatch_store = {}  # {(source, trading day): arrays of dispatch prices}, source is (custom flag, region ID, k, path to output)
+run_store = {}  # {(source, process, run start): arrays of P5MIN or PREDISPATCH prices}
+
+
+def touch(store, key):
+    """Get the entry of the store and mark it as the most recently used.
+
+    Args:
+        store (dict): store
+        key (tuple): key of the entry
+
+    Returns:
+        dict: entry, or None if not stored
+    """
+    if key not in store:
+        return None
+    store[key] = store.pop(key)
+    return store[key]
+
+
+def evict(store, max_size):
+    """Remove the least recently used entries of the store.
+
+    Args:
+        store (dict): store
+        max_size (int): maximum number of entries
+
+    Returns:
+        None
+    """
+    while len(store) > max_size:
+        store.pop(next(iter(store)))
+
+
+def invalidate_prices(t, process, k, path_to_out):
+    """Drop stored custom prices whose result file has just been (re)written, so that the next access reads it again.
+
+    Args:
+        t (datetime.datetime): interval datetime (DISPATCH) or run start datetime (P5MIN and PREDISPATCH)
+        process (str): 'dispatch', 'p5min' or 'predispatch'
+        k (int): iteration number
+        path_to_out (pathlib.Path): path to output directory
+
+    Returns:
+        None
+    """
+    if process == 'dispatch':
+        first = default.get_first_datetime(t)
+        i = int((t - first) / default.FIVE_MIN)
+        for (source, day_first), day in dispatch_store.items():
+            if source[0] and source[2] == k and source[3] == path_to_out and day_first == first:
+                day['loaded'][i] = day['fcas_loaded'][i] = False
+    else:
+        for key in [key for key in run_store if key[0][0] and key[0][2] == k and key[0][3] == path_to_out
+                    and key[1] == process and key[2] == t]:
+            run_store.pop(key)
+
+
+def get_day_store(source, t):
+    """Get arrays of dispatch prices of the trading day, allocated on first access and filled interval by interval.
+
+    Args:
+        source (tuple): (custom flag, region ID, k, path to output)
+        t (datetime.datetime): datetime in the trading day
+
+    Returns:
+        (dict, int): arrays of the trading day, index of the interval
+    """
+    first = default.get_first_datetime(t)
+    key = (source, first)
+    day = touch(dispatch_store, key)
+    if day is None:
+        day = dispatch_store[key] = {
+            'loaded': np.zeros(default.INTERVALS, dtype=bool),
+            'fcas_loaded': np.zeros(default.INTERVALS, dtype=bool),
+            'record_loaded': np.zeros(default.INTERVALS, dtype=bool),
+            'price': np.full(default.INTERVALS, np.nan),
+            'aemo_price': np.full(default.INTERVALS, np.nan),
+            'fcas': np.full((default.INTERVALS, len(FCAS_ORDER)), np.nan),
+            'aemo_fcas': np.full((default.INTERVALS, len(FCAS_ORDER)), np.nan),
+            'raise_record': np.full(default.INTERVALS, np.nan),
+            'lower_record': np.full(default.INTERVALS, np.nan)
+        }
+        evict(dispatch_store, MAX_STORE_DAYS)
+    return day, int((t - first) / default.FIVE_MIN)
+
+
+def get_dispatch_prices(t, custom_flag, region_id, k, path_to_out, fcas_flag):
+    """Get dispatch prices of the region from the store, i.e. the same as read.read_dispatch_prices but each file is
+    only read once.
+
+    Args:
+        t (datetime.datetime): interval datetime
+        custom_flag (bool): our custom results or AEMO's records
+        region_id (str): region ID
+        k (int): iteration number
+        path_to_out (pathlib.Path): path to output directory
+        fcas_flag (bool): consider FCAS or not
+
+    Returns:
+        (float, float, dict, dict): RRP, RRP record, FCAS RRP, FCAS RRP record
+    """
+    day, i = get_day_store((custom_flag, region_id, k, path_to_out), t)
+    if not day['loaded'][i] or (fcas_flag and not day['fcas_loaded'][i]):
+        price, aemo_price, fcas_price, aemo_fcas_price = read.read_dispatch_prices(t, 'dispatch', custom_flag, region_id, k, path_to_out, fcas_flag=fcas_flag)
+        day['price'][i] = price
+        if custom_flag:
+            day['aemo_price'][i] = aemo_price
+        if fcas_flag:
+            day['fcas'][i] = [fcas_price[bid_type] for bid_type in FCAS_ORDER]
+            if custom_flag:
+                day['aemo_fcas'][i] = [aemo_fcas_price[bid_type] for bid_type in FCAS_ORDER]
+            day['fcas_loaded'][i] = True
+        day['loaded'][i] = True
+    fcas_price = dict(zip(FCAS_ORDER, day['fcas'][i].tolist())) if fcas_flag else {}
+    aemo_fcas_price = dict(zip(FCAS_ORDER, day['aemo_fcas'][i].tolist())) if fcas_flag and custom_flag else {}
+    return float(day['price'][i]), float(day['aemo_price'][i]) if custom_flag else None, fcas_price, aemo_fcas_price
+
+
+def get_dispatch_fcas(t, region_id):
+    """Get DISPATCH maximum FCAS records of the region from the store, i.e. the same as read.read_dispatch_fcas.
+
+    Args:
+        t (datetime.datetime): interval datetime
+        region_id (str): region ID
+
+    Returns:
+        (float, float): max RAISE FCAS record, max LOWER FCAS record
+    """
+    day, i = get_day_store((False, region_id, 0, None), t)
+    if not day['record_loaded'][i]:
+        day['raise_record'][i], day['lower_record'][i] = read.read_dispatch_fcas(t, region_id)
+        day['record_loaded'][i] = True
+    return float(day['raise_record'][i]), float(day['lower_record'][i])
+
+
+def get_run_prices(t, process, custom_flag, region_id, k, path_to_out):
+    """Get P5MIN or PREDISPATCH prices (including FCAS and maximum FCAS records) of the run from the store. The stored
+    arrays are returned without copies and are read-only; the horizon builders slice them and only copy the part of the
+    horizon they extend.
+
+    Args:
+        t (datetime.datetime): run start datetime
+        process (str): 'p5min' or 'predispatch'
+        custom_flag (bool): our custom results or AEMO's records
+        region_id (str): region ID
+        k (int): iteration number
+        path_to_out (pathlib.Path): path to output directory
+
+    Returns:
+        (tuple, numpy.ndarray, numpy.ndarray, dict, dict, numpy.ndarray, numpy.ndarray): datetimes, prices, AEMO
+        prices, FCAS prices, AEMO FCAS prices, max RAISE FCAS records, max LOWER FCAS records
+    """
+    key = ((custom_flag, region_id, k, path_to_out), process, t)
+    run = touch(run_store, key)
+    if run is None:
+        times, prices, aemo_prices, fcas_prices, aemo_fcas_prices = read.read_prices(t, process, custom_flag, region_id, k, path_to_out, fcas_flag=True)
+        raise_fcas, lower_fcas = (read.read_p5min_fcas if process == 'p5min' else read.read_predispatch_fcas)(t, region_id)
+        run = run_store[key] = {
+            'times': tuple(times),
+            'prices': read_only(prices),
+            'aemo_prices': read_only(aemo_prices),
+            'fcas': {bid_type: read_only(values) for bid_type, values in fcas_prices.items()},
+            'aemo_fcas': {bid_type: read_only(values) for bid_type, values in aemo_fcas_prices.items()},
+            'raise_record': read_only(raise_fcas),
+            'lower_record': read_only(lower_fcas)
+        }
+        evict(run_store, MAX_STORE_RUNS)
+    return (run['times'], run['prices'], run['aemo_prices'], dict(run['fcas']), dict(run['aemo_fcas']),
+            run['raise_record'], run['lower_record'])
+
+
+def read_only(values):
+    """Convert values to a read-only array so that the stored prices cannot be changed through the returned views.
+
+    Args:
+        values (list): values
+
+    Returns:
+        numpy.ndarray: read-only array
+    """
+    array = np.array(values, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+def join(first, second, start):
+    """Join the first six P5MIN values with the PREDISPATCH values after the start index as a new list.
+
+    Args:
+        first (numpy.ndarray): P5MIN values
+        second (numpy.ndarray): PREDISPATCH values
+        start (int): index of the first PREDISPATCH value
+
+    Returns:
+        list: joined values
+    """
+    return np.concatenate((first[:6], second[start:])).tolist()
 
 
 def preprocess_prices(current, custom_flag, battery, k):
@@ -14,20 +218,17 @@ def preprocess_prices(current, custom_flag, battery, k):
         (list, datetime.datetime, list, list, dict, dict, list, list): times, predispatch time, prices, AEMO prices, FCAS prices, AEMO FCAS prices, raise FCAS record, lower FCAS record
     """
     path_to_out = default.RECORD_DIR if k == 0 else battery.bat_dir
-    p5min_times, p5min_prices, aemo_p5min_prices, p5min_fcas_prices, aemo_p5min_fcas_prices = read.read_prices(current, 'p5min', custom_flag,
-                                                               battery.region_id, k, path_to_out, fcas_flag=True)
-    p5min_raise_fcas, p5min_lower_fcas = read.read_p5min_fcas(current, battery.region_id)
+    p5min_times, p5min_prices, aemo_p5min_prices, p5min_fcas_prices, aemo_p5min_fcas_prices, p5min_raise_fcas, p5min_lower_fcas = get_run_prices(current, 'p5min', custom_flag, battery.region_id, k, path_to_out)
     predispatch_time = default.get_predispatch_time(current)
-    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices = read.read_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out, fcas_flag=True)
+    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, predispatch_raise_fcas, predispatch_lower_fcas = get_run_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out)
     fcas_prices, aemo_fcas_prices = {}, {}
     for bid_type in p5min_fcas_prices.keys():
         # fcas_prices[bid_type] = p5min_fcas_prices[bid_type] + predispatch_fcas_prices[bid_type][2:]
         # aemo_fcas_prices[bid_type] = aemo_p5min_fcas_prices[bid_type] + aemo_predispatch_fcas_prices[bid_type][2:]
-        fcas_prices[bid_type] = p5min_fcas_prices[bid_type][:6] + predispatch_fcas_prices[bid_type][1:]
-        aemo_fcas_prices[bid_type] = aemo_p5min_fcas_prices[bid_type][:6] + aemo_predispatch_fcas_prices[bid_type][1:]
-    predispatch_raise_fcas, predispatch_lower_fcas = read.read_predispatch_fcas(predispatch_time, battery.region_id)
+        fcas_prices[bid_type] = join(p5min_fcas_prices[bid_type], predispatch_fcas_prices[bid_type], 1)
+        aemo_fcas_prices[bid_type] = join(aemo_p5min_fcas_prices[bid_type], aemo_predispatch_fcas_prices[bid_type], 1)
     # return p5min_times + predispatch_times[2:], predispatch_time, p5min_prices + predispatch_prices[2:], aemo_p5min_prices + aemo_predispatch_prices[2:], fcas_prices, aemo_fcas_prices, p5min_raise_fcas + predispatch_raise_fcas[2:], p5min_lower_fcas + predispatch_lower_fcas[2:]
-    return p5min_times[:6] + predispatch_times[1:], predispatch_time, p5min_prices[:6] + predispatch_prices[1:], aemo_p5min_prices[:6] + aemo_predispatch_prices[1:], fcas_prices, aemo_fcas_prices, p5min_raise_fcas[:6] + predispatch_raise_fcas[1:], p5min_lower_fcas[:6] + predispatch_lower_fcas[1:]
+    return list(p5min_times[:6] + predispatch_times[1:]), predispatch_time, join(p5min_prices, predispatch_prices, 1), join(aemo_p5min_prices, aemo_predispatch_prices, 1), fcas_prices, aemo_fcas_prices, join(p5min_raise_fcas, predispatch_raise_fcas, 1), join(p5min_lower_fcas, predispatch_lower_fcas, 1)
 
 
 def extend_forcast_horizon(current, times, prices, aemo_prices, fcas_prices, aemo_fcas_prices, custom_flag, battery, k, raise_fcas_records, lower_fcas_records, fcas_flag, intervals=5):
@@ -69,7 +270,7 @@ def extend_forcast_horizon(current, times, prices, aemo_prices, fcas_prices, aem
         while extend_time <= end_time:
             extend_time += default.ONE_HOUR if intervals == 60 else default.THIRTY_MIN
             # extend_time += default.FIVE_MIN
-            price, aemo_price, fcas_price, aemo_fcas_price = read.read_dispatch_prices(min(extend_time, end_time) - default.ONE_DAY, 'dispatch', custom_flag, battery.region_id, k, path_to_out, fcas_flag=fcas_flag)
+            price, aemo_price, fcas_price, aemo_fcas_price = get_dispatch_prices(min(extend_time, end_time) - default.ONE_DAY, custom_flag, battery.region_id, k, path_to_out, fcas_flag)
             extended_times.append(min(extend_time, end_time) - default.ONE_DAY)
             prices.append(price)
             if fcas_flag:
@@ -77,7 +278,7 @@ def extend_forcast_horizon(current, times, prices, aemo_prices, fcas_prices, aem
                 for bid_type in fcas_prices.keys():
                     fcas_prices[bid_type].append(fcas_price[bid_type])
                     aemo_fcas_prices[bid_type].append(aemo_fcas_price[bid_type])
-                dispatch_raise_record, dispatch_lower_record = read.read_dispatch_fcas(min(extend_time, end_time) - default.ONE_DAY, battery.region_id)
+                dispatch_raise_record, dispatch_lower_record = get_dispatch_fcas(min(extend_time, end_time) - default.ONE_DAY, battery.region_id)
                 raise_fcas_records.append(dispatch_raise_record)
                 lower_fcas_records.append(dispatch_lower_record)
             # times.append(extend_time)  # Make the last datetime is PREDISPATCH i.e. end with 00 or 30.
@@ -120,24 +321,29 @@ def process_prices_by_interval(current, custom_flag, battery, k, fcas_flag):
 def process_prices_by_period(current, custom_flag, battery, k, fcas_flag):
     path_to_out = default.RECORD_DIR if k == 0 else battery.bat_dir
     predispatch_time = default.get_predispatch_time(current)
-    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices = read.read_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out, fcas_flag=True)
+    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, predispatch_raise_fcas, predispatch_lower_fcas = get_run_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out)
     fcas_prices, aemo_fcas_prices = {}, {}
-    predispatch_raise_fcas, predispatch_lower_fcas = read.read_predispatch_fcas(predispatch_time, battery.region_id)
+    # The horizon is extended in place, so only the stored arrays are copied to lists
+    predispatch_times, predispatch_prices, aemo_predispatch_prices = list(predispatch_times), predispatch_prices.tolist(), aemo_predispatch_prices.tolist()
+    predispatch_raise_fcas, predispatch_lower_fcas = predispatch_raise_fcas.tolist(), predispatch_lower_fcas.tolist()
+    for key, value in predispatch_fcas_prices.items():
+        predispatch_fcas_prices[key] = value.tolist()
+    for key, value in aemo_predispatch_fcas_prices.items():
+        aemo_predispatch_fcas_prices[key] = value.tolist()
     # return p5min_times + predispatch_times[2:], predispatch_time, p5min_prices + predispatch_prices[2:], aemo_p5min_prices + aemo_predispatch_prices[2:], fcas_prices, aemo_fcas_prices, p5min_raise_fcas + predispatch_raise_fcas[2:], p5min_lower_fcas + predispatch_lower_fcas[2:]
     times, prices, aemo_prices, fcas_prices, aemo_fcas_prices, raise_fcas_records, lower_fcas_records, extended_times = extend_forcast_horizon(current, predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, custom_flag, battery, k, predispatch_raise_fcas, predispatch_lower_fcas, fcas_flag, 30)
     return times, prices, predispatch_time, aemo_prices, fcas_prices, aemo_fcas_prices, raise_fcas_records, lower_fcas_records, extended_times
 
 
 def convert_to_hourly(process_list):
-    return [item for i, item in enumerate(process_list) if i % 2 == 0]
+    return process_list[::2].tolist() if isinstance(process_list, np.ndarray) else list(process_list[::2])
 
 
 def process_prices_by_hour(current, custom_flag, battery, k, fcas_flag):
     path_to_out = default.RECORD_DIR if k == 0 else battery.bat_dir
     predispatch_time = default.get_predispatch_time(current)
-    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices = read.read_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out, fcas_flag=True)
+    predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, predispatch_raise_fcas, predispatch_lower_fcas = get_run_prices(predispatch_time, 'predispatch', custom_flag, battery.region_id, k, path_to_out)
     fcas_prices, aemo_fcas_prices = {}, {}
-    predispatch_raise_fcas, predispatch_lower_fcas = read.read_predispatch_fcas(predispatch_time, battery.region_id)
 
     predispatch_times = convert_to_hourly(predispatch_times)
     predispatch_prices = convert_to_hourly(predispatch_prices)
@@ -147,7 +353,7 @@ def process_prices_by_hour(current, custom_flag, battery, k, fcas_flag):
     for key, value in aemo_predispatch_fcas_prices.items():
         aemo_predispatch_fcas_prices[key] = convert_to_hourly(value)
 
-    times, prices, aemo_prices, fcas_prices, aemo_fcas_prices, raise_fcas_records, lower_fcas_records, extended_times = extend_forcast_horizon(current, predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, custom_flag, battery, k, predispatch_raise_fcas, predispatch_lower_fcas, fcas_flag, 60)
+    times, prices, aemo_prices, fcas_prices, aemo_fcas_prices, raise_fcas_records, lower_fcas_records, extended_times = extend_forcast_horizon(current, predispatch_times, predispatch_prices, aemo_predispatch_prices, predispatch_fcas_prices, aemo_predispatch_fcas_prices, custom_flag, battery, k, predispatch_raise_fcas.tolist(), predispatch_lower_fcas.tolist(), fcas_flag, 60)
     return times, prices, predispatch_time, aemo_prices, fcas_prices, aemo_fcas_prices, raise_fcas_records, lower_fcas_records, extended_times
 
 
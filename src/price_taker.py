@@ -92,7 +92,8 @@ def dispatch_with_first_bid(current, i, gen, load, battery, k):
     t = current - default.FIVE_MIN
     unit = customise_unit(t, gen, load, battery, voll, market_price_floor)
     dispatch.formulate(t, interval=i - 1, process='dispatch', iteration=k, custom_unit=unit,
-                       path_to_out=battery.bat_dir)
+                       path_to_out=battery.bat_dir,
+                       warm_start_key=(battery.bat_dir, 'dispatch'))
 
 
 def forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5min_pload, predispatch_pgen, predispatch_pload, dispatch_pgen, dispatch_pload, cvp=None, voll=None, market_price_floor=None):
@@ -106,7 +107,8 @@ def forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5min_pload,
     unit = customise_unit(t, p5min_pgen[t], p5min_pload[t], battery, voll, market_price_floor)
     dispatch_path, _, _ = dispatch.formulate(start=current - i * default.FIVE_MIN, interval=i - 1, process='dispatch',
                                              iteration=k, custom_unit=unit, path_to_out=battery.bat_dir,
-                                             dispatchload_flag=False if i == 1 else True)
+                                             dispatchload_flag=False if i == 1 else True,
+                                             warm_start_key=(battery.bat_dir, 'dispatch'))
     # Generate P5MIN
     p5min_times, p5min_prices, aemo_p5min_prices, predispatch_times, predispatch_prices, aemo_predispatch_prices = [], [], [], [], [], []
     for j in range(helpers.get_total_intervals('p5min')):
@@ -119,7 +121,8 @@ def forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5min_pload,
         result_path, rrp, rrp_record = dispatch.formulate(start=current, interval=j, process='p5min', iteration=k,
                                                           custom_unit=unit, path_to_out=battery.bat_dir,
                                                           dispatchload_path=dispatch_path if j == 0 else None,
-                                                          dispatchload_flag=True)
+                                                          dispatchload_flag=True,
+                                                          warm_start_key=(battery.bat_dir, 'p5min'))
         p5min_times.append(t)
         p5min_prices.append(rrp)
         aemo_p5min_prices.append(rrp_record)
@@ -145,7 +148,8 @@ def forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5min_pload,
         result_path, rrp, rrp_record = dispatch.formulate(start=predispatch_time, interval=j, process='predispatch',
                                                           iteration=k, custom_unit=unit, path_to_out=battery.bat_dir,
                                                           dispatchload_path=predispatchload_path if j == 0 else None,
-                                                          dispatchload_flag=False if i < 6 else True)
+                                                          dispatchload_flag=False if i < 6 else True,
+                                                          warm_start_key=(battery.bat_dir, 'predispatch'))
         predispatch_times.append(t)
         predispatch_prices.append(rrp)
         aemo_predispatch_prices.append(rrp_record)
@@ -157,7 +161,8 @@ def iterative_dispatch_with_bids(current, battery, k, p5min_pgen, p5min_pload, p
         t = current + j * default.FIVE_MIN
         unit = customise_unit(current, p5min_pgen[t], p5min_pload[t], battery)
         dispatch.formulate(start=current, interval=j, process='p5min', iteration=k, custom_unit=unit,
-                           path_to_out=battery.bat_dir, dispatchload_flag=False if j == 0 else True)
+                           path_to_out=battery.bat_dir, dispatchload_flag=False if j == 0 else True,
+                           warm_start_key=(battery.bat_dir, 'p5min'))
     predispatch_time = default.get_predispatch_time(current)
     for j in range(helpers.get_total_intervals('predispatch', predispatch_time)):
         t = predispatch_time + j * default.THIRTY_MIN
@@ -166,7 +171,8 @@ def iterative_dispatch_with_bids(current, battery, k, p5min_pgen, p5min_pload, p
         else:
             unit = customise_unit(current, p5min_pgen[t], p5min_pload[t], battery)
         dispatch.formulate(start=predispatch_time, interval=j, process='predispatch', iteration=k, custom_unit=unit,
-                           path_to_out=battery.bat_dir, dispatchload_flag=False if j == 0 else True)
+                           path_to_out=battery.bat_dir, dispatchload_flag=False if j == 0 else True,
+                           warm_start_key=(battery.bat_dir, 'predispatch'))
 
 
 def iterative_forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5min_pload, predispatch_pgen, predispatch_pload, dispatch_pgen, dispatch_pload, cvp=None, voll=None, market_price_floor=None):
@@ -177,7 +183,8 @@ def iterative_forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5m
     unit = customise_unit(t, p5min_pgen[t], p5min_pload[t], battery, voll, market_price_floor)
     dispatch_path, _, _ = dispatch.formulate(start=current - i * default.FIVE_MIN, interval=i - 1, process='dispatch',
                                              iteration=k, custom_unit=unit, path_to_out=battery.bat_dir,
-                                             dispatchload_flag=False if i == 1 else True)
+                                             dispatchload_flag=False if i == 1 else True,
+                                             warm_start_key=(battery.bat_dir, 'dispatch'))
     # Generate P5MIN
     p5min_times, p5min_prices, aemo_p5min_prices, predispatch_times, predispatch_prices, aemo_predispatch_prices = [], [], [], [], [], []
     for j in range(helpers.get_total_intervals('p5min')):
@@ -190,7 +197,8 @@ def iterative_forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5m
         result_path, rrp, rrp_record = dispatch.formulate(start=current, interval=j, process='p5min', iteration=k,
                                                           custom_unit=unit, path_to_out=battery.bat_dir,
                                                           dispatchload_path=dispatch_path if j == 0 else None,
-                                                          dispatchload_flag=True)
+                                                          dispatchload_flag=True,
+                                                          warm_start_key=(battery.bat_dir, 'p5min'))
         p5min_times.append(t)
         p5min_prices.append(rrp)
         aemo_p5min_prices.append(rrp_record)
@@ -216,7 +224,8 @@ def iterative_forward_dispatch_with_bids(current, i, battery, k, p5min_pgen, p5m
         result_path, rrp, rrp_record = dispatch.formulate(start=predispatch_time, interval=j, process='predispatch',
                                                           iteration=k, custom_unit=unit, path_to_out=battery.bat_dir,
                                                           dispatchload_path=predispatchload_path if j == 0 else None,
-                                                          dispatchload_flag=False if i < 6 else True)
+                                                          dispatchload_flag=False if i < 6 else True,
+                                                          warm_start_key=(battery.bat_dir, 'predispatch'))
         predispatch_times.append(t)
         predispatch_prices.append(rrp)
         aemo_predispatch_prices.append(rrp_record)
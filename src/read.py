@@ -1,9 +1,61 @@
 import csv
 import default
+import mms
+import numpy as np
 import preprocess
 import write
 import pandas as pd
 
+FCAS_ORDER = ['RAISE6SEC', 'RAISE60SEC', 'RAISE5MIN', 'RAISEREG', 'LOWER6SEC', 'LOWER60SEC', 'LOWER5MIN', 'LOWERREG']
+FCAS_RRP_COLUMNS = {bid_type: f'{bid_type}RRP' for bid_type in FCAS_ORDER}  # Columns of FCAS prices in AEMO files
+# Columns of local dispatch of contingency FCAS in AEMO files, i.e. the maximum FCAS records
+RAISE_RECORD_COLUMNS = ['RAISE5MINLOCALDISPATCH', 'RAISE60SECLOCALDISPATCH', 'RAISE6SECLOCALDISPATCH']
+LOWER_RECORD_COLUMNS = ['LOWER5MINLOCALDISPATCH', 'LOWER60SECLOCALDISPATCH', 'LOWER6SECLOCALDISPATCH']
+
+
+def read_aemo_prices(p, table, interval_column, region_id, intervention, fcas_flag):
+    """Decode prices of the region from AEMO's file by column name. Our custom results are written in AEMO's layout
+    by result.py but their I (header) rows do not name every column, so they are still read by position.
+
+    Args:
+        p (pathlib.Path): path to the file
+        table (str): price table name
+        interval_column (str): interval datetime column name, or None
+        region_id (str): region ID, or None for all regions
+        intervention (str): intervention or not
+        fcas_flag (bool): consider FCAS or not
+
+    Returns:
+        dict: {column name: numpy.ndarray}
+    """
+    schema = {'REGIONID': mms.STR, 'RRP': mms.FLOAT}
+    if interval_column is not None:
+        schema[interval_column] = mms.DATETIME
+    if fcas_flag:
+        schema.update({column: mms.FLOAT for column in FCAS_RRP_COLUMNS.values()})
+    where = {'INTERVENTION': intervention}
+    if region_id:
+        where['REGIONID'] = region_id
+    return mms.read_table(p, table, schema, where)
+
+
+def read_aemo_fcas_records(p, table, region_id):
+    """Decode maximum RAISE and LOWER FCAS records of the region from AEMO's file by column name.
+
+    Args:
+        p (pathlib.Path): path to the file
+        table (str): region table name
+        region_id (str): region ID
+
+    Returns:
+        (list, list): max RAISE FCAS records, max LOWER FCAS records
+    """
+    batch = mms.read_table(p, table, {column: mms.FLOAT for column in RAISE_RECORD_COLUMNS + LOWER_RECORD_COLUMNS},
+                           {'REGIONID': region_id})
+    raise_fcas_record = np.max([batch[column] for column in RAISE_RECORD_COLUMNS], axis=0)
+    lower_fcas_record = np.max([batch[column] for column in LOWER_RECORD_COLUMNS], axis=0)
+    return raise_fcas_record.tolist(), lower_fcas_record.tolist()
+
 
 def read_trading_prices(t, custom_flag, region_id, k=0, path_to_out=default.OUT_DIR):
     """Read prices from TRADINGIS file.
@@ -24,6 +76,8 @@ def read_trading_prices(t, custom_flag, region_id, k=0, path_to_out=default.OUT_
             write.write_trading_prices(start, k, path_to_out)
     else:
         p = preprocess.download_tradingis(t)
+        batch = mms.read_table(p, 'PRICE', {'RRP': mms.FLOAT}, {'REGIONID': region_id})
+        return (float(batch['RRP'][0]), float(batch['RRP'][0])) if len(batch['RRP']) > 0 else None
     with p.open() as f:
         reader = csv.reader(f)
         for row in reader:
@@ -53,6 +107,13 @@ def read_dispatch_prices(t, process, custom_flag, region_id, k=0, path_to_out=de
         #     dispatch.get_all_dispatch(t, process)
     else:
         p = preprocess.download_dispatch_summary(t)
+        batch = read_aemo_prices(p, 'PRICE', None, region_id, intervention, fcas_flag)
+        regions_price = {}
+        for i, record_region_id in enumerate(batch['REGIONID']):
+            fcas_prices = {bid_type: 0 if np.isnan(batch[column][i]) else float(batch[column][i])
+                           for bid_type, column in FCAS_RRP_COLUMNS.items()} if fcas_flag else {}
+            regions_price[record_region_id] = (float(batch['RRP'][i]), None, fcas_prices, {})
+        return regions_price.get(region_id, {}) if region_id else regions_price
 
     def extract_row(row):
         fcas_prices, aemo_fcas_prices = {}, {}
@@ -113,6 +174,9 @@ def read_p5min_prices(t, process, custom_flag, region_id, k=0, path_to_out=defau
         #     dispatch.get_all_dispatch(t, process)
     else:
         p = preprocess.download_5min_predispatch(t)
+        batch = read_aemo_prices(p, 'REGIONSOLUTION', 'INTERVAL_DATETIME', region_id, intervention, fcas_flag)
+        fcas_prices = {bid_type: batch[column].tolist() if fcas_flag else [] for bid_type, column in FCAS_RRP_COLUMNS.items()}
+        return batch['INTERVAL_DATETIME'].tolist(), batch['RRP'].tolist(), [], fcas_prices, {bid_type: [] for bid_type in FCAS_ORDER}
     p5min_times, p5min_prices, aemo_p5min_prices = [], [], []
     p5min_fcas_prices = {
         'RAISEREG': [],
@@ -185,6 +249,9 @@ def read_predispatch_prices(t, process, custom_flag, region_id, k=0, path_to_out
         #     dispatch.get_all_dispatch(t, process)
     else:
         p = preprocess.download_predispatch(t)
+        batch = read_aemo_prices(p, 'REGION_PRICES', 'DATETIME', region_id, intervention, fcas_flag)
+        fcas_prices = {bid_type: batch[column].tolist() if fcas_flag else [] for bid_type, column in FCAS_RRP_COLUMNS.items()}
+        return batch['DATETIME'].tolist(), batch['RRP'].tolist(), [], fcas_prices, {bid_type: [] for bid_type in FCAS_ORDER}
     predispatch_times, predispatch_prices, aemo_predispatch_prices = [], [], []
     predispatch_fcas_prices = {
         'RAISEREG': [],
@@ -268,14 +335,8 @@ def read_dispatch_fcas(start, region_id):
         Returns:
             (list, list): max RAISE FCAS record, max LOWER FCAS record
         """
-    dispatch_dir = preprocess.download_dispatch_summary(start)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGIONSUM' and row[6] == region_id:
-                raise_fcas_record = max(float(row[43]), float(row[51]), float(row[59]))
-                lower_fcas_record = max(float(row[19]), float(row[27]), float(row[35]))
-    return raise_fcas_record, lower_fcas_record
+    raise_fcas_record, lower_fcas_record = read_aemo_fcas_records(preprocess.download_dispatch_summary(start), 'REGIONSUM', region_id)
+    return raise_fcas_record[-1], lower_fcas_record[-1]
 
 
 def read_p5min_fcas(start, region_id):
@@ -288,15 +349,7 @@ def read_p5min_fcas(start, region_id):
     Returns:
         (list, list): max RAISE FCAS record, max LOWER FCAS record
     """
-    raise_fcas_record, lower_fcas_record = [], []
-    dispatch_dir = preprocess.download_5min_predispatch(start)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGIONSOLUTION' and row[7] == region_id:
-                raise_fcas_record.append(max(float(row[51]), float(row[56]), float(row[61])))
-                lower_fcas_record.append(max(float(row[36]), float(row[41]), float(row[46])))
-    return raise_fcas_record, lower_fcas_record
+    return read_aemo_fcas_records(preprocess.download_5min_predispatch(start), 'REGIONSOLUTION', region_id)
 
 
 def read_predispatch_fcas(start, region_id):
@@ -309,15 +362,7 @@ def read_predispatch_fcas(start, region_id):
         Returns:
             (list, list): max RAISE FCAS record, max LOWER FCAS record
     """
-    raise_fcas_record, lower_fcas_record = [], []
-    dispatch_dir = preprocess.download_predispatch(start)
-    with dispatch_dir.open() as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row[0] == 'D' and row[2] == 'REGION_SOLUTION' and row[6] == region_id:
-                raise_fcas_record.append(max(float(row[43]), float(row[51]), float(row[59])))
-                lower_fcas_record.append(max(float(row[19]), float(row[27]), float(row[35])))
-    return raise_fcas_record, lower_fcas_record
+    return read_aemo_fcas_records(preprocess.download_predispatch(start), 'REGION_SOLUTION', region_id)
 
 
 def read_forecasts(current, battery_dir, k):
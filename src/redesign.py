@@ -11,6 +11,7 @@ from plot import plot_soc
 from dispatchold import add_regional_energy_demand_supply_balance_constr, dispatch
 import helpers
 import result
+import solver
 
 
 def update_formulation(prob, problems, model, total_costs, total_penalty, cvp, renewable_flag):
@@ -53,7 +54,7 @@ def formulate_sequence(start, e, usage, results=None, times=None, extended_times
     problems = []
     last_prob_id = None
     fcas_flag = 'FCAS' in usage
-    with gp.Env() as env, gp.Model(env=env, name=f'Integration {default.get_case_datetime(start)}') as model:
+    with solver.open_model(f'Integration {default.get_case_datetime(start)}') as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         # Initiate cost and penalty of objective function
         total_costs, total_penalty = 0, 0
@@ -269,7 +270,7 @@ def formulate_bilevel(start, e, usage, results=None, times=None, extended_times=
     problems = []
     last_prob_id = None
     fcas_flag = 'FCAS' in usage
-    with gp.Env() as env, gp.Model(env=env, name=f'Bilevel {default.get_case_datetime(start)}') as model:
+    with solver.open_model(f'Bilevel {default.get_case_datetime(start)}') as model:
         model.setParam("OutputFlag", 0)  # 0 if no log information; otherwise 1
         # Initiate cost and penalty of objective function
         total_costs, total_penalty = 0, 0
@@ -1,6 +1,8 @@
 # Cost reflective bidding strategy
 import csv
+import cube
 import datetime
+import numpy as np
 from helpers import generate_batteries_by_energies, generate_batteries_by_usages
 from operate import schedule
 from preprocess import get_market_price, download_dvd_data
@@ -8,6 +10,8 @@ from read import read_predispatch_prices, read_battery_optimisation, read_dispat
 from multiprocessing.pool import ThreadPool as Pool
 from dispatchold import formulate  # TODO: use old dispatch
 from redesign import formulate_sequence, formulate_bilevel
+from solver import report_solve_stats
+from template import release_template
 from offer import EnergyBid, FcasBid
 from itertools import repeat
 import default
@@ -38,44 +42,24 @@ def extract_prices(region_id, intervention='0'):
     Returns:
         None
     """
-    from dateutil.relativedelta import relativedelta
-    aemo_prices = []
-    aemo_fcas_prices = {
-        'RAISEREG': [],
-        'RAISE6SEC': [],
-        'RAISE60SEC': [],
-        'RAISE5MIN': [],
-        'LOWERREG': [],
-        'LOWER6SEC': [],
-        'LOWER60SEC': [],
-        'LOWER5MIN': []
-    }
-    start = datetime.datetime(2021, 1, 1)
-    for m in range(12):
-        t = start + relativedelta(months=m)
-        price_dir = download_dvd_data('DISPATCHPRICE', t)
-        with price_dir.open() as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row[0] == 'D' and row[6] == region_id and row[8] == intervention:
-                    aemo_prices.append(float(row[9]))
-                    aemo_fcas_prices['RAISE6SEC'].append(float(row[15]))
-                    aemo_fcas_prices['RAISE60SEC'].append(float(row[18]))
-                    aemo_fcas_prices['RAISE5MIN'].append(float(row[21]))
-                    aemo_fcas_prices['RAISEREG'].append(float(row[24]))
-                    aemo_fcas_prices['LOWER6SEC'].append(float(row[27]))
-                    aemo_fcas_prices['LOWER60SEC'].append(float(row[30]))
-                    aemo_fcas_prices['LOWER5MIN'].append(float(row[33]))
-                    aemo_fcas_prices['LOWERREG'].append(float(row[36]))
+    # Ends before 00:00 on 1 Jan 2022 so that only DVD files of 2021 are downloaded
+    start, end = datetime.datetime(2021, 1, 1, 0, 5), datetime.datetime(2021, 12, 31, 23, 55)
+    price_cube = cube.load_cube(start, end, intervention=intervention)
+    aemo_prices = cube.get_prices(price_cube, region_id)
+    aemo_prices = aemo_prices[~np.isnan(aemo_prices)]
+    aemo_fcas_prices = {}
+    for bid_type in ['RAISEREG', 'RAISE6SEC', 'RAISE60SEC', 'RAISE5MIN', 'LOWERREG', 'LOWER6SEC', 'LOWER60SEC', 'LOWER5MIN']:
+        prices = cube.get_prices(price_cube, region_id, bid_type)
+        aemo_fcas_prices[bid_type] = prices[~np.isnan(prices)]
     print(f'length: {len(aemo_prices)}')
-    print(f'Energy Max: {max(aemo_prices)} Min: {min(aemo_prices)}')
+    print(f'Energy Max: {aemo_prices.max()} Min: {aemo_prices.min()}')
     for bid_type, prices in aemo_fcas_prices.items():
-        print(f'{region_id} {bid_type} Max: {max(prices)} Min: {min(prices)}')
+        print(f'{region_id} {bid_type} Max: {prices.max()} Min: {prices.min()}')
     # import seaborn as sns
     import matplotlib.pyplot as plt
     # sns.displot([p for p in aemo_fcas_prices['RAISE5MIN'] if p < 100])
     bid_type = 'LOWERREG'
-    plt.hist([p for p in aemo_fcas_prices[bid_type] if p < 40], 100)
+    plt.hist(aemo_fcas_prices[bid_type][aemo_fcas_prices[bid_type] < 40], 100)
     plt.title(bid_type)
     plt.xlabel('Price')
     plt.ylabel('Count')
@@ -83,11 +67,12 @@ def extract_prices(region_id, intervention='0'):
     plt.savefig(path_to_fig)
     plt.show()
     counts = {60:0, 50:0, 40:0, 35:0, 30:0, 25:0, 20:0, 15:0, 10: 0, 7.5:0, 5: 0, 1.5:0, 1: 0, 0.75: 0, 0.5: 0, 0.25: 0, 0: 0}
-    for p in aemo_fcas_prices[bid_type]:
-        for n in counts.keys():
-            if p >= n:
-                counts[n] += 1
-                break
+    # Each price is counted in the first (largest) threshold it reaches
+    thresholds = np.array(list(counts.keys()))
+    first = np.argmax(aemo_fcas_prices[bid_type][:, None] >= thresholds[None, :], axis=1)
+    reached = aemo_fcas_prices[bid_type] >= thresholds.min()
+    for n, count in zip(counts.keys(), np.bincount(first[reached], minlength=len(thresholds))):
+        counts[n] = int(count)
     print(counts)
     print(len(aemo_prices))
 
@@ -508,7 +493,8 @@ def rolling_horizon(start, battery, usage, length=5, days=1, debug_current=None)
                           dispatchload_path=(None if horizon == 0 else dispatchload_path),
                           # dispatchload_path=(battery.bat_dir / 'dispatch' / f'dispatchload_{default.get_case_datetime(debug_current)}.csv') if debug_current else None,
                           # dispatchload_path=(default.DEBUG_DIR / f'dispatchload_{default.get_case_datetime(debug_current)}-batt{batt_no}.csv') if debug_current else None,
-                          debug_flag=(debug_current is not None), renewable_flag=('Renewable' in usage))
+                          debug_flag=(debug_current is not None), renewable_flag=('Renewable' in usage),
+                          template_key=battery.bat_dir, warm_start_key=battery.bat_dir)
             g, l, generator_fcas, load_fcas = read_dispatchload(dispatchload_path)
         elif 'Basic' in usage:
             if fcas_flag:
@@ -551,7 +537,8 @@ def rolling_horizon(start, battery, usage, length=5, days=1, debug_current=None)
                     formulate(start, horizon, 'dispatch', custom_unit=custom_units, path_to_out=battery.bat_dir,
                               fcas_flag=fcas_flag, link_flag=False, dual_flag=True, intervals=length, losses_flag=False,
                               constr_flag=False, dispatchload_flag=(horizon != 0), renewable_flag=('Renewable' in usage),
-                              dispatchload_path=(None if horizon == 0 else dispatchload_path))
+                              dispatchload_path=(None if horizon == 0 else dispatchload_path),
+                              template_key=battery.bat_dir, warm_start_key=battery.bat_dir)
                 g, l, generator_fcas, load_fcas = read_dispatchload(dispatchload_path)
 
         elif 'None' in usage:
@@ -606,6 +593,8 @@ def rolling_horizon(start, battery, usage, length=5, days=1, debug_current=None)
                     current_start, _ = default.datetime_to_interval(current)
                     bands, fcas_bands = generate_bands(current_start, usage)
                 E_initial, dispatchload_path, _ = optimise_horizon(usage, bands, E_initial, dispatchload_path=dispatchload_path)
+    release_template(battery.bat_dir)
+    report_solve_stats()
 
 
 def different_batteries(battery, usage, days, start):
@@ -2,6 +2,8 @@ import csv
 import datetime
 import helpers
 import default
+import offer
+import price
 
 FCAS_TYPES = ['RAISEREG', 'RAISE6SEC', 'RAISE60SEC', 'RAISE5MIN', 'LOWERREG', 'LOWER6SEC', 'LOWER60SEC', 'LOWER5MIN']
 
@@ -10,7 +12,7 @@ def write_dispatchis(start, t, regions, prices, k=0, path_to_out=default.OUT_DIR
     p = path_to_out / ('dispatch' if k == 0 else f'dispatch_{k}')
     p.mkdir(parents=True, exist_ok=True)
     result_dir = p / f'DISPATCHIS_{default.get_case_datetime(t)}.csv'
-
+    price.invalidate_prices(t, 'dispatch', k, path_to_out)
     with result_dir.open(mode='w') as result_file:
         writer = csv.writer(result_file, delimiter=',')
         writer.writerow(['I', 'DISPATCH', 'PRICE', '', 'SETTLEMENTDATE', 'RUNNO', 'REGIONID', 'DISPATCHINTERVAL', 'INTERVENTION', 'RRP', 'RRP Record', 'ROP Record'])
@@ -47,6 +49,7 @@ def write_predispatchis(start, t, i, regions, prices, k=0, path_to_out=default.O
     p = path_to_out / ('predispatch' if k == 0 else f'predispatch_{k}')
     p.mkdir(parents=True, exist_ok=True)
     result_dir = p / f'PREDISPATCHIS_{default.get_case_datetime(start)}.csv'
+    price.invalidate_prices(start, 'predispatch', k, path_to_out)
     with result_dir.open(mode='w' if i == 0 else 'a') as result_file:
         writer = csv.writer(result_file, delimiter=',')
         writer.writerow(['I', 'PREDISPATCH', 'REGION_PRICE', '', 'PREDISPATCHSEQNO', 'RUNNO', 'REGIONID', 'PERIODID', 'INTERVENTION', 'RRP', 'RRP Record'])
@@ -85,6 +88,7 @@ def write_p5min(start, t, i, regions, prices, k=0, path_to_out=default.OUT_DIR):
     p = path_to_out / ('p5min' if k == 0 else f'p5min_{k}')
     p.mkdir(parents=True, exist_ok=True)
     result_dir = p / f'P5MIN_{default.get_case_datetime(start)}.csv'
+    price.invalidate_prices(start, 'p5min', k, path_to_out)
     with result_dir.open(mode='w' if i == 0 else 'a') as result_file:
         writer = csv.writer(result_file, delimiter=',')
         writer.writerow(['I', 'P5MIN', 'REGIONSOLUTION', '', 'RUN_DATETIME', 'INTERVENTION', 'RUNNO', 'REGIONID', 'Price', 'RRP Record', 'ROP Record'])
@@ -155,6 +159,7 @@ def write_dispatchload(units, links, t, start, process, k=0, path_to_out=default
             row.append(f'AEMO {bid_type}')
         row += ['LAST TO CURRENT', 'CURRENT TO NEXT', 'UP', 'DOWN', 'REGION', 'TYPE', 'COST']
         writer.writerow(row)
+        values = {}
         for duid, unit in units.items():
             # print(unit.total_cleared.x if unit.total_cleared != 0 else 0)
             row = ['D',  # 0
@@ -181,12 +186,15 @@ def write_dispatchload(units, links, t, start, process, k=0, path_to_out=default
             row.append(unit.dispatch_type)
             row.append(0 if type(unit.cost) == float else unit.cost.getValue())
             writer.writerow(row)
+            values[duid] = (row[2], unit.total_cleared_record)
         if type(links) == list:
             writer.writerow(['BLNKVIC', links[0].x])
             writer.writerow(['BLNKTAS', links[1].x])
         else:
             for link_id, link in links.items():
                 writer.writerow(['D', link_id, '0' if type(link.mw_flow) == float else link.mw_flow.x])
+    if process == 'dispatch' and k != 0 and batt_no is None:
+        offer.update_daily_energy(t, k, path_to_out, values)
     return result_dir
 
 
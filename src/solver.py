@@ -0,0 +1,251 @@
+# Shared Gurobi environment of each process (or thread)
+import atexit
+import contextlib
+import default
+import gurobipy as gp
+import logging
+import os
+import pathlib
+import threading
+
+ENV_FILE = pathlib.Path(__file__).resolve().parent / 'gurobi.env'  # Gurobi parameters applied to every environment, i.e. 'Name value' lines
+THREADS = 0  # Default number of threads of each solve (0 for Gurobi's automatic choice)
+local = threading.local()  # Environment of the current thread, i.e. (process ID, gurobipy.Env)
+environments = []  # Environments created in this process and threads, i.e. [(process ID, gurobipy.Env)]
+WARM_START_FLAG = True  # Warm start solves of the same key from the last solution or not
+warm_starts = {}  # Last solution of each key, i.e. {key: (VBasis by name, CBasis by name, X by name)}
+solve_stats = {}  # {(key, warm started or not): [number of solves, simplex/barrier iterations, MIP nodes, runtime]}
+
+
+def convert_param(value):
+    """Convert parameter value read from gurobi.env to int or float if possible, as Env.setParam requires.
+
+    Args:
+        value (str): value
+
+    Returns:
+        int, float or str: converted value
+    """
+    for convert in [int, float]:
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_env_file(p=None):
+    """Read Gurobi parameters from gurobi.env file. Empty lines and comments after # are ignored.
+
+    Args:
+        p (pathlib.Path): path to the file, or None for ENV_FILE
+
+    Returns:
+        dict: {parameter name: value}
+    """
+    params = {}
+    p = ENV_FILE if p is None else p
+    if p.is_file():
+        with p.open() as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    name, _, value = line.partition(' ')
+                    params[name] = convert_param(value.strip())
+    return params
+
+
+def init_env(threads=THREADS, log_file='', output_flag=0, params=None):
+    """Create the environment of the current thread, replacing the one inherited from the parent process (if any).
+
+    Args:
+        threads (int): number of threads of each solve
+        log_file (str or pathlib.Path): path to Gurobi log file ('' for no log file)
+        output_flag (int): 0 if no log information; otherwise 1
+        params (dict): other parameters overriding those of gurobi.env
+
+    Returns:
+        gurobipy.Env: environment
+    """
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', output_flag)
+    env.setParam('LogFile', str(log_file))
+    env.setParam('Threads', threads)
+    for name, value in {**read_env_file(), **({} if params is None else params)}.items():
+        env.setParam(name, value)
+    env.start()
+    local.env = (os.getpid(), env)
+    environments.append(local.env)
+    logging.debug(f'Started Gurobi environment of process {os.getpid()} thread {threading.get_ident()}.')
+    return env
+
+
+def get_env():
+    """Get the environment of the current thread, creating it on first use.
+
+    Returns:
+        gurobipy.Env: environment
+    """
+    pid, env = getattr(local, 'env', (None, None))
+    return env if pid == os.getpid() else init_env()
+
+
+@contextlib.contextmanager
+def open_model(name=''):
+    """Open a model bound to the shared environment and dispose it when the block exits.
+
+    Args:
+        name (str): model name
+
+    Returns:
+        generator: gurobipy.Model
+    """
+    model = gp.Model(env=get_env(), name=name)
+    try:
+        yield model
+    finally:
+        model.dispose()
+
+
+def init_worker(threads=1, log_flag=False):
+    """Initialiser of pool workers, i.e. one environment per worker. Each solve uses one thread by default because
+    workers already run in parallel.
+
+    Args:
+        threads (int): number of threads of each solve
+        log_flag (bool): write Gurobi log of each worker into log directory or not
+
+    Returns:
+        None
+    """
+    log_file = default.LOG_DIR / f'gurobi_{os.getpid()}.log' if log_flag else ''
+    init_env(threads=threads, log_file=log_file)
+
+
+def get_names(names, prob_id):
+    """Remove problem ID from names so that variables and constraints of different intervals can be matched."""
+    return names if prob_id is None else [name.replace(f'_{prob_id}', '') for name in names]
+
+
+def set_warm_start(model, key, prob_id=None):
+    """Map the last solution of the key onto the model by name, i.e. VBasis/CBasis for LP and Start for MIP. Variables
+    not in the last solution are left unset for MIP. A basis is only valid with as many basic statuses as constraints,
+    so the LP warm start is skipped unless the variables and constraints match the last solution exactly (a default
+    status such as nonbasic at lower bound would also be invalid for free variables, e.g. interconnector flows).
+
+    Args:
+        model (gurobipy.Model): model
+        key (hashable): key of the loop
+        prob_id (str): problem ID of the model, i.e. suffix of names
+
+    Returns:
+        bool: True if warm start is set; False otherwise
+    """
+    if key not in warm_starts:
+        return False
+    vbasis, cbasis, x = warm_starts[key]
+    model.update()
+    variables = model.getVars()
+    var_names = get_names(model.getAttr('VarName', variables), prob_id)
+    if model.IsMIP:
+        model.setAttr('Start', variables, [x.get(name, gp.GRB.UNDEFINED) for name in var_names])
+    elif vbasis is not None:
+        constrs = model.getConstrs()
+        constr_names = get_names(model.getAttr('ConstrName', constrs), prob_id)
+        if (len(var_names) != len(vbasis) or set(var_names) != vbasis.keys()
+                or len(constr_names) != len(cbasis) or set(constr_names) != cbasis.keys()):
+            return False
+        model.setAttr('VBasis', variables, [vbasis[name] for name in var_names])
+        model.setAttr('CBasis', constrs, [cbasis[name] for name in constr_names])
+    else:
+        return False
+    return True
+
+
+def record_warm_start(model, key, prob_id=None):
+    """Record the solution of the model as warm start of the next solve of the key.
+
+    Args:
+        model (gurobipy.Model): solved model
+        key (hashable): key of the loop
+        prob_id (str): problem ID of the model, i.e. suffix of names
+
+    Returns:
+        None
+    """
+    if model.SolCount == 0:
+        return
+    variables = model.getVars()
+    var_names = get_names(model.getAttr('VarName', variables), prob_id)
+    x = dict(zip(var_names, model.getAttr('X', variables)))
+    vbasis = cbasis = None
+    if not model.IsMIP:
+        try:
+            constrs = model.getConstrs()
+            vbasis = dict(zip(var_names, model.getAttr('VBasis', variables)))
+            cbasis = dict(zip(get_names(model.getAttr('ConstrName', constrs), prob_id), model.getAttr('CBasis', constrs)))
+        except gp.GurobiError:  # No basis, e.g. barrier without crossover
+            vbasis = cbasis = None
+    warm_starts[key] = (vbasis, cbasis, x)
+
+
+def update(model):
+    """Apply pending changes of the model (or model template) so that attributes can be modified in place.
+
+    Args:
+        model (gurobipy.Model or template.ModelTemplate): model
+
+    Returns:
+        None
+    """
+    if hasattr(model, 'finish'):  # Model template applies its own attribute changes first
+        model.finish()
+    else:
+        model.update()
+
+
+def optimize(model, key=None, prob_id=None, warm_start_flag=None):
+    """Optimise the model, warm starting from the last solution of the key and recording its own solution.
+
+    Args:
+        model (gurobipy.Model or template.ModelTemplate): model
+        key (hashable): key of the loop (e.g. battery directory and process), or None for no warm start
+        prob_id (str): problem ID of the model, i.e. suffix of names
+        warm_start_flag (bool): warm start or not (None for WARM_START_FLAG); statistics are kept separately so that
+                                runs with and without warm start can be compared
+
+    Returns:
+        None
+    """
+    update(model)
+    warm_start_flag = WARM_START_FLAG if warm_start_flag is None else warm_start_flag
+    warm = key is not None and warm_start_flag and set_warm_start(model, key, prob_id)
+    model.optimize()
+    stats = solve_stats.setdefault((key, warm), [0, 0, 0, 0.0])
+    stats[0] += 1
+    stats[1] += int(model.IterCount) + model.BarIterCount
+    stats[2] += int(model.NodeCount) if model.IsMIP else 0
+    stats[3] += model.Runtime
+    if key is not None:
+        record_warm_start(model, key, prob_id)
+
+
+def report_solve_stats():
+    """Log average iterations, nodes and runtime of solves with and without warm start for each key.
+
+    Returns:
+        dict: solve statistics
+    """
+    for (key, warm), (solves, iterations, nodes, runtime) in solve_stats.items():
+        logging.info(f'{key} {"warm" if warm else "cold"}: {solves} solves, {iterations / solves:.1f} iterations, '
+                     f'{nodes / solves:.1f} nodes, {runtime / solves:.4f}s on average')
+    return solve_stats
+
+
+@atexit.register
+def dispose_envs():
+    """Dispose environments created by this process (but not those inherited from the parent process)."""
+    while environments:
+        pid, env = environments.pop()
+        if pid == os.getpid():
+            env.dispose()
@@ -3,9 +3,8 @@ import datetime
 import default
 from helpers import Battery
 import numpy as np
-from offer import add_du_detail, add_du_detail_summary
+from offer import add_du_detail, add_du_detail_summary, read_registration
 import pandas as pd
-from preprocess import download_registration
 from read import read_dispatch_prices
 from reflect import extract_row
 from multiprocessing.pool import ThreadPool as Pool
@@ -76,19 +75,14 @@ def add_dispatchload(units, t, start, process, i, k=0, path_to_out=default.OUT_D
 
 
 def add_registeration(units):
-    path_to_registeration = download_registration(True)
-    with pd.ExcelFile(path_to_registeration) as xls:
-        df = pd.read_excel(xls, 'Generators and Scheduled Loads')
-        for index, row in df.iterrows():
-            unit = units.get(row['DUID'])
-            if unit:
-                if row['Fuel Source - Primary'] not in ['', ' ', '-', None, np.nan]:
-                    unit.source = row['Fuel Source - Primary']
-                else:
-                    unit.source = 'Other'
-                unit.dispatch_type = row['Dispatch Type']
-                unit.classification = row['Classification']
-                unit.region_id = row['Region']
+    for duid, rows in read_registration().items():
+        unit = units.get(duid)
+        if unit:
+            fuel_source, dispatch_type, classification, region = rows[-1]  # Last row as the workbook was read before
+            unit.source = 'Other' if fuel_source is None else fuel_source
+            unit.dispatch_type = dispatch_type
+            unit.classification = classification
+            unit.region_id = region
 
 
 def write_to_csv(energy):
@@ -0,0 +1,288 @@
+# Persistent Gurobi model reused across consecutive intervals
+import contextlib
+import gurobipy as gp
+import logging
+import numpy as np
+import scipy.sparse as sp
+import solver
+
+templates = {}  # Model templates of rolling loops, i.e. {key: ModelTemplate}
+
+
+class ModelTemplate:
+    """Gurobi model kept across consecutive intervals. It is passed to dispatch as the model and behaves like
+    gurobipy.Model, but variables and constraints are matched by name without the problem ID (i.e. the structure)
+    against those of the last interval. Matched variables only get new bounds and objective coefficients; matched
+    constraints with the same coefficients only get new RHS. Other constraints are replaced, and variables and
+    constraints that disappeared are removed before optimising. The basis of the last interval is kept as warm start.
+    Matrix-API variables and constraints are matched in the same way when they are given a list of names.
+
+    Attributes:
+        model (gurobipy.Model): model
+        prob_id (str): problem ID of the current interval
+        vars (dict): {structural name: Var}
+        constrs (dict): {structural name: (Constr, sense, coefficients)}
+        var_keys (dict): {id of Var: structural name}
+        constr_keys (dict): {id of Constr: structural name}
+        others (list): unnamed variables and constraints (including unnamed matrix-API ones), SOS and general
+                       constraints of the current interval
+        fingerprint (frozenset): structural names of the last interval
+        stats (dict): numbers of reused and added variables and constraints of the current interval
+    """
+    def __init__(self, env=None, name=''):
+        self.model = gp.Model(env=solver.get_env() if env is None else env, name=name)
+        self.prob_id = None
+        self.vars = {}
+        self.constrs = {}
+        self.var_keys = {}
+        self.constr_keys = {}
+        self.others = []
+        self.fingerprint = None
+        self.used_vars, self.used_constrs = set(), set()
+        self.var_updates, self.constr_updates = [], []
+        self.finished = True
+        self.stats = {}
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def get_key(self, name):
+        return name.replace(f'_{self.prob_id}', '') if self.prob_id else name
+
+    def begin(self, prob_id):
+        """Start formulating the interval of the given problem ID.
+
+        Args:
+            prob_id (str): problem ID, i.e. suffix of variable and constraint names
+
+        Returns:
+            None
+        """
+        self.model.remove(self.others)
+        self.others = []
+        self.prob_id = prob_id
+        self.used_vars, self.used_constrs = set(), set()
+        self.var_updates, self.constr_updates = [], []
+        self.finished = False
+        self.stats = {'reused vars': 0, 'added vars': 0, 'reused constrs': 0, 'added constrs': 0}
+
+    def apply_var_updates(self):
+        """Apply attributes of the matched variables added so far, i.e. as if they were added by addVar now."""
+        if self.var_updates:
+            variables, lbs, ubs, objs, vtypes, names = zip(*self.var_updates)
+            for attr, values in [('LB', lbs), ('UB', ubs), ('Obj', objs), ('VType', vtypes), ('VarName', names)]:
+                self.model.setAttr(attr, list(variables), list(values))
+            self.var_updates = []
+
+    def finish(self):
+        """Apply attribute changes and remove variables and constraints not used by the current interval."""
+        if self.finished:
+            return
+        self.apply_var_updates()
+        if self.constr_updates:
+            constrs, rhss, names = zip(*self.constr_updates)
+            self.model.setAttr('RHS', list(constrs), list(rhss))
+            self.model.setAttr('ConstrName', list(constrs), list(names))
+        stale_constrs = [key for key in self.constrs if key not in self.used_constrs]
+        stale_vars = [key for key in self.vars if key not in self.used_vars]
+        self.model.remove([self.pop_constr(key) for key in stale_constrs])
+        self.model.remove([self.pop_var(key) for key in stale_vars])
+        fingerprint = frozenset(self.vars) | frozenset(self.constrs)
+        if self.fingerprint is not None and fingerprint != self.fingerprint:
+            logging.debug(f'Template structure of {self.prob_id} changed by {len(fingerprint ^ self.fingerprint)} names.')
+        self.fingerprint = fingerprint
+        self.finished = True
+        self.model.update()
+        logging.debug(f'Template {self.prob_id}: {self.stats}')
+
+    def pop_var(self, key):
+        var = self.vars.pop(key)
+        self.var_keys.pop(id(var), None)
+        return var
+
+    def pop_constr(self, key):
+        constr = self.constrs.pop(key)[0]
+        self.constr_keys.pop(id(constr), None)
+        return constr
+
+    def addVar(self, lb=0.0, ub=gp.GRB.INFINITY, obj=0.0, vtype=gp.GRB.CONTINUOUS, name='', column=None):
+        key = self.get_key(name)
+        if not name or key in self.used_vars or column is not None:
+            var = self.model.addVar(lb, ub, obj, vtype, name, column)
+            self.others.append(var)
+            return var
+        self.used_vars.add(key)
+        var = self.vars.get(key)
+        if var is None:
+            var = self.vars[key] = self.model.addVar(lb, ub, obj, vtype, name)
+            self.var_keys[id(var)] = key
+            self.stats['added vars'] += 1
+        else:
+            self.var_updates.append((var, lb, ub, obj, vtype, name))
+            self.stats['reused vars'] += 1
+        return var
+
+    def get_coefficients(self, lhs, rhs):
+        """Get coefficients (sorted by structural name of variables) and constant of lhs - rhs, or None if any term
+        is not a linear term of known variables."""
+        expr = gp.LinExpr() + lhs - rhs
+        if not isinstance(expr, gp.LinExpr):
+            return None
+        coefficients = {}
+        for i in range(expr.size()):
+            key = self.var_keys.get(id(expr.getVar(i)))
+            if key is None:
+                return None
+            coefficients[key] = coefficients.get(key, 0.0) + expr.getCoeff(i)
+        return tuple(sorted(coefficients.items())), expr.getConstant()
+
+    def addLConstr(self, lhs, sense=None, rhs=None, name=''):
+        if sense is None:  # lhs is TempConstr
+            try:
+                lhs, sense, rhs = lhs._lhs, lhs._sense, lhs._rhs
+            except AttributeError:
+                constr = self.model.addLConstr(lhs, name=name)
+                self.others.append(constr)
+                return constr
+        key = self.get_key(name)
+        result = None
+        if name and key not in self.used_constrs:
+            try:
+                result = self.get_coefficients(lhs, rhs if rhs is not None else 0.0)
+            except (gp.GurobiError, TypeError):
+                result = None
+        if result is None:
+            constr = self.model.addLConstr(lhs, sense, rhs, name)
+            self.others.append(constr)
+            return constr
+        coefficients, constant = result
+        self.used_constrs.add(key)
+        previous = self.constrs.get(key)
+        if previous is not None and previous[1] == sense and previous[2] == coefficients:
+            self.constr_updates.append((previous[0], -constant, name))
+            self.stats['reused constrs'] += 1
+            return previous[0]
+        if previous is not None:
+            self.model.remove(self.pop_constr(key))
+        constr = self.model.addLConstr(lhs, sense, rhs, name)
+        self.constrs[key] = (constr, sense, coefficients)
+        self.constr_keys[id(constr)] = key
+        self.stats['added constrs'] += 1
+        return constr
+
+    def addConstr(self, *args, **kwargs):
+        constr = self.model.addConstr(*args, **kwargs)
+        self.others.append(constr)
+        return constr
+
+    def addMVar(self, shape, lb=0.0, ub=gp.GRB.INFINITY, obj=0.0, vtype=gp.GRB.CONTINUOUS, name=''):
+        if isinstance(name, str):
+            mvar = self.model.addMVar(shape, lb, ub, obj, vtype, name)
+            self.others.extend(mvar.tolist())
+            return mvar
+        size = int(np.prod(shape))
+        lbs, ubs, objs, vtypes = [np.broadcast_to(np.asarray(value), size).tolist() for value in [lb, ub, obj, vtype]]
+        variables = [self.addVar(lbs[i], ubs[i], objs[i], vtypes[i], var_name)
+                     for i, var_name in enumerate(np.asarray(name).ravel().tolist())]
+        return gp.MVar.fromlist(variables).reshape(shape)
+
+    def addMConstr(self, A, x, sense, b, name=''):
+        if isinstance(name, str):
+            mconstr = self.model.addMConstr(A, x, sense, b, name)
+            self.others.extend(mconstr.tolist())
+            return mconstr
+        A = sp.csr_matrix(A)
+        variables = x.tolist()
+        senses = np.broadcast_to(np.asarray(sense), A.shape[0]).tolist()
+        constrs = []
+        for i, constr_name in enumerate(np.asarray(name).ravel().tolist()):
+            start, end = A.indptr[i], A.indptr[i + 1]
+            expr = gp.LinExpr(A.data[start:end].tolist(), [variables[j] for j in A.indices[start:end]])
+            constrs.append(self.addLConstr(expr, senses[i], float(b[i]), constr_name))
+        return gp.MConstr.fromlist(constrs)
+
+    def addSOS(self, *args, **kwargs):
+        sos = self.model.addSOS(*args, **kwargs)
+        self.others.append(sos)
+        return sos
+
+    def remove(self, item):
+        key = self.constr_keys.get(id(item))
+        if key is not None:
+            self.pop_constr(key)
+            self.used_constrs.discard(key)
+        self.model.remove(item)
+
+    def setObjective(self, expr, sense=None):
+        self.apply_var_updates()  # Otherwise Obj of matched variables would overwrite the objective in finish
+        self.model.setObjective(expr, sense)
+
+    def getVarByName(self, name):
+        var = self.vars.get(self.get_key(name))
+        return self.model.getVarByName(name) if var is None else var
+
+    def getConstrByName(self, name):
+        constr = self.constrs.get(self.get_key(name))
+        return self.model.getConstrByName(name) if constr is None else constr[0]
+
+    def optimize(self, *args):
+        self.finish()
+        self.model.optimize(*args)
+
+    def write(self, filename):
+        self.finish()
+        self.model.write(filename)
+
+    def dispose(self):
+        self.model.dispose()
+
+
+def get_template(key, name=''):
+    """Get the model template of the rolling loop, creating it if not exists.
+
+    Args:
+        key (hashable): key of the loop, e.g. process type or battery directory
+        name (str): model name
+
+    Returns:
+        ModelTemplate: model template
+    """
+    if key not in templates:
+        templates[key] = ModelTemplate(name=name)
+        templates[key].setParam('OutputFlag', 0)
+    return templates[key]
+
+
+def release_template(key):
+    """Dispose the model template of the rolling loop.
+
+    Args:
+        key (hashable): key of the loop
+
+    Returns:
+        None
+    """
+    model_template = templates.pop(key, None)
+    if model_template is not None:
+        model_template.dispose()
+
+
+@contextlib.contextmanager
+def open_model(name, prob_id, key=None):
+    """Open a new model, or the model template of the key starting the interval of the problem ID.
+
+    Args:
+        name (str): model name
+        prob_id (str): problem ID of the interval
+        key (hashable): key of the template, or None to use a new model
+
+    Returns:
+        generator: gurobipy.Model or ModelTemplate
+    """
+    if key is None:
+        with solver.open_model(name) as model:
+            yield model
+    else:
+        model_template = get_template(key, name)
+        model_template.begin(prob_id)
+        yield model_template
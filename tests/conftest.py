@@ -0,0 +1,11 @@
+import pathlib
+import sys
+import tempfile
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC_DIR))
+
+import default  # noqa: E402
+
+# Modules create their data directories on import, so point the data directory to a temporary one before any import
+default.DATA_DIR = pathlib.Path(tempfile.mkdtemp(prefix='nemde-test-'))
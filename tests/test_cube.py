@@ -0,0 +1,97 @@
+import datetime
+
+import numpy as np
+import pytest
+
+pytest.importorskip('requests')
+import cube  # noqa: E402
+import default  # noqa: E402
+import mms  # noqa: E402
+import preprocess  # noqa: E402
+
+START = datetime.datetime(2021, 7, 18, 4, 5)
+END = START + 3 * default.FIVE_MIN
+
+
+def write_dispatchprice(p):
+    """Write a DVD DISPATCHPRICE file with NSW1 prices of both intervention flags in the first two intervals."""
+    columns = ['SETTLEMENTDATE', 'RUNNO', 'REGIONID', 'INTERVENTION'] + list(cube.AEMO_COLUMNS.values())
+    lines = [','.join(['I', 'DISPATCH', 'PRICE', '1'] + columns)]
+    for i in range(2):
+        t = START + i * default.FIVE_MIN
+        for intervention in ['0', '1']:
+            prices = [str(100 * int(intervention) + 10 * i + j) for j in range(len(cube.AEMO_COLUMNS))]
+            lines.append(','.join(['D', 'DISPATCH', 'PRICE', '1', f'"{t:%Y/%m/%d %H:%M:%S}"', '1', 'NSW1', intervention] + prices))
+    # Interval before the cube is ignored
+    lines.append(','.join(['D', 'DISPATCH', 'PRICE', '1', f'"{START - default.FIVE_MIN:%Y/%m/%d %H:%M:%S}"', '1', 'NSW1', '0'] + ['-1'] * len(cube.AEMO_COLUMNS)))
+    p.write_text('\n'.join(lines) + '\n')
+
+
+@pytest.fixture
+def dvd(tmp_path, monkeypatch):
+    p = tmp_path / 'PUBLIC_DVD_DISPATCHPRICE_202107010000.CSV'
+    write_dispatchprice(p)
+    monkeypatch.setattr(preprocess, 'download_dvd_data', lambda table, month: p)
+    monkeypatch.setattr(cube, 'CUBE_DIR', tmp_path / 'cube')
+    return p
+
+
+def test_get_interval_index():
+    assert cube.get_interval_index(START, START) == 0
+    assert cube.get_interval_index(END, START) == 3
+    times = np.array([mms.to_datetime64(START + i * default.FIVE_MIN) for i in [0, 2, -1]])
+    np.testing.assert_array_equal(cube.get_interval_index(times, START), [0, 2, -1])
+
+
+def test_get_cube_path_includes_intervention():
+    assert cube.get_cube_path(START, END, 'AEMO', '0') != cube.get_cube_path(START, END, 'AEMO', '1')
+    assert cube.get_cube_path(START, END, 'AEMO').name == 'PRICE_AEMO_0_202107180405_202107180420.npy'
+
+
+@pytest.mark.parametrize('intervention', ['0', '1'])
+def test_build_cube(dvd, intervention):
+    prices = cube.load_cube(START, END, intervention=intervention)
+    assert prices.shape == (4, len(cube.REGIONS), len(cube.PRICE_TYPES), len(cube.SOURCES))
+    offset = 100 * int(intervention)
+    np.testing.assert_array_equal(cube.get_prices(prices, 'NSW1')[:2], [offset, offset + 10])
+    np.testing.assert_array_equal(cube.get_prices(prices, 'NSW1', 'LOWER5MIN')[:2], [offset + 8, offset + 18])
+    assert np.isnan(cube.get_prices(prices, 'NSW1')[2:]).all()
+    assert np.isnan(cube.get_prices(prices, 'VIC1')).all()
+    assert np.isnan(cube.get_prices(prices, 'NSW1', source='CUSTOM')).all()
+
+
+def test_add_custom_prices(tmp_path):
+    result_dir = tmp_path / 'out' / 'dispatch'
+    result_dir.mkdir(parents=True)
+    row = ['D', 'DISPATCH', 'PRICE', '1', '', '', 'SA1'] + [''] * 30
+    row[9] = '55.5'
+    (result_dir / f'DISPATCHIS_{default.get_case_datetime(START + default.FIVE_MIN)}.csv').write_text(','.join(row) + '\n')
+    prices = np.full((4, len(cube.REGIONS), len(cube.PRICE_TYPES), len(cube.SOURCES)), np.nan)
+    cube.add_custom_prices(prices, START, tmp_path / 'out')
+    custom = cube.get_prices(prices, 'SA1', source='CUSTOM')
+    assert custom[1] == 55.5
+    assert np.isnan(custom[[0, 2, 3]]).all()
+    assert np.isnan(cube.get_prices(prices, 'SA1', 'RAISEREG', source='CUSTOM')[1])
+
+
+@pytest.mark.filterwarnings('ignore:Mean of empty slice', 'ignore:Degrees of freedom')  # Regions without prices
+def test_calculate_volatility():
+    prices = np.full((4, len(cube.REGIONS), len(cube.PRICE_TYPES), len(cube.SOURCES)), np.nan)
+    prices[:, 0, 0, 0] = [1, 3, 10, np.nan]
+    means, stds = cube.calculate_volatility(prices, intervals=2)
+    np.testing.assert_array_equal(means[:, 0, 0], [2, 10])
+    np.testing.assert_array_equal(stds[:, 0, 0], [1, 0])
+
+
+def test_get_months():
+    assert cube.get_months(datetime.datetime(2021, 1, 1, 0, 5), datetime.datetime(2021, 12, 31, 23, 55)) == \
+        [datetime.datetime(2021, month, 1) for month in range(1, 13)]
+    assert cube.get_months(START, END) == [datetime.datetime(2021, 7, 1)]
+    assert cube.get_months(datetime.datetime(2021, 12, 31, 4, 5), datetime.datetime(2022, 1, 1, 0, 0))[-1] == \
+        datetime.datetime(2022, 1, 1)
+
+
+def test_load_missing_custom_cube_raises(dvd):
+    with pytest.raises(FileNotFoundError):
+        cube.load_cube(START, END, 'CUSTOM')
+    assert not (dvd.parent / 'cube').exists() or not any((dvd.parent / 'cube').iterdir())
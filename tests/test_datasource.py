@@ -0,0 +1,83 @@
+import collections
+import http.server
+import io
+import threading
+import time
+import zipfile
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+requests = pytest.importorskip('requests')
+import datasource  # noqa: E402
+import preprocess  # noqa: E402
+
+
+def make_zip():
+    """Make a zip file holding one CSV file."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('PUBLIC_TEST.CSV', 'I,TEST\n')
+    return buffer.getvalue()
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Stand-in for nemweb: /flaky fails once with 503, /stall never answers, other paths serve a zip file."""
+    hits = collections.Counter()
+    content = make_zip()
+
+    def do_GET(self):
+        self.hits[self.path] += 1
+        if self.path == '/flaky' and self.hits[self.path] == 1:
+            self.send_response(503)
+            self.end_headers()
+            return
+        if self.path == '/stall':  # The client has timed out before the handler returns
+            time.sleep(2)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.content)))
+        self.end_headers()
+        self.wfile.write(self.content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits.clear()
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retry_on_server_error(server):
+    source = datasource.HttpSource(retries=2, backoff=0)
+    result = source.get(f'{server}/flaky')
+    assert result.ok
+    assert Handler.hits['/flaky'] == 2
+
+
+def test_timeout_on_stalled_connection(server):
+    source = datasource.HttpSource(retries=1, backoff=0, timeout=(1, 0.2))
+    with pytest.raises(requests.Timeout):
+        source.get(f'{server}/stall')
+    assert Handler.hits['/stall'] == 2
+
+
+def test_archive_downloaded_once(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(preprocess, 'ARCHIVE_URL', server)
+    monkeypatch.setattr(preprocess, 'archive_dir', tmp_path)
+    monkeypatch.setattr(datasource, 'data_source', datasource.HttpSource(retries=0))
+    with ThreadPool(4) as pool:
+        paths = pool.starmap(preprocess.download_archive, [('Section', 'PUBLIC_TEST_20210718.zip')] * 8)
+    assert paths == [tmp_path / 'Section' / 'PUBLIC_TEST_20210718.zip'] * 8
+    assert paths[0].read_bytes() == Handler.content
+    # A resumed download reads the local archive
+    preprocess.download_archive('Section', 'PUBLIC_TEST_20210718.zip')
+    assert Handler.hits['/Section/PUBLIC_TEST_20210718.zip'] == 1
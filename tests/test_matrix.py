@@ -0,0 +1,91 @@
+import datetime
+import types
+
+import pytest
+
+gp = pytest.importorskip('gurobipy')
+pytest.importorskip('scipy')
+import constrain  # noqa: E402
+import matrix  # noqa: E402
+import offer  # noqa: E402
+
+PROB_ID = 'dispatch_test'
+CVP = {'OfferPrice': 1000.0}
+DEMAND = 45.0
+
+
+def make_units():
+    """Make three units with two bands each, the bands of later units being more expensive."""
+    units = {}
+    for u, duid in enumerate(['A', 'B', 'C']):
+        unit = offer.Unit(duid)
+        unit.energy = offer.EnergyBid([])
+        unit.energy.band_avail = [5 * (u + 1)] * 2 + [0] * (offer.BANDS - 2)
+        unit.energy.price_band = [10.0 * (u + 1) + no for no in range(offer.BANDS)]
+        units[duid] = unit
+    return units
+
+
+def formulate(model, builder, demand=DEMAND):
+    """Formulate the energy offers of the units with the given builder against a fixed demand, as build_model does.
+
+    Returns:
+        list: units
+    """
+    units = make_units()
+    penalty = 0.0
+    energy_units = matrix.get_energy_units(units)
+    if builder == 'matrix':
+        matrix.add_energy_offers(model, energy_units, PROB_ID)
+        penalty = matrix.add_total_band_constrs(model, energy_units, PROB_ID, penalty, CVP)
+    else:
+        for unit in energy_units:
+            constrain.add_energy_offer(model, unit, PROB_ID)
+            penalty = constrain.add_total_band_constr(model, unit, PROB_ID, False, penalty, CVP)
+    cost = gp.quicksum(price * o for unit in energy_units for price, o in zip(unit.energy.price_band, unit.offers))
+    demand_constr = model.addLConstr(gp.quicksum(unit.total_cleared for unit in energy_units) == demand, name='DEMAND')
+    model.setObjective(cost + penalty, gp.GRB.MINIMIZE)
+    model.update()
+    return types.SimpleNamespace(regions={'NSW1': types.SimpleNamespace(rrp_constr=demand_constr)})
+
+
+def solve(builder):
+    """Solve the formulation of the given builder."""
+    with gp.Model(builder) as model:
+        model.setParam('OutputFlag', 0)
+        formulate(model, builder)
+        model.optimize()
+        assert model.status == gp.GRB.Status.OPTIMAL
+        return (model.NumVars, model.NumConstrs, model.ObjVal,
+                dict(zip(model.getAttr('VarName', model.getVars()), model.getAttr('X', model.getVars()))))
+
+
+def test_builders_match():
+    scalar_vars, scalar_constrs, scalar_obj, scalar_x = solve('scalar')
+    matrix_vars, matrix_constrs, matrix_obj, matrix_x = solve('matrix')
+    assert (matrix_vars, matrix_constrs) == (scalar_vars, scalar_constrs) == (3 * (offer.BANDS + 2), 3 * (offer.BANDS + 1) + 1)
+    assert matrix_obj == pytest.approx(scalar_obj)
+    assert matrix_x.keys() == scalar_x.keys()
+    for name, x in scalar_x.items():
+        assert matrix_x[name] == pytest.approx(x), name
+    # Bands clear 5 + 5 + 10 + 10 + 15 + 15 = 60 MW, so penalty is not used and the cheapest bands are cleared
+    assert sum(x for name, x in scalar_x.items() if name.startswith('Deficit_Offer_MW')) == pytest.approx(0)
+    assert scalar_x[f'Total_Cleared_C_{PROB_ID}'] == pytest.approx(15)
+
+
+def test_compare_builders(monkeypatch):
+    builds = []
+
+    def build_model(model, builder, current, start, predispatch_current, interval, process, demand=DEMAND):
+        builds.append(builder)
+        return formulate(model, builder, demand + (1 if builder == 'matrix' and demand != DEMAND else 0))
+
+    monkeypatch.setattr(matrix, 'build_model', build_model)
+    start = datetime.datetime(2021, 7, 18, 4, 5)
+    assert matrix.compare_builders([(start, 0), (start, 1)], repeats=2) == []
+    # One warm-up and two timed builds of each builder per case, alternating which builder goes first
+    assert builds[:5] == ['scalar', 'scalar', 'matrix', 'matrix', 'scalar']
+    assert builds[5:10] == ['scalar', 'matrix', 'scalar', 'scalar', 'matrix']
+    mismatches = matrix.compare_builders([(start, 0)], repeats=1, demand=30.0)
+    assert any('objective' in description for _, _, description in mismatches)
+    assert any(description.startswith('Total_Cleared') for _, _, description in mismatches)
@@ -0,0 +1,101 @@
+import datetime
+import os
+
+import numpy as np
+import pytest
+
+import mms
+
+T = datetime.datetime(2021, 7, 18, 4, 5)
+SCHEMA = {'DUID': mms.STR, 'SETTLEMENTDATE': mms.DATETIME, 'RUNNO': mms.INT, 'TOTALCLEARED': mms.FLOAT}
+CSV = '''C,NEMP.WORLD,DISPATCHIS,AEMO,PUBLIC,2021/07/18,04:00:05
+I,DISPATCH,UNIT_SOLUTION,1,SETTLEMENTDATE,RUNNO,DUID,TOTALCLEARED
+D,DISPATCH,UNIT_SOLUTION,1,"2021/07/18 04:05:00",1,BW01,500.5
+I,DISPATCH,UNIT_SOLUTION,2,SETTLEMENTDATE,RUNNO,DUID,INTERVENTION,TOTALCLEARED
+D,DISPATCH,UNIT_SOLUTION,2,"2021/07/18 04:10:00",1,BW01,0,501
+D,DISPATCH,UNIT_SOLUTION,2,"2021/07/18 04:10:00",1,BW02,0,
+I,DISPATCH,PRICE,1,SETTLEMENTDATE,REGIONID,RRP
+D,DISPATCH,PRICE,1,"2021/07/18 04:05:00",NSW1,45.1
+C,"END OF REPORT",8
+'''
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    p = tmp_path / 'PUBLIC_DISPATCHIS_202107180405.CSV'
+    p.write_text(CSV)
+    return p
+
+
+def test_read_table_aligns_header_versions(csv_path):
+    batch = mms.read_table(csv_path, 'UNIT_SOLUTION', SCHEMA)
+    assert list(batch['DUID']) == ['BW01', 'BW01', 'BW02']
+    assert batch['SETTLEMENTDATE'][1] == mms.to_datetime64(datetime.datetime(2021, 7, 18, 4, 10))
+    assert batch['RUNNO'].dtype == np.int64
+    np.testing.assert_array_equal(batch['TOTALCLEARED'], [500.5, 501, np.nan])
+
+
+def test_read_tables_filters_rows(csv_path):
+    tables = mms.read_tables(csv_path, {'UNIT_SOLUTION': {'TOTALCLEARED': mms.FLOAT}, 'MISSING': {'A': mms.FLOAT}},
+                             where={'UNIT_SOLUTION': {'DUID': 'BW01'}})
+    np.testing.assert_array_equal(tables['UNIT_SOLUTION']['TOTALCLEARED'], [500.5, 501])
+    assert len(tables['MISSING']['A']) == 0
+
+
+def test_missing_column_raises(csv_path):
+    with pytest.raises(ValueError):
+        mms.read_table(csv_path, 'UNIT_SOLUTION', {'NOTACOLUMN': mms.FLOAT})
+
+
+def test_iter_records(csv_path):
+    batch = mms.read_table(csv_path, 'PRICE', {'REGIONID': mms.STR, 'RRP': mms.FLOAT})
+    assert list(mms.iter_records(batch)) == [{'REGIONID': 'NSW1', 'RRP': 45.1}]
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setattr(mms, 'CACHE_DIR', tmp_path / 'columnar')
+    return tmp_path / 'columnar'
+
+
+def test_cached_tables_match_csv(csv_path, cache_dir):
+    where = {'UNIT_SOLUTION': {'SETTLEMENTDATE': '2021/07/18 04:10:00'}}
+    cached = mms.read_cached_tables(csv_path, T, {'UNIT_SOLUTION': SCHEMA}, where)
+    direct = mms.read_tables(csv_path, {'UNIT_SOLUTION': SCHEMA}, where)
+    assert mms.get_marker_path(csv_path, T).is_file()
+    for column in SCHEMA:
+        np.testing.assert_array_equal(cached['UNIT_SOLUTION'][column], direct['UNIT_SOLUTION'][column])
+
+
+def test_cache_is_rebuilt_when_csv_changes(csv_path, cache_dir):
+    schema = {'PRICE': {'REGIONID': mms.STR, 'RRP': mms.FLOAT}}
+    assert list(mms.read_cached_tables(csv_path, T, schema)['PRICE']['RRP']) == [45.1]
+    csv_path.write_text(CSV.replace('45.1', '99.9'))
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert list(mms.read_cached_tables(csv_path, T, schema)['PRICE']['RRP']) == [99.9]
+    # Table removed from the CSV file is not served from the Parquet file of the earlier version
+    csv_path.write_text('\n'.join(line for line in CSV.splitlines() if ',PRICE,' not in line))
+    assert len(mms.read_cached_tables(csv_path, T, schema)['PRICE']['RRP']) == 0
+
+
+def test_cache_is_reused(csv_path, cache_dir, monkeypatch):
+    schema = {'PRICE': {'RRP': mms.FLOAT}}
+    mms.read_cached_tables(csv_path, T, schema)
+    monkeypatch.setattr(mms, 'read_raw_tables', None)  # Converting again would fail
+    assert list(mms.read_cached_tables(csv_path, T, schema)['PRICE']['RRP']) == [45.1]
+
+
+def test_empty_marker_of_earlier_version_is_rebuilt(csv_path, cache_dir):
+    marker = mms.get_marker_path(csv_path, T)
+    marker.parent.mkdir(parents=True)
+    marker.touch()
+    assert list(mms.read_cached_tables(csv_path, T, {'PRICE': {'RRP': mms.FLOAT}})['PRICE']['RRP']) == [45.1]
+
+
+def test_collection_condition(csv_path, cache_dir):
+    where = {'UNIT_SOLUTION': {'DUID': {'BW02', 'ER01'}, 'SETTLEMENTDATE': '2021/07/18 04:10:00'}}
+    for tables in [mms.read_tables(csv_path, {'UNIT_SOLUTION': SCHEMA}, where),
+                   mms.read_cached_tables(csv_path, T, {'UNIT_SOLUTION': SCHEMA}, where)]:
+        assert list(tables['UNIT_SOLUTION']['DUID']) == ['BW02']
@@ -0,0 +1,89 @@
+import csv
+import datetime
+
+import pytest
+
+pytest.importorskip('pandas')
+import default  # noqa: E402
+import offer  # noqa: E402
+
+FIRST = datetime.datetime(2021, 7, 18, 4, 5)
+
+
+def write_interval(path_to_out, t, mw):
+    """Write our DISPATCHLOAD of the interval for unit A and add it to the running daily energy, as write_dispatchload
+    does with k = 1."""
+    p = path_to_out / 'dispatch_1' / f'dispatchload_{default.get_case_datetime(t + default.FIVE_MIN)}.csv'
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with p.open('w') as f:
+        csv.writer(f).writerow(['D', 'A', mw, mw])
+    offer.update_daily_energy(t, 1, path_to_out, {'A': (mw, mw)})
+
+
+@pytest.fixture
+def path_to_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(offer, 'daily_energy_sums', {})
+    return tmp_path
+
+
+def calculate(path_to_out, t):
+    units = {'A': offer.Unit('A')}
+    offer.calculate_daily_energy(units, t, 1, path_to_out)
+    offer.daily_energy_sums.clear()  # Read the saved sum again, as a new process
+    return offer.read_daily_energy_sum(FIRST, 1, path_to_out)
+
+
+def test_running_daily_energy(path_to_out):
+    for i, mw in enumerate([12, 24, 36]):
+        write_interval(path_to_out, FIRST + i * default.FIVE_MIN, mw)
+    last, sums = calculate(path_to_out, FIRST + 3 * default.FIVE_MIN)
+    assert last == FIRST + 2 * default.FIVE_MIN
+    assert sums['A'] == [6.0, 6.0, 36.0]
+
+
+@pytest.mark.parametrize('rerun', [1, 2])
+def test_rerun_interval_rebuilds_daily_energy(path_to_out, rerun):
+    for i, mw in enumerate([12, 24, 36]):
+        write_interval(path_to_out, FIRST + i * default.FIVE_MIN, mw)
+    write_interval(path_to_out, FIRST + rerun * default.FIVE_MIN, 120)
+    write_interval(path_to_out, FIRST + 3 * default.FIVE_MIN, 12)
+    last, sums = calculate(path_to_out, FIRST + 4 * default.FIVE_MIN)
+    expected = [12, 24, 36, 12]
+    expected[rerun] = 120
+    assert sums['A'][0] == pytest.approx(sum(expected) / 12.0)
+
+
+def test_first_interval_restarts_daily_energy(path_to_out):
+    write_interval(path_to_out, FIRST, 12)
+    write_interval(path_to_out, FIRST, 24)
+    assert offer.read_daily_energy_sum(FIRST, 1, path_to_out)[1]['A'] == [2.0, 2.0, 24]
+
+
+def write_bids(p, interval_datetime):
+    """Write daily and period bids of unit A in BIDMOVE_COMPLETE layout with the period of another interval first."""
+    day = ['DUID', 'BIDTYPE', 'DAILYENERGYCONSTRAINT'] + offer.PRICE_BAND_COLUMNS + ['MINIMUMLOAD', 'T1', 'T2', 'T3', 'T4', 'NORMALSTATUS']
+    period = ['INTERVAL_DATETIME', 'DUID', 'BIDTYPE', 'MAXAVAIL', 'FIXEDLOAD', 'ROCUP', 'ROCDOWN', 'ENABLEMENTMIN',
+              'ENABLEMENTMAX', 'LOWBREAKPOINT', 'HIGHBREAKPOINT'] + offer.BAND_AVAIL_COLUMNS
+    lines = [','.join(['I', 'BID', 'BIDDAYOFFER_D', '2'] + day),
+             ','.join(['D', 'BID', 'BIDDAYOFFER_D', '2', 'A', 'ENERGY', '0'] + [str(i) for i in range(10)] + ['0', '1', '2', '3', '4', 'ON']),
+             ','.join(['D', 'BID', 'BIDDAYOFFER_D', '2', 'A', 'RAISEREG', ''] + [str(i) for i in range(10)] + [''] * 5 + ['']),
+             ','.join(['I', 'BID', 'BIDPEROFFER_D', '2'] + period)]
+    for t, mw in [('"2021/07/18 04:00:00"', '99'), (f'"{interval_datetime}"', '100')]:
+        lines.append(','.join(['D', 'BID', 'BIDPEROFFER_D', '2', t, 'A', 'ENERGY', mw, '0', '3', '4', '', '', '', ''] + ['10'] * 10))
+        lines.append(','.join(['D', 'BID', 'BIDPEROFFER_D', '2', t, 'A', 'RAISEREG', '20', '', '', '', '0', '100', '10', '90'] + ['2'] * 10))
+    p.write_text('\n'.join(lines) + '\n')
+
+
+def test_add_unit_bids_by_column_name(tmp_path, monkeypatch):
+    p = tmp_path / 'PUBLIC_BIDMOVE_COMPLETE_20210718.csv'
+    write_bids(p, default.get_interval_datetime(FIRST))
+    monkeypatch.setattr(offer.preprocess, 'download_bidmove_complete', lambda t: p)
+    units = {}
+    offer.add_unit_bids(units, FIRST, 'dispatch')
+    energy, bid = units['A'].energy, units['A'].fcas_bids['RAISEREG']
+    assert (energy.price_band, energy.t4, energy.normal_status) == ([float(i) for i in range(10)], 4, 'ON')
+    assert (energy.max_avail, energy.roc_up, energy.band_avail) == (100.0, 3, [10] * 10)
+    assert (bid.max_avail, bid.enablement_max, bid.high_breakpoint, bid.band_avail) == (20.0, 100, 90, [2] * 10)
+    units = {}
+    offer.add_unit_bids(units, FIRST, 'dispatch', fcas_flag=False)
+    assert units['A'].fcas_bids == {} and units['A'].energy.max_avail == 100.0
@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('requests')
+pytest.importorskip('xmltodict')
+import parse  # noqa: E402
+import preprocess  # noqa: E402
+
+START = datetime.datetime(2021, 7, 18, 4, 5)
+
+
+def write_xml(outputs_dir, t, padding=0):
+    """Write an extracted XML file holding one trader, padded to change its size."""
+    last, no = preprocess.default.datetime_to_interval(t)
+    p = outputs_dir / f'NEMSPDOutputs_{last.year}{last.month:02d}{last.day:02d}{no:03d}00.loaded'
+    p.write_text('<NEMSPDCaseFile><NemSpdInputs><TraderCollection>'
+                 f'<Trader TraderID="DUID{no}"/></TraderCollection></NemSpdInputs>'
+                 f'<Padding>{"x" * padding}</Padding></NEMSPDCaseFile>')
+    return p.stat().st_size
+
+
+@pytest.fixture
+def outputs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(preprocess, 'NEMSPDOutputs_dir', tmp_path)
+    monkeypatch.setattr(parse, 'xml_cache', parse.collections.OrderedDict())
+    return tmp_path
+
+
+def test_sections_and_xml_share_cache(outputs_dir):
+    size = write_xml(outputs_dir, START)
+    sections = parse.read_sections(START)
+    assert sections['Trader'] == [{'@TraderID': 'DUID1'}]
+    assert parse.read_sections(START) is sections
+    xml = parse.read_xml(START)
+    assert xml['NEMSPDCaseFile']['NemSpdInputs']['TraderCollection']['Trader']['@TraderID'] == 'DUID1'
+    assert parse.read_xml(START) is xml
+    assert list(parse.xml_cache) == [(START, 'sections'), (START, 'xml')]
+    assert [item[0] for item in parse.xml_cache.values()] == [size, size]
+    parse.clear_xml_cache()
+    assert len(parse.xml_cache) == 0
+
+
+def test_cache_evicts_least_recently_used_by_size(outputs_dir, monkeypatch):
+    times = [START + datetime.timedelta(minutes=5 * i) for i in range(3)]
+    sizes = [write_xml(outputs_dir, t, 1000) for t in times]
+    monkeypatch.setattr(parse, 'XML_CACHE_BUDGET', sum(sizes[:2]))
+    first = parse.read_sections(times[0])
+    parse.read_sections(times[1])
+    assert parse.read_sections(times[0]) is first  # Marked as recently used
+    parse.read_sections(times[2])
+    assert list(parse.xml_cache) == [(times[0], 'sections'), (times[2], 'sections')]
+
+
+def test_oversized_xml_is_kept(outputs_dir, monkeypatch):
+    monkeypatch.setattr(parse, 'XML_CACHE_BUDGET', 1)
+    write_xml(outputs_dir, START)
+    parse.read_sections(START)
+    assert list(parse.xml_cache) == [(START, 'sections')]
@@ -0,0 +1,186 @@
+import datetime
+import os
+import threading
+import zipfile
+
+import pytest
+
+pytest.importorskip('requests')
+import datasource  # noqa: E402
+import preprocess  # noqa: E402
+
+URL = 'http://nemweb.com.au/Reports/Archive/Section'
+
+
+class PageSource:
+    """Data source serving one directory listing page whose file names can change between requests."""
+    def __init__(self, names):
+        self.names = names
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.hits += 1
+        page = ''.join(f'<a href="{name}">{name}</a><br>' for name in self.names)
+        return datasource.Response(url, page.encode())
+
+
+@pytest.fixture
+def source(monkeypatch):
+    monkeypatch.setattr(preprocess, 'listings', {})
+    source = PageSource(['PUBLIC_DISPATCHIS_20210717.zip', 'PUBLIC_DISPATCHIS_20210718.zip', 'README.txt'])
+    monkeypatch.setattr(datasource, 'data_source', source)
+    return source
+
+
+def test_get_listing_parses_dates(source):
+    names, entries = preprocess.get_listing(URL)
+    assert names == sorted(source.names)
+    assert entries[0] == ('PUBLIC_DISPATCHIS_20210717.zip', datetime.datetime(2021, 7, 17), None)
+    assert entries[-1] == ('README.txt', None, None)
+
+
+def test_find_files_reuses_listing(source):
+    assert preprocess.find_files(URL, 'PUBLIC_DISPATCHIS_20210718.zip') == ['PUBLIC_DISPATCHIS_20210718.zip']
+    assert preprocess.find_files(URL, r'PUBLIC_DISPATCHIS_[0-9]{8}\.zip') == source.names[:2]
+    assert source.hits == 1
+
+
+def test_find_files_refreshes_listing_once_per_miss(source):
+    preprocess.get_listing(URL)
+    source.names.append('PUBLIC_DISPATCHIS_20210719.zip')
+    assert preprocess.find_files(URL, 'PUBLIC_DISPATCHIS_20210719.zip') == ['PUBLIC_DISPATCHIS_20210719.zip']
+    assert source.hits == 2
+
+
+def test_find_files_concurrent_misses(source):
+    preprocess.get_listing(URL)
+    errors = []
+
+    def find():
+        try:
+            preprocess.find_files(URL, 'PUBLIC_DISPATCHIS_20210720.zip')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=find) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_ttl_listing_expires(source, monkeypatch):
+    preprocess.get_listing(URL, ttl=300)
+    now = preprocess.time.time()
+    monkeypatch.setattr(preprocess.time, 'time', lambda: now + 301)
+    preprocess.get_listing(URL, ttl=300)
+    assert source.hits == 2
+
+
+def test_predispatch_files_use_refreshed_listing(source, monkeypatch):
+    preprocess.get_listing(f'{preprocess.ARCHIVE_URL}/PredispatchIS_Reports')
+    source.names.append('PUBLIC_PREDISPATCHIS_20210705_20210711.zip')
+    downloaded = []
+    monkeypatch.setattr(preprocess, 'download_archive', lambda section, name: downloaded.append(name))
+    preprocess.download_all_predispatch_files('PredispatchIS_Reports', 'PUBLIC_PREDISPATCHIS', '', None,
+                                              datetime.datetime(2021, 7, 10))
+    assert downloaded == ['PUBLIC_PREDISPATCHIS_20210705_20210711.zip']
+
+
+def test_xml_archives_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(preprocess, 'NEMSPDOutputs_dir', tmp_path)
+    monkeypatch.setattr(preprocess, 'xml_archives', preprocess.collections.OrderedDict())
+    times = [datetime.datetime(2021, 7, day, 12, 0) for day in range(18, 18 + preprocess.MAX_XML_ARCHIVES + 1)]
+    for t in times:
+        with zipfile.ZipFile(tmp_path / f'NemSpdOutputs_{t:%Y%m%d}_loaded.zip', 'w') as zf:
+            zf.writestr('NEMSPDOutputs.loaded', f'<Case>{t}</Case>')
+    first = preprocess.get_xml_archive(times[0])
+    stream = first.open('NEMSPDOutputs.loaded')
+    for t in times[1:]:
+        preprocess.get_xml_archive(t)
+    assert len(preprocess.xml_archives) == preprocess.MAX_XML_ARCHIVES
+    assert first.fp is None
+    assert stream.read() == f'<Case>{times[0]}</Case>'.encode()  # Member being streamed stays readable
+    stream.close()
+    preprocess.close_xml_archives()
+    assert len(preprocess.xml_archives) == 0
+
+
+def write_dvd(p, rows):
+    """Write a DVD file of D rows, i.e. ['D', report, table, version, effective date, version number, key, value]."""
+    lines = ['I,TEST,TABLE,1,EFFECTIVEDATE,VERSIONNO,KEY,VALUE']
+    lines += [','.join(['D', 'TEST', 'TABLE', '1', f'"{date}"', no, key, value]) for date, no, key, value in rows]
+    p.write_text('\n'.join(lines) + '\n')
+
+
+def values(rows):
+    """Get values of DVD rows."""
+    return [row[7] for row in rows]
+
+
+@pytest.fixture
+def dvd_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(preprocess, 'dvd_dir', tmp_path)
+    monkeypatch.setattr(preprocess, 'dvd_indices', {})
+    monkeypatch.setattr(preprocess, 'market_price_thresholds', {})
+    return tmp_path
+
+
+def test_dvd_index_by_effective_date(dvd_dir):
+    write_dvd(dvd_dir / 'DVD_TEST_202107010000.csv', [('2021/07/10 00:00:00', '1', 'A', 'a2'),
+                                                        ('2021/07/01 00:00:00', '1', 'A', 'a1'),
+                                                        ('2021/07/10 00:00:00', '2', 'A', 'a3'),
+                                                        ('2021/07/05 00:00:00', '1', 'B', 'b1')])
+    t = datetime.datetime(2021, 7, 18, 4, 5)
+    index = preprocess.index_dvd_data('TEST', t, (6,), 4)
+    assert sorted(index) == [('A',), ('B',)]
+    # Versions of the same date keep file order
+    assert values(preprocess.get_effective_rows(index, ('A',), t)) == ['a1', 'a2', 'a3']
+    assert values(preprocess.get_effective_rows(index, ('A',), datetime.datetime(2021, 7, 9))) == ['a1']
+    assert values(preprocess.get_effective_rows(index, ('B',), datetime.datetime(2021, 7, 4))) == []
+    assert values(preprocess.get_effective_rows(index, ('C',), t)) == []
+    assert preprocess.index_dvd_data('TEST', t, (6,), 4) is index
+
+
+def test_dvd_index_is_saved_and_invalidated(dvd_dir):
+    p = dvd_dir / 'DVD_TEST_202107010000.csv'
+    write_dvd(p, [('2021/07/01 00:00:00', '1', 'A', 'a1')])
+    t = datetime.datetime(2021, 7, 18, 4, 5)
+    preprocess.index_dvd_data('TEST', t, (6,), 4)
+    preprocess.dvd_indices.clear()
+    assert preprocess.index_dvd_data('TEST', t, (6,), 4)[('A',)][1][0][7] == 'a1'
+    write_dvd(p, [('2021/07/01 00:00:00', '1', 'A', 'a2')])
+    stat = p.stat()
+    os.utime(p, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    preprocess.dvd_indices.clear()
+    assert preprocess.index_dvd_data('TEST', t, (6,), 4)[('A',)][1][0][7] == 'a2'
+
+
+def test_market_price(dvd_dir):
+    (dvd_dir / 'DVD_MARKET_PRICE_THRESHOLDS_202107010000.csv').write_text(
+        'I,MARKET_PRICE_THRESHOLDS,,1,EFFECTIVEDATE,VERSIONNO,VOLL,MARKETPRICEFLOOR\n'
+        'D,MARKET_PRICE_THRESHOLDS,,1,"2021/07/01 00:00:00",1,15000,-1000\n'
+        'D,MARKET_PRICE_THRESHOLDS,,1,"2021/07/15 00:00:00",1,15100,-1000\n')
+    assert preprocess.get_market_price(datetime.datetime(2021, 7, 10)) == (15000.0, -1000.0)
+    assert preprocess.get_market_price(datetime.datetime(2021, 7, 18, 4, 5)) == (15100.0, -1000.0)
+
+
+def test_find_files_refreshes_current_listing_on_miss(source):
+    preprocess.get_listing(URL, ttl=300)
+    source.names.append('PUBLIC_DISPATCHIS_20210719.zip')
+    assert preprocess.find_files(URL, 'PUBLIC_DISPATCHIS_20210719.zip', 300) == ['PUBLIC_DISPATCHIS_20210719.zip']
+    assert source.hits == 2
+
+
+def test_find_files_does_not_refresh_new_listing(source):
+    assert preprocess.find_files(URL, 'PUBLIC_DISPATCHIS_20210720.zip', 300) == []
+    assert source.hits == 1
+
+
+def test_download_file_missing_everywhere(source, tmp_path, caplog):
+    t = datetime.datetime(2021, 7, 20, 4, 5)
+    assert preprocess.download_file('DispatchIS_Reports', 'PUBLIC_DISPATCHIS', '202107200405', tmp_path / 'f.csv', t) is None
+    assert 'Cannot find PUBLIC_DISPATCHIS_202107200405' in caplog.text
@@ -0,0 +1,134 @@
+import collections
+import datetime
+import pathlib
+
+import pytest
+
+pytest.importorskip('pandas')
+import default  # noqa: E402
+import price  # noqa: E402
+import read  # noqa: E402
+
+T = datetime.datetime(2021, 7, 18, 4, 5)
+OUT = pathlib.Path('out')
+
+
+@pytest.fixture
+def results(monkeypatch):
+    """Stand-in results, i.e. {(custom flag, interval or run start): price}, counting the reads of each."""
+    monkeypatch.setattr(price, 'dispatch_store', {})
+    monkeypatch.setattr(price, 'run_store', {})
+    prices, reads = {}, collections.Counter()
+
+    def read_dispatch_prices(t, process, custom_flag, region_id, k, path_to_out, fcas_flag):
+        reads[custom_flag, t] += 1
+        fcas = {bid_type: prices[custom_flag, t] + 1 for bid_type in price.FCAS_ORDER}
+        return prices[custom_flag, t], prices[False, t], fcas, fcas
+
+    def read_prices(t, process, custom_flag, region_id, k, path_to_out, fcas_flag):
+        reads[custom_flag, process, t] += 1
+        fcas = {bid_type: [prices[custom_flag, t]] for bid_type in price.FCAS_ORDER}
+        return [t], [prices[custom_flag, t]], [prices[False, t]], fcas, fcas
+
+    monkeypatch.setattr(read, 'read_dispatch_prices', read_dispatch_prices)
+    monkeypatch.setattr(read, 'read_prices', read_prices)
+    monkeypatch.setattr(read, 'read_p5min_fcas', lambda t, region_id: ([1.0], [2.0]))
+    for i in range(3):
+        prices[True, T + i * default.FIVE_MIN] = 10.0 * i
+        prices[False, T + i * default.FIVE_MIN] = 100.0 * i
+    return prices, reads
+
+
+def test_dispatch_prices_are_read_once(results):
+    _, reads = results
+    for _ in range(2):
+        rrp, rrp_record, fcas_rrp, _ = price.get_dispatch_prices(T + default.FIVE_MIN, True, 'NSW1', 0, OUT, True)
+    assert (rrp, rrp_record, fcas_rrp['RAISEREG']) == (10.0, 100.0, 11.0)
+    assert reads[True, T + default.FIVE_MIN] == 1
+
+
+def test_invalidate_dispatch_prices(results):
+    prices, reads = results
+    t = T + default.FIVE_MIN
+    price.get_dispatch_prices(t, True, 'NSW1', 0, OUT, True)
+    price.get_dispatch_prices(t, True, 'NSW1', 1, OUT, True)
+    price.get_dispatch_prices(t, False, 'NSW1', 0, None, True)
+    price.get_dispatch_prices(T, True, 'NSW1', 0, OUT, True)
+    prices[True, t] = 99.0
+    price.invalidate_prices(t, 'dispatch', 0, OUT)
+    assert price.get_dispatch_prices(t, True, 'NSW1', 0, OUT, True)[0] == 99.0
+    assert reads[True, t] == 3
+    # Other iterations, AEMO's records and other intervals are kept
+    assert price.get_dispatch_prices(t, True, 'NSW1', 1, OUT, True)[0] == 10.0
+    price.get_dispatch_prices(t, False, 'NSW1', 0, None, True)
+    price.get_dispatch_prices(T, True, 'NSW1', 0, OUT, True)
+    assert reads[False, t] == 1
+    assert reads[True, T] == 1
+
+
+def test_run_prices_are_read_only_views(results):
+    _, reads = results
+    times, prices, _, fcas_prices, _, _, _ = price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)
+    with pytest.raises(ValueError):
+        prices[0] = 1.0
+    fcas_prices.pop('RAISEREG')
+    times, prices, _, fcas_prices, _, raise_records, _ = price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)
+    assert (times, prices.tolist(), fcas_prices['RAISEREG'].tolist(), raise_records.tolist()) == ((T,), [0.0], [0.0], [1.0])
+    assert prices is price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)[1]
+    assert reads[True, 'p5min', T] == 1
+
+
+def test_horizon_is_built_from_slices(results, monkeypatch):
+    prices, _ = results
+    predispatch_time = T + default.THIRTY_MIN
+    run = [predispatch_time + i * default.THIRTY_MIN for i in range(3)]
+    for i, t in enumerate(run):
+        prices[True, t], prices[False, t] = 1000.0 + i, 2000.0 + i
+
+    def read_prices(t, process, custom_flag, region_id, k, path_to_out, fcas_flag):
+        times = [T + i * default.FIVE_MIN for i in range(8)] if process == 'p5min' else run
+        values = [float(i) for i in range(8)] if process == 'p5min' else [prices[custom_flag, t] for t in run]
+        return times, values, values, {'RAISEREG': values}, {'RAISEREG': values}
+
+    monkeypatch.setattr(read, 'read_prices', read_prices)
+    monkeypatch.setattr(read, 'read_p5min_fcas', lambda t, region_id: ([1.0] * 8, [2.0] * 8))
+    monkeypatch.setattr(read, 'read_predispatch_fcas', lambda t, region_id: ([3.0] * 3, [4.0] * 3))
+    monkeypatch.setattr(default, 'get_predispatch_time', lambda t: predispatch_time)
+    battery = collections.namedtuple('Battery', ['region_id', 'bat_dir'])('NSW1', OUT)
+    times, _, horizon_prices, _, fcas_prices, _, raise_records, _ = price.preprocess_prices(T, True, battery, 1)
+    assert times == [T + i * default.FIVE_MIN for i in range(6)] + run[1:]
+    assert horizon_prices == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 1001.0, 1002.0]
+    assert fcas_prices['RAISEREG'] == horizon_prices
+    assert raise_records == [1.0] * 6 + [3.0] * 2
+    horizon_prices.append(0.0)  # The horizon is a new list that can be extended
+    assert len(price.get_run_prices(T, 'p5min', True, 'NSW1', 1, OUT)[1]) == 8
+
+
+def test_run_store_evicts_least_recently_used(results, monkeypatch):
+    monkeypatch.setattr(price, 'MAX_STORE_RUNS', 2)
+    price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)
+    price.get_run_prices(T + default.FIVE_MIN, 'p5min', True, 'NSW1', 0, OUT)
+    price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)
+    price.get_run_prices(T + 2 * default.FIVE_MIN, 'p5min', True, 'NSW1', 0, OUT)
+    assert [key[2] for key in price.run_store] == [T, T + 2 * default.FIVE_MIN]
+
+
+def test_invalidate_run_prices(results):
+    prices, reads = results
+    price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)
+    prices[True, T] = 99.0
+    price.invalidate_prices(T, 'predispatch', 0, OUT)
+    assert price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)[1].tolist() == [0.0]
+    price.invalidate_prices(T, 'p5min', 0, OUT)
+    assert price.get_run_prices(T, 'p5min', True, 'NSW1', 0, OUT)[1].tolist() == [99.0]
+    assert reads[True, 'p5min', T] == 2
+
+
+def test_dispatch_store_is_bounded(results):
+    prices, _ = results
+    for day in range(price.MAX_STORE_DAYS + 2):
+        t = T + day * default.ONE_DAY
+        prices[True, t] = prices[False, t] = 0.0
+        price.get_dispatch_prices(t, True, 'NSW1', 0, OUT, False)
+    assert len(price.dispatch_store) == price.MAX_STORE_DAYS
+    assert ((True, 'NSW1', 0, OUT), default.get_first_datetime(T)) not in price.dispatch_store
@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('pandas')
+import preprocess  # noqa: E402
+import read  # noqa: E402
+
+T = datetime.datetime(2021, 7, 18, 4, 5)
+FCAS_COLUMNS = [column for bid_type in read.FCAS_ORDER for column in [f'{bid_type}RRP', f'{bid_type}ROP']]
+RECORD_COLUMNS = read.RAISE_RECORD_COLUMNS + read.LOWER_RECORD_COLUMNS
+
+
+def write_file(p, table, columns, rows):
+    """Write an AEMO file of one table whose columns are in the given (unusual) order."""
+    lines = [','.join(['I', 'TEST', table, '1'] + columns)]
+    lines += [','.join(['D', 'TEST', table, '1'] + [str(row.get(column, '')) for column in columns]) for row in rows]
+    p.write_text('\n'.join(lines) + '\n')
+    return p
+
+
+def test_dispatch_prices_by_column_name(tmp_path, monkeypatch):
+    columns = ['EXTRA', 'REGIONID', 'INTERVENTION', 'RRP'] + FCAS_COLUMNS
+    rows = [{'REGIONID': 'NSW1', 'INTERVENTION': 0, 'RRP': 50.5, 'RAISEREGRRP': 9.0},
+            {'REGIONID': 'NSW1', 'INTERVENTION': 1, 'RRP': 70.0},
+            {'REGIONID': 'VIC1', 'INTERVENTION': 0, 'RRP': 40.0}]
+    p = write_file(tmp_path / 'DISPATCHIS.CSV', 'PRICE', columns, rows)
+    monkeypatch.setattr(preprocess, 'download_dispatch_summary', lambda t: p)
+    rrp, rrp_record, fcas_prices, aemo_fcas_prices = read.read_dispatch_prices(T, 'dispatch', False, 'NSW1', fcas_flag=True)
+    assert (rrp, rrp_record, aemo_fcas_prices) == (50.5, None, {})
+    assert fcas_prices['RAISEREG'] == 9.0
+    assert fcas_prices['LOWERREG'] == 0  # Empty FCAS price
+    assert sorted(read.read_dispatch_prices(T, 'dispatch', False, None)) == ['NSW1', 'VIC1']
+
+
+def test_p5min_prices_and_records_by_column_name(tmp_path, monkeypatch):
+    columns = ['REGIONID', 'RRP', 'INTERVENTION', 'INTERVAL_DATETIME'] + FCAS_COLUMNS + RECORD_COLUMNS
+    rows = [{'REGIONID': 'NSW1', 'RRP': 50 + i, 'INTERVENTION': 0, 'INTERVAL_DATETIME': f'"2021/07/18 04:{5 * i + 5:02d}:00"',
+             'RAISE6SECRRP': i, 'RAISE5MINLOCALDISPATCH': 10 * i, 'RAISE60SECLOCALDISPATCH': 5,
+             'RAISE6SECLOCALDISPATCH': 0, 'LOWER5MINLOCALDISPATCH': 1, 'LOWER60SECLOCALDISPATCH': 2,
+             'LOWER6SECLOCALDISPATCH': 3} for i in range(2)]
+    p = write_file(tmp_path / 'P5MIN.CSV', 'REGIONSOLUTION', columns, rows)
+    monkeypatch.setattr(preprocess, 'download_5min_predispatch', lambda t: p)
+    times, prices, aemo_prices, fcas_prices, _ = read.read_p5min_prices(T, 'p5min', False, 'NSW1', fcas_flag=True)
+    assert times == [T, T + datetime.timedelta(minutes=5)]
+    assert (prices, aemo_prices, fcas_prices['RAISE6SEC']) == ([50.0, 51.0], [], [0.0, 1.0])
+    assert read.read_p5min_fcas(T, 'NSW1') == ([5.0, 10.0], [3.0, 3.0])
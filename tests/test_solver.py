@@ -0,0 +1,74 @@
+import pytest
+
+gp = pytest.importorskip('gurobipy')
+import solver  # noqa: E402
+
+
+def test_env_file_is_read():
+    assert solver.ENV_FILE.is_file()
+    assert solver.read_env_file() == {'OutputFlag': 0}
+
+
+def test_read_env_file_ignores_comments(tmp_path):
+    p = tmp_path / 'gurobi.env'
+    p.write_text('# Parameters\nMethod 1  # dual simplex\n\nFeasibilityTol 1e-7\nResultFile model.sol\n')
+    assert solver.read_env_file(p) == {'Method': 1, 'FeasibilityTol': 1e-7, 'ResultFile': 'model.sol'}
+
+
+def test_init_env_applies_env_file(tmp_path, monkeypatch):
+    p = tmp_path / 'gurobi.env'
+    p.write_text('Method 1\nPresolve 2\n')
+    monkeypatch.setattr(solver, 'ENV_FILE', p)
+    env = solver.init_env(params={'Presolve': 0})
+    with gp.Model(env=env) as model:
+        assert model.Params.Method == 1
+        assert model.Params.Presolve == 0  # Parameters given to init_env override the file
+
+
+def formulate(model, prob_id, demand, extra=False):
+    """Formulate a small LP of one interval whose names end with the problem ID."""
+    x = model.addVar(name=f'Gen_A_{prob_id}')
+    y = model.addVar(name=f'Gen_B_{prob_id}')
+    model.addLConstr(x + y, gp.GRB.EQUAL, demand, name=f'DEMAND_{prob_id}')
+    model.addLConstr(x, gp.GRB.LESS_EQUAL, 6, name=f'CAP_A_{prob_id}')
+    if extra:
+        z = model.addVar(name=f'Gen_C_{prob_id}')
+        model.addLConstr(z, gp.GRB.LESS_EQUAL, 1, name=f'CAP_C_{prob_id}')
+        model.setObjective(x + 2 * y + 3 * z)
+    else:
+        model.setObjective(x + 2 * y)
+
+
+@pytest.fixture
+def warm_starts(monkeypatch):
+    monkeypatch.setattr(solver, 'warm_starts', {})
+
+
+def test_warm_start_reuses_basis(warm_starts):
+    with gp.Model() as model:
+        model.Params.OutputFlag = 0
+        formulate(model, 'dispatch_0', 10)
+        assert not solver.set_warm_start(model, 'loop', 'dispatch_0')
+        model.optimize()
+        solver.record_warm_start(model, 'loop', 'dispatch_0')
+    with gp.Model() as model:
+        model.Params.OutputFlag = 0
+        formulate(model, 'dispatch_1', 9)
+        assert solver.set_warm_start(model, 'loop', 'dispatch_1')
+        model.optimize()
+        assert model.IterCount == 0
+        assert model.ObjVal == pytest.approx(12)
+
+
+def test_warm_start_is_skipped_when_names_differ(warm_starts):
+    with gp.Model() as model:
+        model.Params.OutputFlag = 0
+        formulate(model, 'dispatch_0', 10)
+        model.optimize()
+        solver.record_warm_start(model, 'loop', 'dispatch_0')
+    with gp.Model() as model:
+        model.Params.OutputFlag = 0
+        formulate(model, 'dispatch_1', 10, extra=True)
+        assert not solver.set_warm_start(model, 'loop', 'dispatch_1')
+        model.optimize()
+        assert model.ObjVal == pytest.approx(14)
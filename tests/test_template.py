@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+gp = pytest.importorskip('gurobipy')
+import template  # noqa: E402
+
+
+def formulate(model, prob_id, avail, named=False):
+    """Formulate a small interval mixing the scalar and matrix APIs, with the objective set after adding variables."""
+    total = model.addVar(ub=avail, name=f'Total_Cleared_{prob_id}')
+    names = {'name': [f'Offer{no}_{prob_id}' for no in range(3)]} if named else {}
+    offers = model.addMVar(3, **names)
+    constr_names = {'name': [f'OFFER_AVAIL{no}_{prob_id}' for no in range(3)]} if named else {}
+    model.addMConstr(np.eye(3), offers, gp.GRB.LESS_EQUAL, np.full(3, avail), **constr_names)
+    model.addLConstr(total - gp.quicksum(offers.tolist()), gp.GRB.EQUAL, 0, name=f'TOTAL_BAND_{prob_id}')
+    model.addLConstr(total, gp.GRB.GREATER_EQUAL, 1, name=f'DEMAND_{prob_id}')
+    model.setObjective(total + gp.quicksum(offers.tolist()), gp.GRB.MINIMIZE)
+
+
+def solve_intervals(named):
+    key = ('test', named)
+    results = []
+    try:
+        for i, avail in enumerate([10, 20, 30]):
+            with template.open_model('test', f'dispatch_{i}', key) as model:
+                formulate(model, f'dispatch_{i}', avail, named)
+                model.optimize()
+                assert model.status == gp.GRB.Status.OPTIMAL
+                results.append((model.NumVars, model.NumConstrs, model.ObjVal, dict(model.stats)))
+    finally:
+        template.release_template(key)
+    return results
+
+
+@pytest.mark.parametrize('named', [False, True])
+def test_template_is_stable_across_intervals(named):
+    results = solve_intervals(named)
+    assert [(num_vars, num_constrs) for num_vars, num_constrs, _, _ in results] == [(4, 5)] * 3
+    assert [obj_val for _, _, obj_val, _ in results] == pytest.approx([2.0] * 3)
+
+
+def test_named_matrix_api_is_reused():
+    stats = [stats for _, _, _, stats in solve_intervals(True)]
+    assert stats[0] == {'reused vars': 0, 'added vars': 4, 'reused constrs': 0, 'added constrs': 5}
+    assert stats[1] == stats[2] == {'reused vars': 4, 'added vars': 0, 'reused constrs': 5, 'added constrs': 0}